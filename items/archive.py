@@ -0,0 +1,66 @@
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+
+from django.conf import settings
+from django.utils import timezone
+
+DEFAULT_BATCH_SIZE = 500
+
+
+def archive_cutoff(inactive_days: Optional[int] = None) -> datetime:
+    """
+    Items inactive since before this instant are moved to the archive.
+    """
+    if inactive_days is None:
+        inactive_days = settings.ARCHIVE_INACTIVE_DAYS
+    if inactive_days < 0:
+        raise ValueError('inactive_days must not be negative')
+    return timezone.now() - timedelta(days=inactive_days)
+
+
+def archive_items(service, inactive_days: Optional[int] = None, batch_size: int = DEFAULT_BATCH_SIZE,
+                  progress: Optional[Callable[[Dict], None]] = None) -> Dict:
+    """
+    Move soft-deleted and long-inactive items into ``items_archive`` in batches.
+
+    Each batch is one ``service.archive_batch`` call: it copies up to
+    ``batch_size`` rows into the archive and removes them from ``items``.
+    Batches continue after the highest id already examined, so the hot table
+    is scanned once however many batches it takes. ``progress`` receives the
+    running summary after every batch.
+    """
+    if batch_size < 1:
+        raise ValueError('batch_size must be at least 1')
+    cutoff = archive_cutoff(inactive_days)
+    summary = {'archived': 0, 'batches': 0, 'cutoff': cutoff.isoformat()}
+    after_id = 0
+    while True:
+        moved, last_id = service.archive_batch(cutoff, batch_size, after_id)
+        if last_id is None:
+            break
+        summary['archived'] += moved
+        summary['batches'] += 1
+        after_id = last_id
+        if progress:
+            progress(summary)
+    return summary
+
+
+def _sort_key(item: Dict):
+    created_at = item['created_at']
+    if isinstance(created_at, str):
+        created_at = datetime.fromisoformat(created_at)
+    return created_at, item['id']
+
+
+def merge_pages(hot: List[Dict], archived: List[Dict], limit: Optional[int], offset: int) -> List[Dict]:
+    """
+    Merge newest-first pages of the hot and archive tables into one page.
+
+    Both inputs must hold at least ``offset + limit`` rows (or every row)
+    from the same cursor position, ordered by (created_at, id) descending.
+    """
+    merged = sorted(hot + archived, key=_sort_key, reverse=True)
+    if limit is None:
+        return merged[offset:]
+    return merged[offset:offset + limit]
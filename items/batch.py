@@ -0,0 +1,69 @@
+from typing import List, Dict
+from .schema import ITEM_SCHEMA
+
+BATCH_OPERATIONS = ('create', 'update', 'delete', 'get')
+MAX_BATCH_SIZE = 100
+
+
+def validate_operations(operations) -> List[Dict]:
+    """
+    Check a batch payload before any database work is done.
+
+    Returns the operations as a list of dicts; raises ValueError naming the
+    first offending operation so the whole batch can be rejected with a 400.
+    """
+    if not isinstance(operations, list) or not operations:
+        raise ValueError('operations must be a non-empty list')
+    if len(operations) > MAX_BATCH_SIZE:
+        raise ValueError(f'A batch may contain at most {MAX_BATCH_SIZE} operations')
+
+    for index, operation in enumerate(operations):
+        if not isinstance(operation, dict):
+            raise ValueError(f'Operation {index}: must be an object')
+
+        op = operation.get('op')
+        if op not in BATCH_OPERATIONS:
+            raise ValueError(f'Operation {index}: op must be one of: {", ".join(BATCH_OPERATIONS)}')
+
+        item_id = operation.get('id')
+        # bool is an int subclass: "id": true would target item 1
+        if op != 'create' and (not isinstance(item_id, int) or isinstance(item_id, bool)):
+            raise ValueError(f'Operation {index}: integer id is required for {op}')
+
+        if op in ('create', 'update') and not isinstance(operation.get('data'), dict):
+            raise ValueError(f'Operation {index}: data object is required for {op}')
+
+    # Clean all create payloads, then all update payloads, in one pass each
+    operations = list(operations)
+    for op, partial in (('create', False), ('update', True)):
+        positions = [index for index, operation in enumerate(operations) if operation['op'] == op]
+        valid, rejected = ITEM_SCHEMA.clean_many([operations[index]['data'] for index in positions], partial)
+        if rejected:
+            position, error = rejected[0]
+            raise ValueError(f'Operation {positions[position]}: {error}')
+        for position, data in valid:
+            index = positions[position]
+            operations[index] = {**operations[index], 'data': data}
+
+    return operations
+
+
+def operation_result(operation: Dict, value) -> Dict:
+    """
+    Shape the return value of a single service call into a per-operation result.
+    """
+    op = operation['op']
+    result = {'op': op}
+    if 'id' in operation:
+        result['id'] = operation['id']
+
+    if op == 'delete':
+        result['success'] = bool(value)
+    else:
+        result['success'] = value is not None
+        if value is not None:
+            result['data'] = value
+
+    if not result['success']:
+        result['error'] = 'Item not found'
+    return result
@@ -0,0 +1,236 @@
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Callable, Dict, Optional
+
+import httpx
+from django.conf import settings
+
+LATENCY_WINDOW = 200
+MIN_HEDGE_SAMPLES = 20
+
+READ_METHODS = ('get_all_items', 'get_item_by_id', 'search_items', 'count_items', 'find_items', 'item_stats')
+
+
+class CallTimeout(TimeoutError):
+    """Raised when a backend call does not finish within its policy timeout."""
+
+
+class CallPolicy:
+    """
+    Timeout, retry and hedging settings for one kind of backend call.
+
+    ``hedge_after`` is None (no hedging), a delay in seconds, or ``'p95'`` to
+    fire the second request once the call has taken longer than the observed
+    95th percentile latency. Only idempotent calls should retry or hedge.
+    """
+
+    def __init__(self, timeout: float = 10.0, retries: int = 0, backoff: float = 0.05,
+                 backoff_max: float = 1.0, hedge_after=None):
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.backoff_max = backoff_max
+        self.hedge_after = hedge_after
+
+    def backoff_delay(self, attempt: int) -> float:
+        # Full jitter: spreads retries from many clients across the window
+        return random.uniform(0, min(self.backoff_max, self.backoff * (2 ** attempt)))
+
+
+class CallStats:
+    """Thread-safe counters and a rolling latency window for one method."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self.counters = {
+            'calls': 0,
+            'successes': 0,
+            'failures': 0,
+            'retries': 0,
+            'timeouts': 0,
+            'hedges': 0,
+            'hedge_wins': 0,
+        }
+
+    def incr(self, name: str):
+        with self.lock:
+            self.counters[name] += 1
+
+    def record_latency(self, seconds: float):
+        with self.lock:
+            self.latencies.append(seconds)
+
+    def sample_count(self) -> int:
+        with self.lock:
+            return len(self.latencies)
+
+    def percentile(self, fraction: float) -> Optional[float]:
+        with self.lock:
+            if not self.latencies:
+                return None
+            ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+    def snapshot(self) -> Dict:
+        with self.lock:
+            data = dict(self.counters)
+            samples = len(self.latencies)
+        for label, fraction in (('p50_ms', 0.50), ('p95_ms', 0.95)):
+            value = self.percentile(fraction)
+            data[label] = round(value * 1000, 2) if value is not None else None
+        data['samples'] = samples
+        return data
+
+
+def default_policies(hedge_reads: bool = False) -> Dict[str, CallPolicy]:
+    """Reads retry (and optionally hedge); writes get a timeout only."""
+    policies = {
+        name: CallPolicy(timeout=5.0, retries=2, hedge_after='p95' if hedge_reads else None)
+        for name in READ_METHODS
+    }
+    policies['default'] = CallPolicy(timeout=10.0, retries=0)
+    return policies
+
+
+def policies_from_settings() -> Dict[str, CallPolicy]:
+    """
+    Build the policy table from SUPABASE_HEDGE_READS and the per-method
+    overrides in SUPABASE_CALL_POLICIES.
+    """
+    policies = default_policies(getattr(settings, 'SUPABASE_HEDGE_READS', False))
+    for name, overrides in getattr(settings, 'SUPABASE_CALL_POLICIES', {}).items():
+        base = policies.get(name, policies['default'])
+        policies[name] = CallPolicy(**{**vars(base), **overrides})
+    return policies
+
+
+class TimedSession:
+    """
+    Wraps the shared httpx client of a PostgREST query so each request
+    carries the policy timeout. An attempt the runner gave up on then fails
+    soon after instead of holding its pool thread until httpx's own default.
+    """
+
+    def __init__(self, session: httpx.Client, timeout: float):
+        self.session = session
+        self.timeout = timeout
+
+    def request(self, *args, **kwargs):
+        return self.session.request(*args, timeout=self.timeout, **kwargs)
+
+
+class CallPolicyRunner:
+    """
+    Execute backend calls under their per-method CallPolicy.
+
+    Calls run on a small shared thread pool so a timeout or a hedged second
+    request does not block the caller; the losing request is left to finish
+    in the background and its result is discarded. At most ``max_workers``
+    requests are outstanding: a call waits for a free slot within its
+    timeout, and hedges are skipped while none is free.
+    """
+
+    def __init__(self, policies: Dict[str, CallPolicy], max_workers: int = 16):
+        self.policies = policies
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='supabase-call')
+        self.slots = threading.BoundedSemaphore(max_workers)
+        self.stats_lock = threading.Lock()
+        self.method_stats: Dict[str, CallStats] = {}
+
+    def policy_for(self, name: str) -> CallPolicy:
+        return self.policies.get(name) or self.policies.get('default') or CallPolicy()
+
+    def stats_for(self, name: str) -> CallStats:
+        with self.stats_lock:
+            if name not in self.method_stats:
+                self.method_stats[name] = CallStats()
+            return self.method_stats[name]
+
+    def stats(self) -> Dict[str, Dict]:
+        with self.stats_lock:
+            names = list(self.method_stats)
+        return {name: self.method_stats[name].snapshot() for name in names}
+
+    def run(self, name: str, fn: Callable):
+        policy = self.policy_for(name)
+        stats = self.stats_for(name)
+        stats.incr('calls')
+
+        attempt = 0
+        while True:
+            try:
+                result = self._attempt(policy, stats, fn)
+                stats.incr('successes')
+                return result
+            except (CallTimeout, httpx.TransportError) as e:
+                # The request itself carries the policy timeout, so httpx may report it first
+                if isinstance(e, (CallTimeout, httpx.TimeoutException)):
+                    stats.incr('timeouts')
+                if attempt >= policy.retries:
+                    stats.incr('failures')
+                    raise
+                stats.incr('retries')
+                time.sleep(policy.backoff_delay(attempt))
+                attempt += 1
+            except Exception:
+                stats.incr('failures')
+                raise
+
+    def _hedge_delay(self, policy: CallPolicy, stats: CallStats) -> Optional[float]:
+        if policy.hedge_after == 'p95':
+            if stats.sample_count() < MIN_HEDGE_SAMPLES:
+                return None
+            return stats.percentile(0.95)
+        return policy.hedge_after
+
+    def _submit(self, fn: Callable, wait_for: float) -> Optional[Future]:
+        """Run fn on the pool once a slot is free; None if none frees up in time."""
+        if not self.slots.acquire(timeout=max(wait_for, 0)):
+            return None
+        future = self.executor.submit(fn)
+        future.add_done_callback(lambda _: self.slots.release())
+        return future
+
+    def _attempt(self, policy: CallPolicy, stats: CallStats, fn: Callable):
+        start = time.monotonic()
+        deadline = start + policy.timeout
+        first = self._submit(fn, policy.timeout)
+        if first is None:
+            raise CallTimeout(f'No free call slot within {policy.timeout:.2f}s')
+        pending = {first}
+
+        hedge_delay = self._hedge_delay(policy, stats)
+        if hedge_delay is not None and hedge_delay < policy.timeout:
+            done, _ = wait(pending, timeout=hedge_delay)
+            if not done:
+                # Only hedge with a spare slot; under saturation it would add load
+                hedge = self._submit(fn, 0)
+                if hedge is not None:
+                    stats.incr('hedges')
+                    pending.add(hedge)
+
+        error = None
+        while pending:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is not first:
+                        stats.incr('hedge_wins')
+                    stats.record_latency(time.monotonic() - start)
+                    for other in pending:
+                        other.cancel()
+                    return future.result()
+                error = future.exception()
+
+        if pending:
+            for other in pending:
+                other.cancel()
+            raise CallTimeout(f'Call timed out after {policy.timeout:.2f}s')
+        raise error
@@ -0,0 +1,64 @@
+from datetime import datetime
+from typing import Dict, List
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+RESPONSE_FORMATS = ('json', 'columnar')
+MSGPACK_CONTENT_TYPE = 'application/msgpack'
+
+# Column order of the columnar format; rows missing a column get None
+COLUMNS = ('id', 'name', 'description', 'price', 'created_at', 'updated_at', 'is_active')
+TIMESTAMP_COLUMNS = ('created_at', 'updated_at')
+
+
+def epoch_millis(value):
+    """ISO 8601 string or datetime -> integer milliseconds since the epoch."""
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    return int(value.timestamp() * 1000)
+
+
+def to_columns(items: List[Dict]) -> Dict:
+    """
+    Transpose item dicts into one list per column.
+
+    Prices become plain numbers and timestamps epoch milliseconds, so the
+    client can use the arrays without further parsing.
+    """
+    # created_at and updated_at often hold the same instant; convert each
+    # distinct timestamp once
+    converted = {}
+
+    def timestamp(value):
+        if value not in converted:
+            converted[value] = epoch_millis(value)
+        return converted[value]
+
+    columns = {}
+    for name in COLUMNS:
+        values = [item.get(name) for item in items]
+        if name == 'price':
+            values = [float(value) if value is not None else None for value in values]
+        elif name in TIMESTAMP_COLUMNS:
+            values = [timestamp(value) for value in values]
+        columns[name] = values
+
+    return {
+        'columns': list(COLUMNS),
+        'rows': len(items),
+        'values': [columns[name] for name in COLUMNS],
+    }
+
+
+def wants_msgpack(request) -> bool:
+    """True when the client accepts MessagePack and the package is installed."""
+    return msgpack is not None and MSGPACK_CONTENT_TYPE in request.META.get('HTTP_ACCEPT', '')
+
+
+def pack(payload: Dict) -> bytes:
+    return msgpack.packb(payload, use_bin_type=True)
@@ -0,0 +1,176 @@
+import hashlib
+import threading
+import zlib
+from collections import OrderedDict
+from typing import Optional
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+ZSTD_LEVEL = 3
+
+
+# Streamed input is buffered up to this size before a flush, so tiny
+# chunks (one JSON line each) still compress well
+STREAM_FLUSH_BYTES = 16 * 1024
+
+
+class Codec:
+    """
+    One content-coding. Subclasses provide a compressor object and how to
+    feed, flush and finish it.
+    """
+    name = None
+
+    def compress(self, data: bytes) -> bytes:
+        compressor = self.compressor()
+        return self.process(compressor, data) + self.finish(compressor)
+
+    def stream(self, chunks):
+        compressor = self.compressor()
+        pending = 0
+        for chunk in chunks:
+            data = self.process(compressor, chunk)
+            pending += len(chunk)
+            if pending >= STREAM_FLUSH_BYTES:
+                data += self.flush(compressor)
+                pending = 0
+            if data:
+                yield data
+        yield self.finish(compressor)
+
+
+class GzipCodec(Codec):
+    name = 'gzip'
+
+    def compressor(self):
+        # wbits=31 writes a gzip header and trailer
+        return zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+
+    def process(self, compressor, data):
+        return compressor.compress(data)
+
+    def flush(self, compressor):
+        return compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self, compressor):
+        return compressor.flush()
+
+
+class BrotliCodec(Codec):
+    name = 'br'
+
+    def compressor(self):
+        return brotli.Compressor(quality=BROTLI_QUALITY)
+
+    def process(self, compressor, data):
+        return compressor.process(data)
+
+    def flush(self, compressor):
+        return compressor.flush()
+
+    def finish(self, compressor):
+        return compressor.finish()
+
+
+class ZstdCodec(Codec):
+    name = 'zstd'
+
+    def compressor(self):
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compressobj()
+
+    def process(self, compressor, data):
+        return compressor.compress(data)
+
+    def flush(self, compressor):
+        return compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self, compressor):
+        return compressor.flush()
+
+
+def available_codecs():
+    """Codecs in server preference order; brotli and zstd only when installed."""
+    codecs = []
+    if zstandard is not None:
+        codecs.append(ZstdCodec())
+    if brotli is not None:
+        codecs.append(BrotliCodec())
+    codecs.append(GzipCodec())
+    return codecs
+
+
+def negotiate(accept_encoding: str, codecs) -> Optional[object]:
+    """
+    Pick the preferred codec the client accepts (q > 0), or None.
+    """
+    accepted = {}
+    for part in accept_encoding.split(','):
+        token, _, params = part.strip().partition(';')
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        if token:
+            accepted[token.strip().lower()] = quality
+
+    wildcard = accepted.get('*', 0.0)
+    for codec in codecs:
+        if accepted.get(codec.name, wildcard) > 0:
+            return codec
+    return None
+
+
+class CompressedBodyCache:
+    """
+    LRU of compressed bodies keyed by encoding and a digest of the raw body.
+
+    Identical payloads (the same list page served repeatedly) are then
+    compressed once; hashing is much cheaper than compressing.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def compress(self, codec, data: bytes) -> bytes:
+        if self.max_bytes <= 0:
+            return codec.compress(data)
+
+        key = (codec.name, hashlib.blake2b(data, digest_size=16).digest())
+        with self.lock:
+            cached = self.entries.get(key)
+            if cached is not None:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return cached
+            self.misses += 1
+
+        compressed = codec.compress(data)
+        if len(compressed) > self.max_bytes:
+            return compressed
+
+        with self.lock:
+            if key not in self.entries:
+                self.entries[key] = compressed
+                self.size += len(compressed)
+                while self.size > self.max_bytes:
+                    _, evicted = self.entries.popitem(last=False)
+                    self.size -= len(evicted)
+        return compressed
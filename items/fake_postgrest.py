@@ -0,0 +1,566 @@
+"""
+Minimal in-process PostgREST stand-in for exercising SupabaseService locally.
+
+Serves ``/rest/v1/items`` and ``/rest/v1/items_archive`` from in-memory
+SQLite tables and understands the subset of PostgREST that SupabaseService
+uses: column selection, eq/neq/gt/gte/lt/lte/like/ilike/in/is filters,
+``or=(...)``, order, limit/offset, ``Prefer: count=...``/``return=...``/
+``missing=default`` and bulk inserts. The RPC functions of
+``supabase/migrations/*_items_functions.sql`` are served from Python
+equivalents (``RPC_FUNCTIONS``). Latency, slow responses and dropped connections can be injected to test call
+policies. Point the service at it with ``SUPABASE_URL=<server.url>``.
+"""
+import json
+import random
+import re
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+from .search import normalize_search_text
+
+ITEM_COLUMNS = ('id', 'name', 'description', 'price', 'created_at', 'updated_at', 'is_active', 'deleted_at',
+                'name_search', 'description_search')
+# Columns of each served table
+TABLES = {
+    'items': ITEM_COLUMNS,
+    'items_archive': ITEM_COLUMNS + ('archived_at',),
+}
+
+SCHEMA = """
+CREATE TABLE items (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL,
+    description TEXT DEFAULT '',
+    price REAL,
+    created_at TEXT,
+    updated_at TEXT,
+    is_active INTEGER DEFAULT 1,
+    deleted_at TEXT,
+    name_search TEXT GENERATED ALWAYS AS (items_search_text(name)) STORED,
+    description_search TEXT GENERATED ALWAYS AS (items_search_text(description)) STORED
+);
+CREATE INDEX items_name_search_idx ON items (name_search);
+CREATE INDEX items_description_search_idx ON items (description_search);
+CREATE TABLE items_archive (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    description TEXT DEFAULT '',
+    price REAL,
+    created_at TEXT,
+    updated_at TEXT,
+    is_active INTEGER DEFAULT 0,
+    deleted_at TEXT,
+    archived_at TEXT,
+    name_search TEXT GENERATED ALWAYS AS (items_search_text(name)) STORED,
+    description_search TEXT GENERATED ALWAYS AS (items_search_text(description)) STORED
+);
+"""
+
+OPERATORS = {
+    'eq': '=', 'neq': '!=', 'gt': '>', 'gte': '>=', 'lt': '<', 'lte': '<=',
+    'like': 'GLOB', 'ilike': 'LIKE',
+}
+RESERVED_PARAMS = ('select', 'order', 'limit', 'offset', 'columns', 'or', 'on_conflict')
+
+
+class PostgrestError(Exception):
+    def __init__(self, status, message, code='PGRST100'):
+        super().__init__(message)
+        self.status = status
+        self.code = code
+
+
+def now_iso():
+    return datetime.now(timezone.utc).isoformat()
+
+
+def split_top_level(text):
+    """Split on commas that are not nested inside parentheses or double quotes."""
+    parts, depth, current, quoted, escaped = [], 0, '', False, False
+    for char in text:
+        if escaped:
+            escaped = False
+        elif quoted and char == '\\':
+            escaped = True
+        elif char == '"':
+            quoted = not quoted
+        elif not quoted and char == '(':
+            depth += 1
+        elif not quoted and char == ')':
+            depth -= 1
+        if char == ',' and depth == 0 and not quoted:
+            parts.append(current)
+            current = ''
+        else:
+            current += char
+    if current:
+        parts.append(current)
+    return parts
+
+
+def unquote(value):
+    """Strip PostgREST double quotes, resolving their backslash escapes."""
+    if len(value) > 1 and value.startswith('"') and value.endswith('"'):
+        return re.sub(r'\\(.)', r'\1', value[1:-1])
+    return value
+
+
+def like_to_glob(pattern):
+    """
+    Translate a PostgREST like pattern (* or % for any run, _ for one
+    character, backslash escapes) into a case-sensitive GLOB pattern.
+    """
+    out, chars = [], iter(pattern)
+    for char in chars:
+        if char == '\\':
+            char = next(chars, '\\')
+            out.append(f'[{char}]' if char in '*?[' else char)
+        elif char in '*%':
+            out.append('*')
+        elif char == '_':
+            out.append('?')
+        elif char in '?[':
+            out.append(f'[{char}]')
+        else:
+            out.append(char)
+    return ''.join(out)
+
+
+class FakePostgrest:
+    """
+    Threaded HTTP server plus the table it serves.
+
+    ``latency``/``jitter`` delay every response; ``slow_rate`` of responses
+    take ``slow_latency`` instead, and ``error_rate`` of requests have their
+    connection dropped without a reply. ``request_count`` counts requests.
+    """
+
+    def __init__(self, host='127.0.0.1', port=0, latency=0.0, jitter=0.0,
+                 slow_rate=0.0, slow_latency=1.0, error_rate=0.0, seed=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.slow_rate = slow_rate
+        self.slow_latency = slow_latency
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self.request_count = 0
+        self.rpc_functions = dict(RPC_FUNCTIONS)
+        self.lock = threading.RLock()
+        self.db = sqlite3.connect(':memory:', check_same_thread=False)
+        self.db.row_factory = sqlite3.Row
+        # Computes the generated search columns, as items_search_text() does in Postgres
+        self.db.create_function('items_search_text', 1, normalize_search_text, deterministic=True)
+        self.db.executescript(SCHEMA)
+
+        handler = type('Handler', (_Handler,), {'fake': self})
+        self.server = ThreadingHTTPServer((host, port), handler)
+        self.server.daemon_threads = True
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def serve_forever(self):
+        self.server.serve_forever()
+
+    def seed(self, rows):
+        """Insert rows directly, bypassing HTTP (for preparing large tables)."""
+        with self.lock:
+            self.db.executemany(
+                'INSERT INTO items (name, description, price, created_at, updated_at, is_active) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                (
+                    (row['name'], row.get('description', ''), row.get('price'),
+                     row.get('created_at') or now_iso(), row.get('updated_at') or now_iso(),
+                     int(row.get('is_active', True)))
+                    for row in rows
+                ),
+            )
+            self.db.commit()
+
+    # Request handling
+
+    def inject_faults(self):
+        """Sleep for the configured latency; return False to drop the request."""
+        with self.lock:
+            self.request_count += 1
+            drop = self.random.random() < self.error_rate
+            slow = self.random.random() < self.slow_rate
+            delay = self.slow_latency if slow else self.latency + self.random.uniform(0, self.jitter)
+        if delay > 0:
+            time.sleep(delay)
+        return not drop
+
+    def handle(self, method, path, params, headers, body):
+        parts = [part for part in path.split('/') if part]
+        if parts[:2] != ['rest', 'v1'] or len(parts) < 3:
+            raise PostgrestError(404, f'Unknown path {path}', 'PGRST125')
+        if parts[2] == 'rpc' and len(parts) == 4:
+            return self.handle_rpc(parts[3], params, body)
+        table = parts[2]
+        if table not in TABLES:
+            raise PostgrestError(404, f'relation "{table}" does not exist', '42P01')
+
+        prefer = headers.get('Prefer', '')
+        with self.lock:
+            if method in ('GET', 'HEAD'):
+                return self.select(table, params, prefer, head=method == 'HEAD')
+            if method == 'POST':
+                return self.insert(table, params, prefer, body)
+            if method == 'PATCH':
+                return self.update(table, params, prefer, body)
+            if method == 'DELETE':
+                return self.delete(table, params, prefer)
+        raise PostgrestError(405, f'Method {method} not allowed')
+
+    def handle_rpc(self, name, params, body):
+        function = self.rpc_functions.get(name)
+        if function is None:
+            raise PostgrestError(404, f'Could not find the function public.{name}', 'PGRST202')
+        with self.lock:
+            return 200, function(self, body or {}), {}
+
+    # SQL translation
+
+    def where_clause(self, table, params):
+        clauses, args = [], []
+        for key, value in params:
+            if key in RESERVED_PARAMS or '.' in key:
+                if key == 'or':
+                    sql, sub_args = self.or_clause(table, value)
+                    clauses.append(sql)
+                    args.extend(sub_args)
+                continue
+            sql, sub_args = self.condition(table, key, value)
+            clauses.append(sql)
+            args.extend(sub_args)
+        return (' WHERE ' + ' AND '.join(clauses)) if clauses else '', args
+
+    def or_clause(self, table, value, joiner='OR'):
+        inner = value.strip()
+        if not (inner.startswith('(') and inner.endswith(')')):
+            raise PostgrestError(400, f'"failed to parse logic tree ({value})"')
+        sqls, args = [], []
+        for part in split_top_level(inner[1:-1]):
+            if part.startswith(('and(', 'or(')):
+                nested, _, rest = part.partition('(')
+                sql, sub_args = self.or_clause(table, '(' + rest, nested.upper())
+            else:
+                column, _, condition = part.partition('.')
+                sql, sub_args = self.condition(table, column, condition)
+            sqls.append(sql)
+            args.extend(sub_args)
+        return '(' + f' {joiner} '.join(sqls) + ')', args
+
+    def condition(self, table, column, expression):
+        self.check_column(table, column)
+        negate = expression.startswith('not.')
+        if negate:
+            expression = expression[4:]
+        operator, _, value = expression.partition('.')
+        value = unquote(value)
+
+        if operator == 'in':
+            values = [self.coerce(column, item.strip('"')) for item in split_top_level(value.strip('()'))]
+            sql = f'{column} IN ({", ".join("?" for _ in values)})' if values else '0'
+            args = values
+        elif operator == 'is':
+            sql = f'{column} IS {"NULL" if value == "null" else ("1" if value == "true" else "0")}'
+            args = []
+        elif operator in OPERATORS:
+            if operator == 'ilike':
+                # SQLite LIKE is already case-insensitive
+                value = value.replace('*', '%')
+                sql = f"{column} LIKE ? ESCAPE '\\'"
+            elif operator == 'like':
+                # Case-sensitive match: translate to GLOB wildcards
+                value = like_to_glob(value)
+                sql = f'{column} GLOB ?'
+            else:
+                sql = f'{column} {OPERATORS[operator]} ?'
+            args = [self.coerce(column, value)]
+        else:
+            raise PostgrestError(400, f'unknown operator {operator}')
+        return (f'NOT ({sql})' if negate else sql), args
+
+    def coerce(self, column, value):
+        if column == 'is_active':
+            return 1 if value in ('true', 't', '1') else 0
+        return value
+
+    def check_column(self, table, column):
+        if column not in TABLES[table]:
+            raise PostgrestError(400, f'column {table}.{column} does not exist', '42703')
+
+    def select_columns(self, table, params):
+        select = dict(params).get('select', '*')
+        if select == '*':
+            return list(TABLES[table])
+        columns = [column.strip().strip('"') for column in select.split(',')]
+        for column in columns:
+            self.check_column(table, column)
+        return columns
+
+    def order_clause(self, table, params):
+        order = dict(params).get('order')
+        if not order:
+            return ' ORDER BY id'
+        terms = []
+        for term in order.split(','):
+            column, _, direction = term.partition('.')
+            self.check_column(table, column)
+            terms.append(f'{column} {"DESC" if direction.startswith("desc") else "ASC"}')
+        return ' ORDER BY ' + ', '.join(terms + ['id'])
+
+    def serialize(self, row, columns):
+        data = {}
+        for column in columns:
+            value = row[column]
+            if column == 'is_active' and value is not None:
+                value = bool(value)
+            data[column] = value
+        return data
+
+    def count_header(self, table, prefer, where, args, offset, returned):
+        match = re.search(r'count=(exact|planned|estimated)', prefer)
+        total = '*'
+        if match:
+            total = self.db.execute(f'SELECT COUNT(*) FROM {table}{where}', args).fetchone()[0]
+        if returned:
+            return {'Content-Range': f'{offset}-{offset + returned - 1}/{total}'}
+        return {'Content-Range': f'*/{total}'}
+
+    def select(self, table, params, prefer, head=False):
+        columns = self.select_columns(table, params)
+        where, args = self.where_clause(table, params)
+        values = dict(params)
+        limit = int(values.get('limit', -1))
+        offset = int(values.get('offset', 0))
+        sql = f'SELECT {", ".join(columns)} FROM {table}{where}{self.order_clause(table, params)} LIMIT ? OFFSET ?'
+        rows = [self.serialize(row, columns) for row in self.db.execute(sql, args + [limit, offset])]
+        headers = self.count_header(table, prefer, where, args, offset, len(rows))
+        return 200, (None if head else rows), headers
+
+    def insert(self, table, params, prefer, body):
+        rows = body if isinstance(body, list) else [body]
+        use_defaults = 'missing=default' in prefer or not isinstance(body, list)
+        upsert = 'resolution=merge-duplicates' in prefer
+        keys = set()
+        for row in rows:
+            keys.update(row)
+        inserted = []
+        for row in rows:
+            for key in row:
+                if key not in TABLES[table]:
+                    raise PostgrestError(400, f"Could not find the '{key}' column of '{table}'", 'PGRST204')
+            values = {key: row.get(key) for key in keys} if not use_defaults else dict(row)
+            values.setdefault('created_at', now_iso())
+            values.setdefault('updated_at', values['created_at'])
+            if 'is_active' in values and values['is_active'] is not None:
+                values['is_active'] = int(bool(values['is_active']))
+            if values.get('name') is None:
+                raise PostgrestError(400, 'null value in column "name" violates not-null constraint', '23502')
+            columns = list(values)
+            sql = f'INSERT INTO {table} ({", ".join(columns)}) VALUES ({", ".join("?" for _ in columns)})'
+            if upsert and 'id' in values:
+                updates = ', '.join(f'{column} = excluded.{column}' for column in columns if column != 'id')
+                sql += f' ON CONFLICT(id) DO UPDATE SET {updates}'
+            cursor = self.db.execute(sql, [values[column] for column in columns])
+            inserted.append(values.get('id') or cursor.lastrowid)
+        self.db.commit()
+        return self.returning(table, params, prefer, inserted, status=201)
+
+    def update(self, table, params, prefer, body):
+        where, args = self.where_clause(table, params)
+        ids = [row[0] for row in self.db.execute(f'SELECT id FROM {table}{where}', args)]
+        if ids and body:
+            for key in body:
+                if key not in TABLES[table]:
+                    raise PostgrestError(400, f"Could not find the '{key}' column of '{table}'", 'PGRST204')
+            values = {key: (int(bool(value)) if key == 'is_active' else value) for key, value in body.items()}
+            assignments = ', '.join(f'{column} = ?' for column in values)
+            placeholders = ', '.join('?' for _ in ids)
+            self.db.execute(f'UPDATE {table} SET {assignments} WHERE id IN ({placeholders})', list(values.values()) + ids)
+            self.db.commit()
+        return self.returning(table, params, prefer, ids)
+
+    def delete(self, table, params, prefer):
+        _, rows, _ = self.select(table, params, '')
+        if rows:
+            placeholders = ', '.join('?' for _ in rows)
+            self.db.execute(f'DELETE FROM {table} WHERE id IN ({placeholders})', [row['id'] for row in rows])
+            self.db.commit()
+        if 'return=minimal' in prefer:
+            return 204, None, {}
+        return 200, rows, {}
+
+    def returning(self, table, params, prefer, ids, status=200):
+        if 'return=minimal' in prefer:
+            return (201 if status == 201 else 204), None, {}
+        if not ids:
+            return status, [], {}
+        columns = self.select_columns(table, params)
+        placeholders = ', '.join('?' for _ in ids)
+        rows = self.db.execute(f'SELECT {", ".join(columns)} FROM {table} WHERE id IN ({placeholders}) ORDER BY id', ids)
+        return status, [self.serialize(row, columns) for row in rows], {}
+
+
+# RPC functions: Python equivalents of supabase/migrations/*_items_functions.sql.
+# Each takes the server and the JSON arguments and runs under the server lock.
+
+FIND_COLUMNS = ('id', 'name', 'description', 'price', 'created_at', 'updated_at', 'is_active')
+UPSERT_FIELDS = ('name', 'description', 'price', 'is_active')
+
+
+def rpc_items_find(fake, args):
+    term = normalize_search_text(args.get('search_term'))
+    match = args.get('search_match') or 'contains'
+    if match == 'exact':
+        condition, pattern = '=', term
+    else:
+        # GLOB is the case-sensitive LIKE; the term's own metacharacters match literally
+        literal = re.sub(r'([*?[])', r'[\1]', term)
+        condition, pattern = 'GLOB', (literal + '*' if match == 'prefix' else f'*{literal}*')
+    tables = ['items'] + (['items_archive'] if args.get('include_archived') else [])
+    parts, params = [], []
+    for table in tables:
+        sql = f'SELECT {", ".join(FIND_COLUMNS)} FROM {table} WHERE deleted_at IS NULL'
+        if term:
+            sql += f' AND (name_search {condition} ? OR description_search {condition} ?)'
+            params += [pattern, pattern]
+        parts.append(sql)
+    matches = ' UNION ALL '.join(parts)
+    total = fake.db.execute(f'SELECT COUNT(*) FROM ({matches})', params).fetchone()[0]
+
+    where = ''
+    if args.get('after_id') is not None:
+        where = ' WHERE created_at < ? OR (created_at = ? AND id < ?)'
+        params += [args['after_created_at'], args['after_created_at'], args['after_id']]
+    limit = args.get('page_limit')
+    rows = fake.db.execute(
+        f'SELECT * FROM ({matches}){where} ORDER BY created_at DESC, id DESC LIMIT ? OFFSET ?',
+        params + [-1 if limit is None else limit, args.get('page_offset') or 0],
+    )
+    return {'items': [fake.serialize(row, FIND_COLUMNS) for row in rows], 'total': total}
+
+
+def rpc_items_upsert(fake, args):
+    results = []
+    try:
+        for entry in args.get('payload') or []:
+            values = {key: entry[key] for key in UPSERT_FIELDS if key in entry}
+            if 'is_active' in values:
+                values['is_active'] = int(bool(values['is_active']))
+            if 'id' in entry:
+                values['updated_at'] = now_iso()
+                assignments = ', '.join(f'{column} = ?' for column in values)
+                cursor = fake.db.execute(
+                    f'UPDATE items SET {assignments} WHERE id = ? AND deleted_at IS NULL',
+                    list(values.values()) + [entry['id']],
+                )
+                if not cursor.rowcount:
+                    results.append(None)
+                    continue
+                item_id = entry['id']
+            else:
+                if values.get('name') is None:
+                    raise PostgrestError(400, 'null value in column "name" violates not-null constraint', '23502')
+                values.setdefault('description', '')
+                values['created_at'] = values['updated_at'] = now_iso()
+                columns = list(values)
+                cursor = fake.db.execute(
+                    f'INSERT INTO items ({", ".join(columns)}) VALUES ({", ".join("?" for _ in columns)})',
+                    list(values.values()),
+                )
+                item_id = cursor.lastrowid
+            row = fake.db.execute('SELECT * FROM items WHERE id = ?', [item_id]).fetchone()
+            results.append(fake.serialize(row, ITEM_COLUMNS))
+    except Exception:
+        # The SQL function runs in one transaction
+        fake.db.rollback()
+        raise
+    fake.db.commit()
+    return results
+
+
+def rpc_items_stats(fake, args):
+    row = fake.db.execute(
+        'SELECT COUNT(*) AS total, SUM(is_active = 1) AS active, SUM(is_active = 0) AS inactive, '
+        'MIN(price) AS min_price, MAX(price) AS max_price, ROUND(AVG(price), 2) AS avg_price, '
+        'MAX(created_at) AS newest_created_at FROM items WHERE deleted_at IS NULL'
+    ).fetchone()
+    stats = dict(row)
+    stats['active'] = stats['active'] or 0
+    stats['inactive'] = stats['inactive'] or 0
+    stats['deleted'] = fake.db.execute('SELECT COUNT(*) FROM items WHERE deleted_at IS NOT NULL').fetchone()[0]
+    stats['archived'] = fake.db.execute('SELECT COUNT(*) FROM items_archive WHERE deleted_at IS NULL').fetchone()[0]
+    return stats
+
+
+RPC_FUNCTIONS = {
+    'items_find': rpc_items_find,
+    'items_upsert': rpc_items_upsert,
+    'items_stats': rpc_items_stats,
+}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    fake = None
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def _dispatch(self):
+        url = urlsplit(self.path)
+        params = parse_qsl(url.query, keep_blank_values=True)
+        length = int(self.headers.get('Content-Length') or 0)
+        raw = self.rfile.read(length) if length else b''
+
+        if not self.fake.inject_faults():
+            # Simulate a dropped connection
+            self.close_connection = True
+            self.connection.close()
+            return
+
+        try:
+            body = json.loads(raw) if raw else None
+            status, payload, headers = self.fake.handle(self.command, url.path, params, self.headers, body)
+        except PostgrestError as e:
+            status, headers = e.status, {}
+            payload = {'code': e.code, 'message': str(e), 'details': None, 'hint': None}
+        except (ValueError, sqlite3.Error) as e:
+            status, headers = 400, {}
+            payload = {'code': 'PGRST100', 'message': str(e), 'details': None, 'hint': None}
+
+        data = json.dumps(payload).encode() if payload is not None else b''
+        try:
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+            self.send_header('Content-Length', str(len(data)))
+            for key, value in headers.items():
+                self.send_header(key, value)
+            self.end_headers()
+            if self.command != 'HEAD':
+                self.wfile.write(data)
+        except ConnectionError:
+            # The client gave up (timed out, or a hedge won) before the reply
+            self.close_connection = True
+
+    do_GET = do_HEAD = do_POST = do_PATCH = do_DELETE = _dispatch
@@ -0,0 +1,102 @@
+import codecs
+import csv
+import json
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from .schema import ITEM_SCHEMA
+
+IMPORT_FORMATS = ('csv', 'ndjson')
+DEFAULT_CHUNK_SIZE = 500
+MAX_CHUNK_SIZE = 5000
+MAX_REPORTED_REJECTS = 100
+
+
+def iter_records(stream: Iterable[bytes], fmt: str) -> Iterator[Tuple[int, object]]:
+    """
+    Lazily parse a byte stream of CSV or NDJSON into (line_number, record) pairs.
+
+    Only one line is held at a time, so memory use does not depend on input size.
+    A record that cannot be parsed is yielded as a ValueError instead of a dict.
+    """
+    lines = codecs.iterdecode(stream, 'utf-8-sig')
+
+    if fmt == 'csv':
+        reader = csv.DictReader(lines)
+        for record in reader:
+            yield reader.line_num, record
+        return
+
+    for line_number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            yield line_number, json.loads(line)
+        except json.JSONDecodeError as e:
+            yield line_number, ValueError(f'Invalid JSON: {e.msg}')
+
+
+class ItemImporter:
+    """
+    Stream records into the active service in chunked bulk inserts.
+
+    Rows are buffered up to ``chunk_size``, cleaned together against the
+    item schema and the valid ones written with one ``bulk_create_items``
+    call; rejected rows are counted and the first ``MAX_REPORTED_REJECTS``
+    are kept with their line number and reason.
+    """
+
+    def __init__(self, service, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                 progress: Optional[Callable[[Dict], None]] = None):
+        self.service = service
+        self.chunk_size = chunk_size
+        self.progress = progress
+        self.processed = 0
+        self.created = 0
+        self.rejected_count = 0
+        self.rejected: List[Dict] = []
+
+    def run(self, records: Iterable[Tuple[int, object]]) -> Dict:
+        chunk: List[Tuple[int, object]] = []
+
+        for line_number, record in records:
+            self.processed += 1
+            chunk.append((line_number, record))
+            if len(chunk) >= self.chunk_size:
+                self._flush(chunk)
+                chunk = []
+
+        if chunk:
+            self._flush(chunk)
+        return self.summary()
+
+    def summary(self) -> Dict:
+        return {
+            'processed': self.processed,
+            'created': self.created,
+            'rejected_count': self.rejected_count,
+            'rejected': self.rejected,
+        }
+
+    def _flush(self, chunk: List[Tuple[int, object]]):
+        # Rows that failed to parse are rejected as-is; the rest are cleaned
+        # together so invalid rows never reach the database
+        rejected = [(line_number, str(record)) for line_number, record in chunk if isinstance(record, ValueError)]
+        parsed = [(line_number, record) for line_number, record in chunk if not isinstance(record, ValueError)]
+        valid, invalid = ITEM_SCHEMA.clean_many([record for _, record in parsed])
+        rejected.extend((parsed[index][0], error) for index, error in invalid)
+        for line_number, error in sorted(rejected):
+            self._reject(line_number, error)
+
+        if valid:
+            try:
+                self.created += self.service.bulk_create_items([row for _, row in valid])
+            except Exception as e:
+                # The whole chunk failed in the database; report each of its rows
+                for index, _ in valid:
+                    self._reject(parsed[index][0], str(e))
+        if self.progress:
+            self.progress(self.summary())
+
+    def _reject(self, line_number: int, error: str):
+        self.rejected_count += 1
+        if len(self.rejected) < MAX_REPORTED_REJECTS:
+            self.rejected.append({'line': line_number, 'error': error})
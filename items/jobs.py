@@ -0,0 +1,326 @@
+import csv
+import json
+import os
+import re
+import socket
+import time
+import uuid
+from datetime import timedelta
+from typing import Callable, Dict, Optional
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.utils import timezone
+
+from .importer import IMPORT_FORMATS, MAX_CHUNK_SIZE
+from .models import Job, ItemCounter
+
+# Seconds between progress writes (each also refreshes the heartbeat and
+# picks up cancellation)
+PROGRESS_INTERVAL = 0.5
+# A running job whose heartbeat is older than this is assumed orphaned
+STALE_AFTER = timedelta(minutes=5)
+EXPORT_FORMATS = ('csv', 'ndjson')
+EXPORT_PAGE_SIZE = 1000
+UPLOAD_TOKEN = re.compile(r'upload-[0-9a-f]{32}\.[a-z]+')
+
+JOB_TYPES: Dict[str, Callable] = {}
+# Parameters clients may set for each kind, with the validator of each;
+# anything else is rejected
+JOB_PARAMS: Dict[str, Dict[str, Callable]] = {}
+# Kinds that consume an upload staged by the server (see stage_upload)
+UPLOAD_JOB_TYPES = set()
+
+
+class JobCancelled(Exception):
+    """Raised inside a job handler once cancellation has been requested."""
+
+
+def choice(*choices) -> Callable:
+    """Validator accepting one of ``choices``."""
+    def validate(name, value):
+        if value not in choices:
+            raise ValueError(f'{name} must be one of: {", ".join(choices)}')
+        return value
+    return validate
+
+
+def integer(minimum: int, maximum: Optional[int] = None) -> Callable:
+    """Validator accepting an integer (or a string of one) within the bounds."""
+    def validate(name, value):
+        try:
+            if isinstance(value, bool) or not isinstance(value, (int, str)):
+                raise ValueError
+            number = int(value)
+        except ValueError:
+            number = None
+        if number is None or number < minimum or (maximum is not None and number > maximum):
+            bounds = f'between {minimum} and {maximum}' if maximum is not None else f'of at least {minimum}'
+            raise ValueError(f'{name} must be an integer {bounds}')
+        return number
+    return validate
+
+
+def flag(name, value) -> bool:
+    """Validator accepting a boolean or the strings 'true'/'false'."""
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, str) and value.lower() in ('true', 'false'):
+        return value.lower() == 'true'
+    raise ValueError(f'{name} must be true or false')
+
+
+def job_type(name: str, params: Optional[Dict[str, Callable]] = None, upload: bool = False):
+    """
+    Register a handler ``fn(params, context) -> result dict`` under ``name``.
+    ``params`` maps the parameters the job accepts to validators
+    ``validate(name, value) -> value``; with ``upload`` the job also needs a
+    staged upload token, which only the server can supply.
+    """
+    def register(fn):
+        JOB_TYPES[name] = fn
+        JOB_PARAMS[name] = params or {}
+        if upload:
+            UPLOAD_JOB_TYPES.add(name)
+        return fn
+    return register
+
+
+class JobContext:
+    """
+    Handed to a running job handler for progress reporting and cancellation.
+    """
+
+    def __init__(self, job: Job):
+        self.job = job
+        self.last_write = 0.0
+
+    def progress(self, force: bool = False, **values):
+        """
+        Record progress; at most every PROGRESS_INTERVAL seconds unless forced.
+        Raises JobCancelled when cancellation has been requested.
+        """
+        self.job.progress.update(values)
+        now = time.monotonic()
+        if not force and now - self.last_write < PROGRESS_INTERVAL:
+            return
+        self.last_write = now
+        Job.objects.filter(id=self.job.id).update(progress=self.job.progress, heartbeat_at=timezone.now())
+        if Job.objects.filter(id=self.job.id, cancel_requested=True).exists():
+            raise JobCancelled()
+
+
+def job_file(name: str) -> str:
+    """Path of a job input/output file under JOB_FILES_DIR."""
+    os.makedirs(settings.JOB_FILES_DIR, exist_ok=True)
+    return os.path.join(settings.JOB_FILES_DIR, name)
+
+
+def stage_upload(chunks, suffix: str) -> str:
+    """
+    Write an upload under JOB_FILES_DIR and return its token (the file name).
+    """
+    token = f'upload-{uuid.uuid4().hex}.{suffix}'
+    with open(job_file(token), 'wb') as staged:
+        for chunk in chunks:
+            staged.write(chunk)
+    return token
+
+
+def staged_upload_path(token) -> str:
+    """
+    Path of a staged upload; raises ValueError unless the token names a file
+    directly inside JOB_FILES_DIR.
+    """
+    if not isinstance(token, str) or not UPLOAD_TOKEN.fullmatch(token):
+        raise ValueError('Invalid upload token')
+    root = os.path.realpath(settings.JOB_FILES_DIR)
+    path = os.path.realpath(os.path.join(root, token))
+    if os.path.dirname(path) != root:
+        raise ValueError('Invalid upload token')
+    return path
+
+
+def enqueue(kind: str, params: Optional[Dict] = None, upload: Optional[str] = None) -> Job:
+    """
+    Queue a job for the worker.
+    
+    Raises ValueError for an unknown kind, a parameter the kind does not
+    accept or an invalid value, or a missing upload token. Parameters are
+    stored as their validators return them. ``upload`` comes from
+    stage_upload, never from the client.
+    """
+    if kind not in JOB_TYPES:
+        raise ValueError(f'kind must be one of: {", ".join(sorted(JOB_TYPES))}')
+    if params is not None and not isinstance(params, dict):
+        raise ValueError('params must be an object')
+    params = dict(params or {})
+    unknown = sorted(set(params) - set(JOB_PARAMS[kind]))
+    if unknown:
+        accepted = ', '.join(JOB_PARAMS[kind]) or 'none'
+        raise ValueError(f'Unknown params for {kind} jobs: {", ".join(unknown)} (accepted: {accepted})')
+    params = {name: JOB_PARAMS[kind][name](name, value) for name, value in params.items()}
+    if kind in UPLOAD_JOB_TYPES:
+        if upload is None:
+            raise ValueError(f'{kind} jobs are created by uploading the file')
+        staged_upload_path(upload)
+        params['upload'] = upload
+    return Job.objects.create(kind=kind, params=params)
+
+
+def cancel(job_id: int) -> Optional[Job]:
+    """
+    Cancel a queued job at once, or ask a running one to stop at its next
+    progress report. Returns the job, or None if it does not exist.
+    """
+    # Conditional updates, so a concurrent claim or progress write is not overwritten
+    now = timezone.now()
+    if not Job.objects.filter(id=job_id, status=Job.QUEUED).update(
+        status=Job.CANCELLED, cancel_requested=True, finished_at=now
+    ):
+        Job.objects.filter(id=job_id, status=Job.RUNNING).update(cancel_requested=True)
+    return Job.objects.filter(id=job_id).first()
+
+
+def claim_next(worker: str) -> Optional[Job]:
+    """
+    Atomically move the oldest queued job to running for this worker.
+    """
+    while True:
+        job = Job.objects.filter(status=Job.QUEUED).order_by('created_at', 'id').first()
+        if job is None:
+            return None
+        now = timezone.now()
+        # Conditional update: another worker may have claimed it first
+        claimed = Job.objects.filter(id=job.id, status=Job.QUEUED).update(
+            status=Job.RUNNING, worker=worker, started_at=now, heartbeat_at=now
+        )
+        if claimed:
+            return job
+
+
+def fail_orphaned() -> int:
+    """
+    Mark running jobs whose worker stopped heartbeating as failed.
+    Jobs are not retried automatically since imports are not idempotent.
+    """
+    return Job.objects.filter(
+        status=Job.RUNNING, heartbeat_at__lt=timezone.now() - STALE_AFTER
+    ).update(status=Job.FAILED, error='Worker stopped while running the job', finished_at=timezone.now())
+
+
+def run_job(job_id: int) -> str:
+    """
+    Run one claimed job to completion and record the outcome.
+    Returns the final status.
+    """
+    close_old_connections()
+    job = Job.objects.get(id=job_id)
+    context = JobContext(job)
+    try:
+        fields = {'status': Job.SUCCEEDED, 'result': JOB_TYPES[job.kind](job.params, context)}
+    except JobCancelled:
+        fields = {'status': Job.CANCELLED}
+    except Exception as e:
+        fields = {'status': Job.FAILED, 'error': str(e) or e.__class__.__name__}
+    fields['finished_at'] = timezone.now()
+    Job.objects.filter(id=job_id).update(progress=job.progress, **fields)
+    close_old_connections()
+    return fields['status']
+
+
+def worker_name() -> str:
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+@job_type('import', params={'format': choice(*IMPORT_FORMATS), 'chunk_size': integer(1, MAX_CHUNK_SIZE)}, upload=True)
+def import_items(params: Dict, context: JobContext) -> Dict:
+    """
+    Import a staged CSV/NDJSON upload (params: format, chunk_size).
+    """
+    from .importer import DEFAULT_CHUNK_SIZE, ItemImporter, iter_records
+    from .views import get_service
+
+    service, _ = get_service()
+    fmt = params.get('format', 'csv')
+
+    def report(summary):
+        context.progress(**{key: value for key, value in summary.items() if key != 'rejected'})
+
+    importer = ItemImporter(service, chunk_size=params.get('chunk_size', DEFAULT_CHUNK_SIZE), progress=report)
+    path = staged_upload_path(params.get('upload'))
+    try:
+        with open(path, 'rb') as stream:
+            return importer.run(iter_records(stream, fmt))
+    finally:
+        # Staged uploads are removed once consumed
+        if os.path.exists(path):
+            os.remove(path)
+
+
+@job_type('export', params={'format': choice(*EXPORT_FORMATS), 'include_archived': flag})
+def export_items(params: Dict, context: JobContext) -> Dict:
+    """
+    Write every item to a CSV/NDJSON file under JOB_FILES_DIR (params: format,
+    include_archived). Pages through the items with keyset cursors, so memory stays flat.
+    """
+    from .views import get_service
+
+    service, _ = get_service()
+    fmt = params.get('format', 'csv')
+    include_archived = flag('include_archived', params.get('include_archived', False))
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f'format must be one of: {", ".join(EXPORT_FORMATS)}')
+
+    path = job_file(f'export-{context.job.id}.{fmt}')
+    rows = 0
+    cursor = None
+    try:
+        with open(path, 'w', newline='', encoding='utf-8') as out:
+            writer = None
+            while True:
+                items = service.get_all_items(limit=EXPORT_PAGE_SIZE, cursor=cursor, include_archived=include_archived)
+                for item in items:
+                    if fmt == 'csv':
+                        if writer is None:
+                            writer = csv.DictWriter(out, fieldnames=list(item))
+                            writer.writeheader()
+                        writer.writerow(item)
+                    else:
+                        out.write(json.dumps(item) + '\n')
+                rows += len(items)
+                context.progress(rows=rows)
+                if len(items) < EXPORT_PAGE_SIZE:
+                    break
+                cursor = (items[-1]['created_at'], items[-1]['id'])
+    except BaseException:
+        # No partial exports are left behind on failure or cancellation
+        os.remove(path)
+        raise
+    return {'rows': rows, 'path': path, 'format': fmt}
+
+
+@job_type('refresh_counter')
+def refresh_counter(params: Dict, context: JobContext) -> Dict:
+    """
+    Recount the items table into the maintained ItemCounter.
+    """
+    return {'count': ItemCounter.refresh()}
+
+
+@job_type('archive', params={'inactive_days': integer(0), 'batch_size': integer(1)})
+def archive(params: Dict, context: JobContext) -> Dict:
+    """
+    Move soft-deleted and long-inactive items to items_archive
+    (params: inactive_days, batch_size).
+    """
+    from .archive import DEFAULT_BATCH_SIZE, archive_items
+    from .views import get_service
+
+    service, _ = get_service()
+    return archive_items(
+        service,
+        inactive_days=params.get('inactive_days'),
+        batch_size=params.get('batch_size', DEFAULT_BATCH_SIZE),
+        progress=lambda summary: context.progress(archived=summary['archived'], batches=summary['batches']),
+    )
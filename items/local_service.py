@@ -1,7 +1,17 @@
-from typing import List, Dict, Optional
-from .models import Item
+from datetime import datetime
+from typing import List, Dict, Optional, Tuple
+from django.db import transaction
+from django.db.models import Avg, Count, Max, Min, Q
+from django.utils.dateparse import parse_datetime
+from .models import Item, ItemArchive, ItemCounter
+from .archive import merge_pages
+from .batch import operation_result
+from .search import SEARCH_COLUMNS, normalize_search_text
 from django.utils import timezone
 
+# Upper bound of a prefix range: sorts after every continuation of the prefix
+PREFIX_END = '\U0010ffff'
+
 class LocalService:
     """
     Local database service for CRUD operations when Supabase is not available.
@@ -17,30 +27,51 @@ class LocalService:
             if 'id' in item_data:
                 del item_data['id']
             
-            # Create the item
-            item = Item.objects.create(**item_data)
+            # Create the item and keep the maintained count in step
+            with transaction.atomic():
+                item = Item.objects.create(**item_data)
+                ItemCounter.adjust(1)
             
             return item.to_dict()
                 
         except Exception as e:
             raise Exception(f"Error creating item: {str(e)}")
     
-    def get_all_items(self) -> List[Dict]:
+    def bulk_create_items(self, items: List[Dict]) -> int:
+        """
+        Insert many items with a single multi-row INSERT in local database.
+        Returns the number of items created.
+        """
+        try:
+            objects = [Item(**{key: value for key, value in item_data.items() if key != 'id'}) for item_data in items]
+            with transaction.atomic():
+                Item.objects.bulk_create(objects)
+                ItemCounter.adjust(len(objects))
+            return len(objects)
+            
+        except Exception as e:
+            raise Exception(f"Error creating items: {str(e)}")
+    
+    def get_all_items(self, limit: Optional[int] = None, offset: int = 0,
+                      cursor: Optional[Tuple[str, int]] = None, include_archived: bool = False) -> List[Dict]:
         """
-        Retrieve all items from local database.
+        Retrieve all items from local database, optionally one page at a time.
+        A cursor of (created_at, id) continues after the last item of the previous page.
         """
         try:
-            items = Item.objects.all().order_by('-created_at')
-            return [item.to_dict() for item in items]
+            archived = self._archived() if include_archived else None
+            return self._read(Item.objects.all(), archived, limit, offset, cursor)
         except Exception as e:
             raise Exception(f"Error fetching items: {str(e)}")
     
-    def get_item_by_id(self, item_id: int) -> Optional[Dict]:
+    def get_item_by_id(self, item_id: int, include_archived: bool = False) -> Optional[Dict]:
         """
         Retrieve a specific item by ID from local database.
         """
         try:
             item = Item.objects.filter(id=item_id).first()
+            if item is None and include_archived:
+                item = self._archived().filter(id=item_id).first()
             return item.to_dict() if item else None
             
         except Exception as e:
@@ -55,16 +86,17 @@ class LocalService:
             if 'id' in item_data:
                 del item_data['id']
             
-            # Update the item
-            item = Item.objects.filter(id=item_id).first()
-            if not item:
-                return None
-            
-            for key, value in item_data.items():
-                setattr(item, key, value)
-            
-            item.updated_at = timezone.now()
-            item.save()
+            # Read and update on the same (primary) connection
+            with transaction.atomic():
+                item = Item.objects.filter(id=item_id).first()
+                if not item:
+                    return None
+                
+                for key, value in item_data.items():
+                    setattr(item, key, value)
+                
+                item.updated_at = timezone.now()
+                item.save()
             
             return item.to_dict()
             
@@ -73,30 +105,202 @@ class LocalService:
     
     def delete_item(self, item_id: int) -> bool:
         """
-        Delete an item from local database.
+        Soft-delete an item in local database; archive_batch removes it later.
         """
         try:
-            item = Item.objects.filter(id=item_id).first()
-            if not item:
-                return False
-            
-            item.delete()
+            with transaction.atomic():
+                if not Item.objects.filter(id=item_id).update(deleted_at=timezone.now()):
+                    return False
+                ItemCounter.adjust(-1)
             return True
             
         except Exception as e:
             raise Exception(f"Error deleting item: {str(e)}")
     
-    def search_items(self, search_term: str) -> List[Dict]:
+    def search_items(self, search_term: str, limit: Optional[int] = None, offset: int = 0,
+                     cursor: Optional[Tuple[str, int]] = None, include_archived: bool = False,
+                     match: str = 'contains') -> List[Dict]:
         """
         Search items by name or description in local database.
+        The term is normalized and matched against the maintained search columns.
+        """
+        try:
+            archived = self._search_queryset(search_term, self._archived(), match) if include_archived else None
+            return self._read(self._search_queryset(search_term, match=match), archived, limit, offset, cursor)
+        except Exception as e:
+            raise Exception(f"Error searching items: {str(e)}")
+    
+    def count_items(self, search_term: Optional[str] = None, mode: str = 'exact',
+                    include_archived: bool = False, match: str = 'contains') -> Optional[int]:
+        """
+        Count items (optionally matching a search term) in local database.
+        
+        'estimated' reads the maintained counter table for the whole table; a
+        counter cannot track arbitrary search predicates, so filtered counts
+        are always exact.
         """
         try:
-            items = Item.objects.filter(
-                name__icontains=search_term
-            ) | Item.objects.filter(
-                description__icontains=search_term
+            if mode == 'none':
+                return None
+            if search_term:
+                total = self._search_queryset(search_term, match=match).count()
+                if include_archived:
+                    total += self._search_queryset(search_term, self._archived(), match).count()
+                return total
+            if mode == 'estimated':
+                total = ItemCounter.current()
+                if include_archived:
+                    total += ItemCounter.current('items_archive')
+                return total
+            total = Item.objects.count()
+            if include_archived:
+                total += self._archived().count()
+            return total
+        except Exception as e:
+            raise Exception(f"Error counting items: {str(e)}")
+    
+    def find_items(self, search_term: Optional[str] = None, limit: Optional[int] = None, offset: int = 0,
+                   cursor: Optional[Tuple[str, int]] = None, count_mode: str = 'none',
+                   include_archived: bool = False, match: str = 'contains') -> Tuple[List[Dict], Optional[int]]:
+        """
+        Retrieve a page of items (optionally matching a search term) and their count.
+        """
+        if search_term:
+            items = self.search_items(search_term, limit, offset, cursor, include_archived, match)
+        else:
+            items = self.get_all_items(limit, offset, cursor, include_archived)
+        return items, self.count_items(search_term, mode=count_mode, include_archived=include_archived, match=match)
+    
+    def upsert_items(self, rows: List[Dict]) -> List[Optional[Dict]]:
+        """
+        Create items without an id and update those with one, in one transaction.
+        Returns the saved items in input order, with None for ids that were not found.
+        """
+        try:
+            with transaction.atomic():
+                return [
+                    self.update_item(row['id'], dict(row)) if 'id' in row else self.create_item(dict(row))
+                    for row in rows
+                ]
+        except Exception as e:
+            raise Exception(f"Error saving items: {str(e)}")
+    
+    def item_stats(self) -> Dict:
+        """
+        Summary statistics (counts, price range, newest item) of local database.
+        """
+        try:
+            stats = Item.objects.aggregate(
+                total=Count('id'),
+                active=Count('id', filter=Q(is_active=True)),
+                inactive=Count('id', filter=Q(is_active=False)),
+                min_price=Min('price'),
+                max_price=Max('price'),
+                avg_price=Avg('price'),
+                newest_created_at=Max('created_at'),
             )
+            for key in ('min_price', 'max_price', 'avg_price'):
+                if stats[key] is not None:
+                    stats[key] = round(float(stats[key]), 2)
+            if stats['newest_created_at'] is not None:
+                stats['newest_created_at'] = stats['newest_created_at'].isoformat()
+            stats['deleted'] = Item.all_objects.filter(deleted_at__isnull=False).count()
+            stats['archived'] = self._archived().count()
+            return stats
+        except Exception as e:
+            raise Exception(f"Error computing item statistics: {str(e)}")
+    
+    def execute_batch(self, operations: List[Dict]) -> List[Dict]:
+        """
+        Run an ordered list of create/update/delete/get operations in one transaction.
+        Any failure rolls back every operation in the batch.
+        """
+        try:
+            results = []
+            with transaction.atomic():
+                for operation in operations:
+                    op = operation['op']
+                    if op == 'create':
+                        value = self.create_item(dict(operation['data']))
+                    elif op == 'update':
+                        value = self.update_item(operation['id'], dict(operation['data']))
+                    elif op == 'delete':
+                        value = self.delete_item(operation['id'])
+                    else:
+                        value = self.get_item_by_id(operation['id'])
+                    results.append(operation_result(operation, value))
+            return results
             
-            return [item.to_dict() for item in items.order_by('-created_at')]
         except Exception as e:
-            raise Exception(f"Error searching items: {str(e)}") 
\ No newline at end of file
+            raise Exception(f"Error executing batch: {str(e)}")
+    
+    def archive_batch(self, inactive_before: datetime, limit: int, after_id: int = 0) -> Tuple[int, Optional[int]]:
+        """
+        Move up to `limit` soft-deleted items, or inactive items last updated
+        before `inactive_before`, with ids above `after_id` into items_archive.
+        Returns (items moved, highest id examined); the id is None when no
+        candidates are left.
+        """
+        try:
+            with transaction.atomic():
+                items = list(
+                    Item.all_objects.select_for_update(skip_locked=True)
+                    .filter(Q(deleted_at__isnull=False) | Q(is_active=False, updated_at__lt=inactive_before),
+                            id__gt=after_id)
+                    .order_by('id')[:limit]
+                )
+                if not items:
+                    return 0, None
+                
+                archived_at = timezone.now()
+                ItemArchive.objects.bulk_create([ItemArchive.from_item(item, archived_at) for item in items])
+                Item.all_objects.filter(id__in=[item.id for item in items]).delete()
+                # Soft-deleted items already left the 'items' count
+                live = sum(1 for item in items if item.deleted_at is None)
+                if live:
+                    ItemCounter.adjust(-live)
+                    ItemCounter.adjust(live, 'items_archive')
+            return len(items), items[-1].id
+            
+        except Exception as e:
+            raise Exception(f"Error archiving items: {str(e)}")
+    
+    def _read(self, queryset, archived, limit, offset, cursor):
+        if archived is None:
+            return [item.to_dict() for item in self._page(queryset, limit, offset, cursor)]
+        # Each table supplies the whole window up to offset + limit; the merge keeps the page
+        window = None if limit is None else offset + limit
+        hot = [item.to_dict() for item in self._page(queryset, window, 0, cursor)]
+        cold = [item.to_dict() for item in self._page(archived, window, 0, cursor)]
+        return merge_pages(hot, cold, limit, offset)
+    
+    def _page(self, queryset, limit, offset, cursor):
+        # Newest first; id breaks ties so keyset cursors are stable
+        queryset = queryset.order_by('-created_at', '-id')
+        if cursor:
+            created_at, item_id = parse_datetime(cursor[0]), cursor[1]
+            queryset = queryset.filter(
+                Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=item_id)
+            )
+        if limit is not None:
+            queryset = queryset[offset:offset + limit]
+        return queryset
+    
+    def _search_queryset(self, search_term: str, queryset=None, match: str = 'contains'):
+        if queryset is None:
+            queryset = Item.objects.all()
+        term = normalize_search_text(search_term)
+        condition = Q()
+        for column in SEARCH_COLUMNS.values():
+            if match == 'exact':
+                condition |= Q(**{column: term})
+            elif match == 'prefix':
+                # A range rather than LIKE 'term%', which SQLite only serves from NOCASE indexes
+                condition |= Q(**{f'{column}__gte': term, f'{column}__lt': term + PREFIX_END})
+            else:
+                condition |= Q(**{f'{column}__contains': term})
+        return queryset.filter(condition)
+    
+    def _archived(self):
+        # Archived items that were deleted stay hidden from include_archived reads
+        return ItemArchive.objects.filter(deleted_at__isnull=True)
@@ -0,0 +1,168 @@
+import random
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from supabase_crud.routers import pinned_to_primary, reading_primary
+
+
+class NegativeLookupCache:
+    """
+    Bounded TTL set of item ids known not to exist.
+
+    Entries expire after ``ttl`` seconds, so an id created by another worker
+    process is found again within that window. A ``verify_rate`` fraction
+    of hits is still checked against the backend, which measures how often
+    a cached "missing" answer was wrong (the false-positive rate).
+    """
+
+    def __init__(self, ttl: float, max_entries: int, verify_rate: float = 0.0):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.verify_rate = verify_rate
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.counters = {
+            'lookups': 0,
+            'hits': 0,
+            'verified': 0,
+            'false_positives': 0,
+            'invalidations': 0,
+        }
+
+    def contains(self, item_id: int) -> bool:
+        with self.lock:
+            self.counters['lookups'] += 1
+            expires = self.entries.get(item_id)
+            if expires is None:
+                return False
+            if expires < time.monotonic():
+                del self.entries[item_id]
+                return False
+            self.counters['hits'] += 1
+            return True
+
+    def should_verify(self) -> bool:
+        return self.verify_rate > 0 and random.random() < self.verify_rate
+
+    def record_verification(self, item_id: int, existed: bool):
+        with self.lock:
+            self.counters['verified'] += 1
+            if existed:
+                self.counters['false_positives'] += 1
+                self.entries.pop(item_id, None)
+
+    def add(self, item_id: int):
+        with self.lock:
+            self.entries.pop(item_id, None)
+            self.entries[item_id] = time.monotonic() + self.ttl
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def discard(self, item_id: int):
+        with self.lock:
+            if self.entries.pop(item_id, None) is not None:
+                self.counters['invalidations'] += 1
+
+    def clear(self):
+        with self.lock:
+            self.counters['invalidations'] += len(self.entries)
+            self.entries.clear()
+
+    def stats(self) -> Dict:
+        with self.lock:
+            data = dict(self.counters)
+            data['entries'] = len(self.entries)
+        data['hit_rate'] = round(data['hits'] / data['lookups'], 4) if data['lookups'] else None
+        data['false_positive_rate'] = (
+            round(data['false_positives'] / data['verified'], 4) if data['verified'] else None
+        )
+        return data
+
+
+class NegativeCachingService:
+    """
+    Wrap an items service so lookups of missing ids skip the backend.
+
+    Misses from get/update/delete are remembered; creates and deletes keep
+    the set current in this process. Bulk inserts do not return ids, so they
+    clear it. Every other method is passed through unchanged.
+
+    With read replicas, only misses read on the primary are remembered, and
+    clients inside their read-your-writes window bypass the set.
+    """
+
+    def __init__(self, service, cache: NegativeLookupCache):
+        self.service = service
+        self.negative_cache = cache
+
+    def __getattr__(self, name):
+        return getattr(self.service, name)
+
+    def get_item_by_id(self, item_id: int, include_archived: bool = False) -> Optional[Dict]:
+        if include_archived:
+            # Archived items are absent from the hot table, so the set does not apply
+            return self.service.get_item_by_id(item_id, include_archived=True)
+        cache = self.negative_cache
+        if pinned_to_primary():
+            # Read-your-writes: the client may have created the item through
+            # another worker process, whose create did not reach this cache
+            item = self.service.get_item_by_id(item_id)
+            if item is not None:
+                cache.discard(item_id)
+            return item
+        if cache.contains(item_id):
+            if not cache.should_verify():
+                return None
+            item = self.service.get_item_by_id(item_id)
+            cache.record_verification(item_id, item is not None)
+            return item
+
+        item = self.service.get_item_by_id(item_id)
+        # A miss on a read replica may only be replication lag
+        if item is None and reading_primary():
+            cache.add(item_id)
+        return item
+
+    def create_item(self, item_data: Dict) -> Dict:
+        item = self.service.create_item(item_data)
+        self.negative_cache.discard(item['id'])
+        return item
+
+    def bulk_create_items(self, items: List[Dict]) -> int:
+        created = self.service.bulk_create_items(items)
+        self.negative_cache.clear()
+        return created
+
+    def update_item(self, item_id: int, item_data: Dict) -> Optional[Dict]:
+        item = self.service.update_item(item_id, item_data)
+        if item is None:
+            self.negative_cache.add(item_id)
+        return item
+
+    def delete_item(self, item_id: int) -> bool:
+        deleted = self.service.delete_item(item_id)
+        self.negative_cache.add(item_id)
+        return deleted
+
+    def upsert_items(self, rows: List[Dict]) -> List[Optional[Dict]]:
+        saved = self.service.upsert_items(rows)
+        cache = self.negative_cache
+        for row, item in zip(rows, saved):
+            if item is not None:
+                cache.discard(item['id'])
+            else:
+                cache.add(row['id'])
+        return saved
+
+    def execute_batch(self, operations: List[Dict]) -> List[Dict]:
+        results = self.service.execute_batch(operations)
+        cache = self.negative_cache
+        for result in results:
+            if result['op'] == 'create':
+                if result['success']:
+                    cache.discard(result['data']['id'])
+            elif result['op'] == 'delete' or not result['success']:
+                cache.add(result['id'])
+        return results
@@ -0,0 +1,41 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from items.archive import DEFAULT_BATCH_SIZE, archive_items
+from items.views import get_service
+
+
+class Command(BaseCommand):
+    help = 'Move soft-deleted and long-inactive items from the items table to items_archive'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--inactive-days',
+            type=int,
+            default=settings.ARCHIVE_INACTIVE_DAYS,
+            help=f'Archive inactive items not updated for this many days (default: {settings.ARCHIVE_INACTIVE_DAYS})'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+            help=f'Items moved per batch (default: {DEFAULT_BATCH_SIZE})'
+        )
+
+    def handle(self, *args, **options):
+        service, service_type = get_service()
+        self.stdout.write(f'Archiving items in {service_type} database...')
+
+        def report(summary):
+            self.stdout.write(f'  batch {summary["batches"]}: {summary["archived"]} archived so far')
+
+        try:
+            summary = archive_items(
+                service, inactive_days=options['inactive_days'], batch_size=options['batch_size'], progress=report
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Archived {summary["archived"]} items in {summary["batches"]} batches '
+            f'(inactive since before {summary["cutoff"]})'
+        ))
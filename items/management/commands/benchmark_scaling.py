@@ -0,0 +1,331 @@
+import json
+import math
+import multiprocessing
+import os
+import random
+import statistics
+import tempfile
+import time
+from django.core.management.base import BaseCommand, CommandError
+
+BACKENDS = ('local', 'supabase')
+OPERATIONS = ('list', 'detail', 'search', 'create', 'update', 'delete')
+# One seed row in SEARCH_EVERY contains SEARCH_TERM, so searches match 1% of the table
+SEARCH_TERM = 'needle'
+SEARCH_EVERY = 100
+# Requests per operation run again under tracemalloc and query capture
+PROBES = 5
+SEED_CHUNK = 10000
+
+
+def seed_rows(count):
+    for i in range(count):
+        yield {
+            'name': f'Seed item {i}',
+            'description': f'Scaling seed row {SEARCH_TERM}' if i % SEARCH_EVERY == 0 else 'Scaling seed row',
+            'price': f'{i % 1000}.99',
+            'is_active': i % 10 != 0,
+        }
+
+
+def _seed_local(size):
+    from django.core.management import call_command
+    from items.models import Item, ItemCounter
+
+    call_command('migrate', verbosity=0)
+    rows = seed_rows(size)
+    while chunk := [Item(**row) for _, row in zip(range(SEED_CHUNK), rows)]:
+        Item.objects.bulk_create(chunk)
+    ItemCounter.refresh()
+
+
+def _measure(backend, size, samples):
+    """
+    Child process body: seed (local) and time every operation through the views.
+
+    Each operation runs ``samples`` timed requests, then PROBES more under
+    tracemalloc and query capture, so the instrumentation does not inflate
+    the latencies.
+    """
+    import django
+    django.setup()
+    import resource
+    import tracemalloc
+    from django.conf import settings
+    from django.db import connection
+    from django.test import Client
+    from django.test.utils import CaptureQueriesContext
+    from items.views import get_service
+
+    started = time.perf_counter()
+    if backend == 'local':
+        _seed_local(size)
+    seed_seconds = time.perf_counter() - started
+
+    service, _ = get_service()
+    host = next((h for h in settings.ALLOWED_HOSTS if h and h != '*' and not h.startswith('.')), 'localhost')
+    client = Client(HTTP_HOST=host)
+    rng = random.Random(size)
+    # Deleted ids are never requested again
+    doomed = iter(rng.sample(range(1, size + 1), samples + PROBES))
+    body = {'name': 'Scaling item', 'description': 'Written by benchmark_scaling', 'price': '9.99'}
+
+    def request(operation):
+        if operation == 'list':
+            response = client.get('/api/items/', {'limit': 20})
+        elif operation == 'detail':
+            response = client.get(f'/api/items/{rng.randint(1, size)}/')
+        elif operation == 'search':
+            response = client.get('/api/items/search/', {'q': SEARCH_TERM, 'limit': 20})
+        elif operation == 'create':
+            response = client.post('/api/items/create/', body, content_type='application/json')
+        elif operation == 'update':
+            response = client.put(
+                f'/api/items/{rng.randint(1, size)}/update/', {'price': '10.99'}, content_type='application/json'
+            )
+        else:
+            response = client.delete(f'/api/items/{next(doomed)}/delete/')
+        if response.status_code >= 400:
+            raise RuntimeError(f'{operation} returned HTTP {response.status_code}: {response.content[:200]!r}')
+
+    def backend_calls():
+        # PostgREST requests made by SupabaseService so far
+        return sum(method['calls'] for method in service.call_stats().values())
+
+    operations = {}
+    for operation in OPERATIONS:
+        request(operation)  # warm-up, not counted
+        latencies = []
+        for _ in range(samples - 1):
+            began = time.perf_counter()
+            request(operation)
+            latencies.append(time.perf_counter() - began)
+        latencies.sort()
+
+        peaks, queries = [], []
+        tracemalloc.start()
+        for _ in range(PROBES):
+            baseline = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            if backend == 'local':
+                with CaptureQueriesContext(connection) as captured:
+                    request(operation)
+                queries.append(len(captured))
+            else:
+                before = backend_calls()
+                request(operation)
+                queries.append(backend_calls() - before)
+            peaks.append(tracemalloc.get_traced_memory()[1] - baseline)
+        tracemalloc.stop()
+
+        operations[operation] = {
+            'p50_ms': statistics.median(latencies) * 1000,
+            'p95_ms': latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000,
+            'peak_kib': max(peaks) / 1024,
+            'queries': statistics.median(queries),
+        }
+
+    return {
+        'backend': backend,
+        'size': size,
+        'seed_seconds': seed_seconds,
+        # ru_maxrss is KiB on Linux
+        'max_rss_mib': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        'operations': operations,
+    }
+
+
+def growth_exponent(sizes, values):
+    """
+    Least-squares slope of log(value) against log(size): 0 is flat, 1 grows
+    in step with the table, above 1 grows faster than it (super-linear).
+    """
+    points = [(math.log(size), math.log(value)) for size, value in zip(sizes, values) if value > 0]
+    if len(points) < 2:
+        return None
+    mean_x = sum(x for x, _ in points) / len(points)
+    mean_y = sum(y for _, y in points) / len(points)
+    spread = sum((x - mean_x) ** 2 for x, _ in points)
+    if not spread:
+        return None
+    return sum((x - mean_x) * (y - mean_y) for x, y in points) / spread
+
+
+def parse_sizes(value):
+    try:
+        sizes = sorted({int(part) for part in value.split(',') if part.strip()})
+    except ValueError:
+        raise CommandError(f'--sizes must be comma-separated integers, got {value!r}')
+    if len(sizes) < 2:
+        raise CommandError('--sizes needs at least two different sizes to measure growth')
+    return sizes
+
+
+class Command(BaseCommand):
+    help = 'Measure how latency, memory and query counts of the item API grow with the number of rows'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes',
+            default='1000,10000,100000',
+            help='Comma-separated row counts to seed and measure (default: 1000,10000,100000)'
+        )
+        parser.add_argument(
+            '--backend',
+            choices=BACKENDS,
+            action='append',
+            help='Backend to measure; repeat for several (default: all)'
+        )
+        parser.add_argument(
+            '--samples',
+            type=int,
+            default=50,
+            help='Timed requests per operation and size (default: 50)'
+        )
+        parser.add_argument(
+            '--threshold',
+            type=float,
+            default=1.1,
+            help='Growth exponent above which a metric is flagged as super-linear (default: 1.1)'
+        )
+        parser.add_argument(
+            '--output',
+            help='Also write the report as JSON to this file'
+        )
+        parser.add_argument(
+            '--fail-on-superlinear',
+            action='store_true',
+            help='Exit with an error when any metric grows super-linearly'
+        )
+
+    def handle(self, *args, **options):
+        from items.fake_postgrest import FakePostgrest
+
+        sizes = parse_sizes(options['sizes'])
+        backends = options['backend'] or list(BACKENDS)
+        samples = options['samples']
+        if samples < 2:
+            raise CommandError('--samples must be at least 2')
+        if sizes[0] < samples + PROBES:
+            raise CommandError(f'The smallest size must be at least {samples + PROBES} rows (--samples + {PROBES})')
+
+        context = multiprocessing.get_context('spawn')
+        child_env = {'DEBUG': 'False', 'RATE_LIMIT_PER_SECOND': '0', 'WARM_UP_BACKEND': 'False'}
+        saved_env = {
+            key: os.environ.get(key)
+            for key in (*child_env, 'SQLITE_PATH', 'SUPABASE_URL', 'SUPABASE_KEY')
+        }
+
+        self.stdout.write(
+            f'Sizes {", ".join(map(str, sizes))}; {samples} timed requests per operation, '
+            f'{PROBES} more for memory and queries\n'
+        )
+
+        results = []
+        try:
+            os.environ.update(child_env)
+            with tempfile.TemporaryDirectory() as tmp:
+                for backend in backends:
+                    for size in sizes:
+                        # Spawned children inherit these and build their own settings
+                        os.environ['SQLITE_PATH'] = os.path.join(tmp, f'{backend}-{size}.sqlite3')
+                        fake = None
+                        if backend == 'supabase':
+                            # Served from this process, so the child's memory is the service's alone
+                            started = time.perf_counter()
+                            fake = FakePostgrest().start()
+                            fake.seed(seed_rows(size))
+                            seed_seconds = time.perf_counter() - started
+                            os.environ['SUPABASE_URL'] = fake.url
+                            os.environ['SUPABASE_KEY'] = 'benchmark'
+                        else:
+                            os.environ['SUPABASE_URL'] = ''
+                        try:
+                            with context.Pool(1) as pool:
+                                result = pool.apply(_measure, (backend, size, samples))
+                        except RuntimeError as e:
+                            raise CommandError(f'{backend} at {size} rows: {e}')
+                        finally:
+                            if fake:
+                                fake.stop()
+                        if fake:
+                            result['seed_seconds'] = seed_seconds
+                        results.append(result)
+                        self.stdout.write(
+                            f'  measured {backend} at {size} rows '
+                            f'(seeded in {result["seed_seconds"]:.1f}s, peak RSS {result["max_rss_mib"]:.0f} MiB)'
+                        )
+        finally:
+            for key, value in saved_env.items():
+                if value is None:
+                    os.environ.pop(key, None)
+                else:
+                    os.environ[key] = value
+
+        report = self.build_report(results, sizes, backends, options['threshold'])
+        self.print_report(report, sizes)
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(report, output, indent=2)
+            self.stdout.write(f'Report written to {options["output"]}')
+
+        if report['flags'] and options['fail_on_superlinear']:
+            raise CommandError(f'{len(report["flags"])} metrics grow super-linearly')
+
+    def build_report(self, results, sizes, backends, threshold):
+        growth, flags = {}, []
+        for backend in backends:
+            rows = [result for result in results if result['backend'] == backend]
+            growth[backend] = {}
+            for operation in OPERATIONS:
+                growth[backend][operation] = {}
+                for metric in ('p50_ms', 'peak_kib', 'queries'):
+                    values = [row['operations'][operation][metric] for row in rows]
+                    exponent = growth_exponent(sizes, values)
+                    growth[backend][operation][metric] = exponent
+                    if exponent is not None and exponent > threshold:
+                        flags.append({
+                            'backend': backend,
+                            'operation': operation,
+                            'metric': metric,
+                            'exponent': exponent,
+                        })
+        return {'sizes': sizes, 'threshold': threshold, 'results': results, 'growth': growth, 'flags': flags}
+
+    def print_report(self, report, sizes):
+        flagged = {(flag['backend'], flag['operation'], flag['metric']) for flag in report['flags']}
+
+        def exponent(backend, operation, metric):
+            value = report['growth'][backend][operation][metric]
+            text = '-' if value is None else f'{value:.2f}'
+            return text + ('!' if (backend, operation, metric) in flagged else ' ')
+
+        for backend, operations in report['growth'].items():
+            rows = {row['size']: row for row in report['results'] if row['backend'] == backend}
+            self.stdout.write(f'\n{backend} backend')
+            self.stdout.write(
+                f'{"operation":<10} {"rows":>9} {"p50 ms":>9} {"p95 ms":>9} {"peak KiB":>9} {"queries":>8}'
+            )
+            for operation in OPERATIONS:
+                for size in sizes:
+                    metrics = rows[size]['operations'][operation]
+                    self.stdout.write(
+                        f'{operation if size == sizes[0] else "":<10} {size:>9} {metrics["p50_ms"]:>9.2f} '
+                        f'{metrics["p95_ms"]:>9.2f} {metrics["peak_kib"]:>9.1f} {metrics["queries"]:>8g}'
+                    )
+                self.stdout.write(
+                    f'{"":<10} {"growth":>9} {exponent(backend, operation, "p50_ms"):>10} {"":>9} '
+                    f'{exponent(backend, operation, "peak_kib"):>10} {exponent(backend, operation, "queries"):>9}'
+                )
+
+        self.stdout.write('')
+        if not report['flags']:
+            self.stdout.write(self.style.SUCCESS(
+                f'No super-linear growth (every exponent is at most {report["threshold"]})'
+            ))
+            return
+        self.stdout.write(self.style.WARNING(
+            f'Super-linear growth (exponent above {report["threshold"]}, marked !):'
+        ))
+        for flag in report['flags']:
+            self.stdout.write(f'  {flag["backend"]} {flag["operation"]} {flag["metric"]}: {flag["exponent"]:.2f}')
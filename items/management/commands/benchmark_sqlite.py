@@ -0,0 +1,137 @@
+import multiprocessing
+import os
+import random
+import tempfile
+import time
+from django.core.management.base import BaseCommand
+
+SQLITE_PROFILES = ('development', 'production')
+
+
+def _run_worker(args):
+    """
+    Worker process body: issue a mixed read/write workload through LocalService.
+
+    Runs in a freshly spawned interpreter so Django reads the profile's
+    settings from the environment, exactly as a real worker would.
+    """
+    duration, write_ratio, seed = args
+    import django
+    django.setup()
+    from django.db import close_old_connections
+    from items.local_service import LocalService
+
+    service = LocalService()
+    rng = random.Random(seed)
+    reads = writes = errors = 0
+    deadline = time.monotonic() + duration
+
+    while time.monotonic() < deadline:
+        try:
+            if rng.random() < write_ratio:
+                if rng.random() < 0.5:
+                    service.create_item({'name': f'Bench item {seed}', 'price': '9.99'})
+                else:
+                    service.update_item(rng.randint(1, 1000), {'description': f'Updated by {seed}'})
+                writes += 1
+            else:
+                if rng.random() < 0.5:
+                    service.get_all_items(limit=20)
+                else:
+                    service.get_item_by_id(rng.randint(1, 1000))
+                reads += 1
+        except Exception:
+            errors += 1
+        # Same end-of-request hook Django runs: honours CONN_MAX_AGE
+        close_old_connections()
+
+    return reads, writes, errors
+
+
+def _prepare_database(rows):
+    import django
+    django.setup()
+    from django.core.management import call_command
+    from items.models import Item, ItemCounter
+
+    call_command('migrate', verbosity=0)
+    Item.objects.bulk_create(
+        Item(name=f'Seed item {i}', description='Benchmark seed row', price='19.99')
+        for i in range(rows)
+    )
+    ItemCounter.refresh()
+
+
+class Command(BaseCommand):
+    help = 'Measure mixed read/write throughput of the SQLite profiles with several worker processes'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=4,
+            help='Number of concurrent worker processes (default: 4)'
+        )
+        parser.add_argument(
+            '--duration',
+            type=float,
+            default=5.0,
+            help='Seconds each profile is measured for (default: 5)'
+        )
+        parser.add_argument(
+            '--write-ratio',
+            type=float,
+            default=0.2,
+            help='Fraction of operations that write (default: 0.2)'
+        )
+        parser.add_argument(
+            '--rows',
+            type=int,
+            default=1000,
+            help='Rows seeded before measuring (default: 1000)'
+        )
+        parser.add_argument(
+            '--profile',
+            choices=SQLITE_PROFILES,
+            action='append',
+            help='Profile to measure; repeat for several (default: all)'
+        )
+
+    def handle(self, *args, **options):
+        profiles = options['profile'] or list(SQLITE_PROFILES)
+        workers = options['workers']
+        context = multiprocessing.get_context('spawn')
+        saved_env = {key: os.environ.get(key) for key in ('SQLITE_PROFILE', 'SQLITE_PATH')}
+
+        self.stdout.write(
+            f'{workers} workers, {options["duration"]}s per profile, '
+            f'{options["write_ratio"]:.0%} writes, {options["rows"]} seed rows\n'
+        )
+
+        try:
+            with tempfile.TemporaryDirectory() as tmp:
+                for profile in profiles:
+                    # Spawned children inherit these and build their own settings
+                    os.environ['SQLITE_PROFILE'] = profile
+                    os.environ['SQLITE_PATH'] = os.path.join(tmp, f'{profile}.sqlite3')
+
+                    with context.Pool(1) as pool:
+                        pool.apply(_prepare_database, (options['rows'],))
+
+                    jobs = [(options['duration'], options['write_ratio'], seed) for seed in range(workers)]
+                    with context.Pool(workers) as pool:
+                        results = pool.map(_run_worker, jobs)
+
+                    reads = sum(result[0] for result in results)
+                    writes = sum(result[1] for result in results)
+                    errors = sum(result[2] for result in results)
+                    self.stdout.write(
+                        f'{profile:<12} {(reads + writes) / options["duration"]:>10.0f} ops/s  '
+                        f'reads {reads:>7}  writes {writes:>6}  errors {errors}'
+                    )
+        finally:
+            for key, value in saved_env.items():
+                if value is None:
+                    os.environ.pop(key, None)
+                else:
+                    os.environ[key] = value
@@ -0,0 +1,109 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Profiles compared: name -> environment for the child process
+STARTUP_PROFILES = {
+    'full': {'APP_PROFILE': 'full', 'WARM_UP_BACKEND': 'False'},
+    'api': {'APP_PROFILE': 'api', 'WARM_UP_BACKEND': 'True'},
+}
+
+# Runs in a fresh interpreter so nothing is imported before the clock starts.
+# Loads the WSGI module as a server would (including any warm-up) and prints
+# 'ready' once the application exists, then times two requests.
+CHILD_SCRIPT = r'''
+import io, json, sys, time
+start = time.perf_counter()
+from supabase_crud.wsgi import application
+setup = time.perf_counter() - start
+print('ready', flush=True)
+
+from django.conf import settings
+path, query = sys.argv[1], sys.argv[2]
+host = next((h for h in settings.ALLOWED_HOSTS if h and h != '*' and not h.startswith('.')), 'localhost')
+
+def request():
+    environ = {
+        'REQUEST_METHOD': 'GET', 'PATH_INFO': path, 'QUERY_STRING': query,
+        'SERVER_NAME': host, 'SERVER_PORT': '80', 'HTTP_HOST': host,
+        'REMOTE_ADDR': '127.0.0.1', 'wsgi.input': io.BytesIO(),
+        'wsgi.url_scheme': 'http', 'wsgi.errors': sys.stderr,
+    }
+    status = []
+    began = time.perf_counter()
+    result = application(environ, lambda line, headers, exc_info=None: status.append(line))
+    b''.join(result)
+    result.close()
+    return time.perf_counter() - began, status[0]
+
+first, status = request()
+second, _ = request()
+print(json.dumps({'setup': setup, 'first': first, 'second': second, 'status': status}), flush=True)
+'''
+
+
+class Command(BaseCommand):
+    help = 'Measure worker startup time and first-request latency of the full and API-only profiles'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--runs',
+            type=int,
+            default=5,
+            help='Fresh processes started per profile (default: 5)'
+        )
+        parser.add_argument(
+            '--path',
+            default='/api/items/?limit=20',
+            help='Request timed after startup (default: /api/items/?limit=20)'
+        )
+        parser.add_argument(
+            '--profile',
+            choices=list(STARTUP_PROFILES),
+            action='append',
+            help='Profile to measure; repeat for several (default: all)'
+        )
+
+    def handle(self, *args, **options):
+        profiles = options['profile'] or list(STARTUP_PROFILES)
+        path, _, query = options['path'].partition('?')
+
+        self.stdout.write(f'{options["runs"]} runs per profile, timing GET {options["path"]} (medians)\n')
+        self.stdout.write(
+            f'{"profile":<8} {"ready":>9} {"setup":>9} {"1st req":>9} {"2nd req":>9}  status'
+        )
+
+        for profile in profiles:
+            runs = [self.measure(profile, path, query) for _ in range(options['runs'])]
+            ms = {key: statistics.median(run[key] for run in runs) * 1000 for key in ('ready', 'setup', 'first', 'second')}
+            self.stdout.write(
+                f'{profile:<8} {ms["ready"]:>7.1f}ms {ms["setup"]:>7.1f}ms '
+                f'{ms["first"]:>7.1f}ms {ms["second"]:>7.1f}ms  {runs[-1]["status"]}'
+            )
+
+        self.stdout.write(self.style.SUCCESS(
+            '\nready: process start until the WSGI app exists; '
+            'setup: the part spent in Django start-up'
+        ))
+
+    def measure(self, profile, path, query):
+        env = {**os.environ, **STARTUP_PROFILES[profile]}
+        env.setdefault('DJANGO_SETTINGS_MODULE', 'supabase_crud.settings')
+        started = time.perf_counter()
+        child = subprocess.Popen(
+            [sys.executable, '-c', CHILD_SCRIPT, path, query],
+            cwd=settings.BASE_DIR, env=env, stdout=subprocess.PIPE, text=True,
+        )
+        ready_line = child.stdout.readline()
+        ready = time.perf_counter() - started
+        result_line = child.stdout.readline()
+        child.wait()
+
+        if ready_line.strip() != 'ready' or not result_line:
+            raise CommandError(f'The {profile} worker failed to start (exit code {child.returncode})')
+        return {'ready': ready, **json.loads(result_line)}
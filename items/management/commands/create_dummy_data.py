@@ -1,6 +1,6 @@
 from django.core.management.base import BaseCommand
 from django.utils import timezone
-from items.models import Item
+from items.models import Item, ItemCounter
 import random
 from decimal import Decimal
 
@@ -70,6 +70,9 @@ class Command(BaseCommand):
                 self.style.SUCCESS(f'Created item: {item.name} - ${item.price}')
             )
         
+        # Items were created directly, so resync the maintained count
+        ItemCounter.refresh()
+        
         self.stdout.write(
             self.style.SUCCESS(
                 f'\nSuccessfully created {len(created_items)} dummy items!'
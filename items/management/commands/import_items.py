@@ -0,0 +1,66 @@
+import sys
+from django.core.management.base import BaseCommand, CommandError
+from items.importer import IMPORT_FORMATS, DEFAULT_CHUNK_SIZE, ItemImporter, iter_records
+from items.views import get_service
+
+
+class Command(BaseCommand):
+    help = 'Stream items from a CSV or NDJSON file into the active database'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path',
+            help='File to import (use - for standard input)'
+        )
+        parser.add_argument(
+            '--format',
+            choices=IMPORT_FORMATS,
+            help='Input format (default: guessed from the file extension, else csv)'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=DEFAULT_CHUNK_SIZE,
+            help=f'Rows per bulk insert (default: {DEFAULT_CHUNK_SIZE})'
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format']
+        if not fmt:
+            fmt = 'ndjson' if path.endswith(('.ndjson', '.jsonl')) else 'csv'
+        if options['chunk_size'] < 1:
+            raise CommandError('--chunk-size must be at least 1')
+
+        service, service_type = get_service()
+        self.stdout.write(f'Importing {fmt} into {service_type} database...')
+
+        def report(summary):
+            self.stdout.write(
+                f'  processed {summary["processed"]}, '
+                f'created {summary["created"]}, '
+                f'rejected {summary["rejected_count"]}'
+            )
+
+        importer = ItemImporter(service, chunk_size=options['chunk_size'], progress=report)
+        try:
+            if path == '-':
+                summary = importer.run(iter_records(sys.stdin.buffer, fmt))
+            else:
+                with open(path, 'rb') as stream:
+                    summary = importer.run(iter_records(stream, fmt))
+        except OSError as e:
+            raise CommandError(str(e))
+
+        for reject in summary['rejected']:
+            self.stdout.write(self.style.WARNING(f'  line {reject["line"]}: {reject["error"]}'))
+        if summary['rejected_count'] > len(summary['rejected']):
+            self.stdout.write(self.style.WARNING(
+                f'  ... {summary["rejected_count"] - len(summary["rejected"])} more rejected rows'
+            ))
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'\nImported {summary["created"]} of {summary["processed"]} rows!'
+            )
+        )
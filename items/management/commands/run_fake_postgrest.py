@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand
+from items.fake_postgrest import FakePostgrest
+
+
+class Command(BaseCommand):
+    help = 'Serve a local fake PostgREST items table with optional injected latency and failures'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--port', type=int, default=54321, help='Port to listen on (default: 54321)')
+        parser.add_argument('--latency', type=float, default=0.0, help='Base delay per response in seconds')
+        parser.add_argument('--jitter', type=float, default=0.0, help='Extra random delay up to this many seconds')
+        parser.add_argument('--slow-rate', type=float, default=0.0, help='Fraction of responses that are slow')
+        parser.add_argument('--slow-latency', type=float, default=1.0, help='Delay of a slow response in seconds')
+        parser.add_argument('--error-rate', type=float, default=0.0, help='Fraction of requests dropped without a reply')
+        parser.add_argument('--seed-rows', type=int, default=0, help='Rows to preload into the items table')
+
+    def handle(self, *args, **options):
+        fake = FakePostgrest(
+            port=options['port'],
+            latency=options['latency'],
+            jitter=options['jitter'],
+            slow_rate=options['slow_rate'],
+            slow_latency=options['slow_latency'],
+            error_rate=options['error_rate'],
+        )
+        if options['seed_rows']:
+            fake.seed(
+                {'name': f'Fake item {i}', 'description': 'Seeded by run_fake_postgrest', 'price': 9.99}
+                for i in range(options['seed_rows'])
+            )
+
+        self.stdout.write(self.style.SUCCESS(f'Fake PostgREST listening on {fake.url}'))
+        self.stdout.write(f'Use it with: SUPABASE_URL={fake.url} SUPABASE_KEY=fake python manage.py runserver')
+        try:
+            fake.serve_forever()
+        except KeyboardInterrupt:
+            self.stdout.write('\nStopped.')
+        finally:
+            fake.server.server_close()
@@ -0,0 +1,105 @@
+import multiprocessing
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from django.core.management.base import BaseCommand, CommandError
+
+
+def _setup_process():
+    """
+    Pool process initializer: the processes are spawned, so each one sets up
+    Django from the inherited environment before running jobs.
+    """
+    import django
+    django.setup()
+
+
+def _run(job_id):
+    from items.jobs import run_job
+    return run_job(job_id)
+
+
+class Command(BaseCommand):
+    help = 'Run queued background jobs (imports, exports, maintenance) in a pool of worker processes'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--processes',
+            type=int,
+            default=os.cpu_count() or 1,
+            help='Jobs run in parallel, one per process (default: CPU count)'
+        )
+        parser.add_argument(
+            '--poll',
+            type=float,
+            default=1.0,
+            help='Seconds between checks for new jobs (default: 1)'
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Exit once the queue is empty instead of waiting for more jobs'
+        )
+
+    def handle(self, *args, **options):
+        from django.db import close_old_connections
+        from django.utils import timezone
+        from items.jobs import claim_next, fail_orphaned, worker_name
+        from items.models import Job
+
+        processes = options['processes']
+        if processes < 1:
+            raise CommandError('--processes must be at least 1')
+
+        name = worker_name()
+        orphaned = fail_orphaned()
+        if orphaned:
+            self.stdout.write(self.style.WARNING(f'Marked {orphaned} orphaned jobs as failed'))
+        self.stdout.write(f'Worker {name} running jobs with {processes} processes...')
+
+        running = {}
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(processes, mp_context=context, initializer=_setup_process) as pool:
+            try:
+                while True:
+                    while len(running) < processes:
+                        job = claim_next(name)
+                        if job is None:
+                            break
+                        self.stdout.write(f'  started {job.kind} #{job.id}')
+                        running[pool.submit(_run, job.id)] = job
+
+                    if not running:
+                        if options['once']:
+                            break
+                        close_old_connections()
+                        time.sleep(options['poll'])
+                        continue
+
+                    done, _ = wait(running, timeout=options['poll'], return_when=FIRST_COMPLETED)
+                    for future in done:
+                        job = running.pop(future)
+                        try:
+                            status = future.result()
+                        except Exception as e:
+                            # The pool process died; run_job never recorded an outcome
+                            status = Job.FAILED
+                            Job.objects.filter(id=job.id, status=Job.RUNNING).update(
+                                status=Job.FAILED, error=f'Worker process failed: {e}', finished_at=timezone.now()
+                            )
+                        style = self.style.SUCCESS if status == Job.SUCCEEDED else self.style.WARNING
+                        self.stdout.write(style(f'  {status} {job.kind} #{job.id}'))
+
+                    # Keep long jobs without progress reports from looking orphaned
+                    if running:
+                        Job.objects.filter(id__in=[job.id for job in running.values()]).update(
+                            heartbeat_at=timezone.now()
+                        )
+            except KeyboardInterrupt:
+                self.stdout.write('\nStopping...')
+
+        # Jobs interrupted by the shutdown are not left looking alive
+        Job.objects.filter(status=Job.RUNNING, worker=name).update(
+            status=Job.FAILED, error='Worker stopped while running the job', finished_at=timezone.now()
+        )
+        self.stdout.write(self.style.SUCCESS('Worker stopped.'))
@@ -0,0 +1,118 @@
+import gc
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = 'Serve the project with pre-forked gunicorn worker processes (production)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--bind',
+            default='127.0.0.1:8000',
+            help='Address to listen on, host:port or unix:path (default: 127.0.0.1:8000)'
+        )
+        parser.add_argument(
+            '--mode',
+            choices=['sync', 'thread', 'async'],
+            default='thread',
+            help='Worker type: one request at a time, a thread pool, or an asyncio loop serving ASGI (default: thread)'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=0,
+            help='Worker processes (default: one per available CPU)'
+        )
+        parser.add_argument(
+            '--threads',
+            type=int,
+            default=4,
+            help='Threads per worker in thread mode (default: 4)'
+        )
+        parser.add_argument(
+            '--connections',
+            type=int,
+            default=1000,
+            help='Concurrent connections per worker in async mode (default: 1000)'
+        )
+        parser.add_argument(
+            '--max-requests',
+            type=int,
+            default=10000,
+            help='Recycle a worker after this many requests, 0 to disable (default: 10000)'
+        )
+        parser.add_argument(
+            '--max-requests-jitter',
+            type=int,
+            default=1000,
+            help='Random extra requests per worker, so workers do not recycle together (default: 1000)'
+        )
+        parser.add_argument(
+            '--max-memory',
+            type=int,
+            default=0,
+            help='Recycle a worker once its resident memory exceeds this many MiB, 0 to disable (default: 0)'
+        )
+        parser.add_argument(
+            '--timeout',
+            type=int,
+            default=30,
+            help='Seconds before a silent worker is restarted, also the graceful shutdown window (default: 30)'
+        )
+        parser.add_argument(
+            '--access-log',
+            action='store_true',
+            help='Log every request to standard output'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            from supabase_crud.server import SERVER_MODES, ItemsServer, cpu_count
+        except ImportError:
+            raise CommandError('The production server needs gunicorn: pip install gunicorn')
+        from items.warmup import reset_backend, warm_up
+
+        mode = options['mode']
+        workers = options['workers'] or cpu_count()
+        if options['workers'] < 0:
+            raise CommandError('--workers must not be negative')
+        if options['threads'] < 1 or options['connections'] < 1:
+            raise CommandError('--threads and --connections must be at least 1')
+        if min(options['max_requests'], options['max_requests_jitter'], options['max_memory']) < 0:
+            raise CommandError('Recycling limits must not be negative')
+
+        # Preload in this (master) process. Collections would leave freed
+        # holes in pages the workers share, so the GC stays off until fork.
+        gc.disable()
+        if mode == 'async':
+            from django.core.asgi import get_asgi_application
+            application = get_asgi_application()
+        else:
+            from django.core.wsgi import get_wsgi_application
+            application = get_wsgi_application()
+        warm_up()
+        reset_backend()
+
+        self.stdout.write(
+            f'Serving on {options["bind"]} with {workers} {mode} workers'
+            + (f' x {options["threads"]} threads' if mode == 'thread' else '')
+        )
+        ItemsServer(
+            application,
+            {
+                'bind': options['bind'],
+                'workers': workers,
+                'worker_class': SERVER_MODES[mode],
+                'threads': options['threads'] if mode == 'thread' else 1,
+                'worker_connections': options['connections'],
+                'timeout': options['timeout'],
+                'graceful_timeout': options['timeout'],
+                'keepalive': 5,
+                'preload_app': True,
+                'accesslog': '-' if options['access_log'] else None,
+                'proc_name': 'supabase_crud',
+            },
+            max_requests=options['max_requests'],
+            max_requests_jitter=options['max_requests_jitter'],
+            max_memory=options['max_memory'] * 2 ** 20,
+        ).run()
@@ -0,0 +1,31 @@
+import sqlite3
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from supabase_crud.routers import PRIMARY_DB, replica_aliases
+
+
+class Command(BaseCommand):
+    help = 'Copy the primary SQLite database onto each configured SQLite read replica'
+
+    def handle(self, *args, **options):
+        primary = connections[PRIMARY_DB]
+        if primary.vendor != 'sqlite':
+            raise CommandError('sync_replicas only manages SQLite replicas')
+
+        aliases = [alias for alias in replica_aliases() if connections[alias].vendor == 'sqlite']
+        if not aliases:
+            self.stdout.write('No SQLite replicas configured (set SQLITE_REPLICAS).')
+            return
+
+        primary.ensure_connection()
+        for alias in aliases:
+            path = settings.DATABASES[alias]['NAME']
+            connections[alias].close()
+            # Online backup API: consistent snapshot without blocking writers for long
+            target = sqlite3.connect(path)
+            try:
+                primary.connection.backup(target)
+            finally:
+                target.close()
+            self.stdout.write(self.style.SUCCESS(f'Synced {alias} -> {path}'))
@@ -0,0 +1,267 @@
+import itertools
+import math
+import sqlite3
+import threading
+import time
+from django.conf import settings
+from django.http import JsonResponse
+from django.urls import Resolver404, resolve
+from django.utils.cache import patch_vary_headers
+from .compression import CompressedBodyCache, available_codecs, negotiate
+
+# Which admission pool each API view draws from
+ENDPOINT_CLASSES = {
+    'item_list': 'read',
+    'item_detail': 'read',
+    'item_search': 'read',
+    'item_stats': 'read',
+    'item_create': 'write',
+    'item_update': 'write',
+    'item_delete': 'write',
+    'item_batch': 'bulk',
+    'item_import': 'bulk',
+    'service_stats': 'read',
+    'job_list': 'read',
+    'job_detail': 'read',
+    'job_create': 'write',
+    'job_cancel': 'write',
+    'job_download': 'bulk',
+}
+
+MAX_TRACKED_CLIENTS = 10000
+# SQLiteBucketStore drops refilled buckets once every this many takes per process
+PRUNE_EVERY = 1000
+
+
+class MemoryBucketStore:
+    """Token buckets kept in this process."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.buckets = {}
+
+    def take(self, key, rate, burst, now):
+        """
+        Take one token from the client's bucket.
+        Returns 0 when allowed, otherwise the seconds until a token is available.
+        """
+        with self.lock:
+            tokens, updated = self.buckets.get(key, (burst, now))
+            tokens = min(burst, tokens + (now - updated) * rate)
+            if tokens >= 1:
+                self.buckets[key] = (tokens - 1, now)
+                wait = 0.0
+            else:
+                self.buckets[key] = (tokens, now)
+                wait = (1 - tokens) / rate
+            if len(self.buckets) > MAX_TRACKED_CLIENTS:
+                self._prune(rate, burst, now)
+            return wait
+
+    def _prune(self, rate, burst, now):
+        # Buckets that have refilled completely carry no state worth keeping
+        full_after = burst / rate
+        self.buckets = {
+            key: value for key, value in self.buckets.items()
+            if now - value[1] < full_after
+        }
+
+
+class SQLiteBucketStore:
+    """
+    Token buckets in a SQLite file shared by every worker process on the host.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.local = threading.local()
+        self.takes = itertools.count(1)
+        self._connection().execute(
+            'CREATE TABLE IF NOT EXISTS rate_buckets '
+            '(client TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)'
+        )
+
+    def _connection(self):
+        if not hasattr(self.local, 'connection'):
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=OFF')
+            self.local.connection = connection
+        return self.local.connection
+
+    def take(self, key, rate, burst, now):
+        connection = self._connection()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            row = connection.execute(
+                'SELECT tokens, updated FROM rate_buckets WHERE client = ?', (key,)
+            ).fetchone()
+            tokens, updated = row if row else (burst, now)
+            tokens = min(burst, tokens + (now - updated) * rate)
+            wait = 0.0 if tokens >= 1 else (1 - tokens) / rate
+            if not wait:
+                tokens -= 1
+            connection.execute(
+                'INSERT INTO rate_buckets (client, tokens, updated) VALUES (?, ?, ?) '
+                'ON CONFLICT(client) DO UPDATE SET tokens = excluded.tokens, updated = excluded.updated',
+                (key, tokens, now),
+            )
+            if next(self.takes) % PRUNE_EVERY == 0:
+                # As in MemoryBucketStore: buckets that have refilled completely carry no state
+                connection.execute('DELETE FROM rate_buckets WHERE updated <= ?', (now - burst / rate,))
+            connection.execute('COMMIT')
+        except Exception:
+            connection.execute('ROLLBACK')
+            raise
+        return wait
+
+
+class ConcurrencyLimiter:
+    """
+    Cap in-flight requests, with a bounded queue of requests allowed to wait.
+    """
+
+    def __init__(self, limit, queue_size):
+        self.limit = limit
+        self.queue_size = queue_size
+        self.active = 0
+        self.waiting = 0
+        self.condition = threading.Condition()
+
+    def acquire(self, timeout):
+        with self.condition:
+            if self.active < self.limit:
+                self.active += 1
+                return True
+            if self.waiting >= self.queue_size:
+                return False
+            self.waiting += 1
+            try:
+                admitted = self.condition.wait_for(lambda: self.active < self.limit, timeout)
+                if admitted:
+                    self.active += 1
+                return admitted
+            finally:
+                self.waiting -= 1
+
+    def release(self):
+        with self.condition:
+            self.active -= 1
+            self.condition.notify()
+
+
+class AdmissionControlMiddleware:
+    """
+    Shed load on the items API before it reaches the backend.
+
+    Each client gets a token bucket (RATE_LIMIT_PER_SECOND, RATE_LIMIT_BURST)
+    and is answered 429 when it runs dry. Admitted requests then take a slot
+    from their endpoint class's concurrency pool (CONCURRENCY_LIMITS); when
+    the pool and its wait queue are full, or the queue wait exceeds
+    ADMISSION_QUEUE_TIMEOUT, the request is answered 503. Both responses carry
+    Retry-After.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.rate = settings.RATE_LIMIT_PER_SECOND
+        self.burst = settings.RATE_LIMIT_BURST
+        self.queue_timeout = settings.ADMISSION_QUEUE_TIMEOUT
+        self.client_header = settings.RATE_LIMIT_CLIENT_HEADER
+        self.trusted_proxies = max(1, settings.RATE_LIMIT_TRUSTED_PROXIES)
+        store_path = settings.RATE_LIMIT_STORE
+        self.store = SQLiteBucketStore(store_path) if store_path else MemoryBucketStore()
+        self.limiters = {
+            name: ConcurrencyLimiter(limit, queue_size)
+            for name, (limit, queue_size) in settings.CONCURRENCY_LIMITS.items()
+        }
+
+    def __call__(self, request):
+        try:
+            endpoint_class = ENDPOINT_CLASSES.get(resolve(request.path_info).url_name)
+        except Resolver404:
+            endpoint_class = None
+        if endpoint_class is None:
+            return self.get_response(request)
+
+        if self.rate > 0:
+            wait = self.store.take(self.client_id(request), self.rate, self.burst, time.time())
+            if wait:
+                return self.reject(429, 'Rate limit exceeded', wait)
+
+        limiter = self.limiters.get(endpoint_class)
+        if limiter is None:
+            return self.get_response(request)
+        if not limiter.acquire(self.queue_timeout):
+            return self.reject(503, 'Server is busy, please retry', self.queue_timeout)
+        try:
+            return self.get_response(request)
+        finally:
+            limiter.release()
+
+    def client_id(self, request):
+        if self.client_header:
+            # Each proxy appends the address it received the request from, so only
+            # the entries added by our own proxies can be trusted: the client may
+            # have sent any X-Forwarded-For it liked, which ends up to their left.
+            entries = [entry.strip() for entry in request.META.get(self.client_header, '').split(',')]
+            entries = [entry for entry in entries if entry]
+            if entries:
+                return entries[-min(self.trusted_proxies, len(entries))]
+        return request.META.get('REMOTE_ADDR', '')
+
+    def reject(self, status, message, retry_after):
+        response = JsonResponse({
+            'success': False,
+            'error': message
+        }, status=status)
+        response['Retry-After'] = str(max(1, math.ceil(retry_after)))
+        return response
+
+
+class CompressionMiddleware:
+    """
+    Compress items API responses with the best encoding the client accepts.
+
+    zstd and brotli are used when their packages are installed, gzip always.
+    Bodies smaller than COMPRESSION_MIN_SIZE are sent as-is, streaming
+    responses are compressed chunk by chunk, and compressed bodies are
+    cached by content digest so repeated payloads are compressed once.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.min_size = settings.COMPRESSION_MIN_SIZE
+        self.codecs = available_codecs()
+        self.cache = CompressedBodyCache(settings.COMPRESSION_CACHE_SIZE)
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if not request.path_info.startswith('/api/'):
+            return response
+        if response.status_code != 200 or response.has_header('Content-Encoding'):
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        codec = negotiate(request.META.get('HTTP_ACCEPT_ENCODING', ''), self.codecs)
+        if codec is None:
+            return response
+
+        if response.streaming:
+            response.streaming_content = codec.stream(response.streaming_content)
+            del response['Content-Length']
+        else:
+            if len(response.content) < self.min_size:
+                return response
+            compressed = self.cache.compress(codec, response.content)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response['Content-Length'] = str(len(compressed))
+
+        # The representation changed, so a strong validator no longer applies
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        response['Content-Encoding'] = codec.name
+        return response
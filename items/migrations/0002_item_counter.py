@@ -0,0 +1,31 @@
+# Generated by Django 5.2.3 on 2026-10-19 07:22
+
+from django.db import migrations, models
+
+
+def seed_item_counter(apps, schema_editor):
+    Item = apps.get_model('items', 'Item')
+    ItemCounter = apps.get_model('items', 'ItemCounter')
+    ItemCounter.objects.update_or_create(name='items', defaults={'value': Item.objects.count()})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('items', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ItemCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('value', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'db_table': 'items_counter',
+            },
+        ),
+        migrations.RunPython(seed_item_counter, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 5.2.3 on 2026-10-19 08:02
+
+import items.models
+from django.db import migrations, models
+from items.search import normalize_search_text
+
+
+def fill_search_columns(apps, schema_editor):
+    for model_name in ('Item', 'ItemArchive'):
+        model = apps.get_model('items', model_name)
+        rows = model.objects.only('id', 'name', 'description').order_by('id')
+        batch = []
+        for row in rows.iterator(chunk_size=1000):
+            row.name_search = normalize_search_text(row.name)
+            row.description_search = normalize_search_text(row.description)
+            batch.append(row)
+            if len(batch) == 1000:
+                model.objects.bulk_update(batch, ['name_search', 'description_search'])
+                batch = []
+        if batch:
+            model.objects.bulk_update(batch, ['name_search', 'description_search'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('items', '0004_item_archive'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='item',
+            name='description_search',
+            field=items.models.SearchTextField(source='description'),
+        ),
+        migrations.AddField(
+            model_name='item',
+            name='name_search',
+            field=items.models.SearchTextField(source='name'),
+        ),
+        migrations.AddField(
+            model_name='itemarchive',
+            name='description_search',
+            field=items.models.SearchTextField(source='description'),
+        ),
+        migrations.AddField(
+            model_name='itemarchive',
+            name='name_search',
+            field=items.models.SearchTextField(source='name'),
+        ),
+        migrations.AddIndex(
+            model_name='item',
+            index=models.Index(fields=['name_search'], name='items_name_search_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='item',
+            index=models.Index(fields=['description_search'], name='items_description_search_idx'),
+        ),
+        migrations.RunPython(fill_search_columns, migrations.RunPython.noop),
+    ]
@@ -1,20 +1,69 @@
 from django.db import models
 from django.utils import timezone
+from .search import normalize_search_text
+
+
+class SearchTextField(models.TextField):
+    """
+    Normalized copy of another text field (see items/search.py), recomputed
+    whenever the row is saved or bulk-inserted, like ``auto_now`` timestamps.
+    Queryset ``update()`` bypasses it, so never update the source field that way.
+    """
+    def __init__(self, *args, source=None, **kwargs):
+        self.source = source
+        kwargs.setdefault('editable', False)
+        kwargs.setdefault('blank', True)
+        kwargs.setdefault('default', '')
+        super().__init__(*args, **kwargs)
+    
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        kwargs['source'] = self.source
+        for key, value in (('editable', False), ('blank', True), ('default', '')):
+            if kwargs.get(key, value) == value:
+                kwargs.pop(key, None)
+        return name, path, args, kwargs
+    
+    def pre_save(self, model_instance, add):
+        value = normalize_search_text(getattr(model_instance, self.source))
+        setattr(model_instance, self.attname, value)
+        return value
+
+
+class LiveItemManager(models.Manager):
+    """
+    Default manager for Item: hides soft-deleted rows.
+    """
+    def get_queryset(self):
+        return super().get_queryset().filter(deleted_at__isnull=True)
+
 
 class Item(models.Model):
     """
     Item model for CRUD operations with Supabase.
     This model represents the structure of data we'll store in Supabase.
     """
-    name = models.DecimalField(max_length=200)
+    name = models.CharField(max_length=200)
     description = models.TextField(blank=True)
-    price = models.CharField(max_digits=10, decimal_places=2, null=True, blank=True)
+    price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
     created_at = models.DateTimeField(default=timezone.now)
     updated_at = models.DateTimeField(auto_now=True)
     is_active = models.BooleanField(default=True)
+    # Set by delete_item; the row stays until `archive_items` moves it out
+    deleted_at = models.DateTimeField(null=True, blank=True)
+    # Maintained lowercased, accent-folded copies that searches match against
+    name_search = SearchTextField(source='name')
+    description_search = SearchTextField(source='description')
+    
+    objects = LiveItemManager()
+    all_objects = models.Manager()
     
     class Meta:
         db_table = 'items'  # This will be the table name in Supabase
+        indexes = [
+            models.Index(fields=['name_search'], name='items_name_search_idx'),
+            models.Index(fields=['description_search'], name='items_description_search_idx'),
+        ]
         
     def __str__(self):
         return self.name
@@ -32,3 +81,141 @@ class Item(models.Model):
             'updated_at': self.updated_at.isoformat(),
             'is_active': self.is_active
         }
+
+
+class ItemArchive(models.Model):
+    """
+    Items moved out of the hot ``items`` table by `archive_items`: rows that
+    were soft-deleted or inactive for longer than ARCHIVE_INACTIVE_DAYS.
+    Ids are kept, so an archived item has the id it was created with.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    name = models.CharField(max_length=200)
+    description = models.TextField(blank=True)
+    price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    is_active = models.BooleanField(default=False)
+    deleted_at = models.DateTimeField(null=True, blank=True)
+    archived_at = models.DateTimeField(default=timezone.now)
+    name_search = SearchTextField(source='name')
+    description_search = SearchTextField(source='description')
+    
+    class Meta:
+        db_table = 'items_archive'
+        indexes = [models.Index(fields=['created_at', 'id'], name='items_archive_created_idx')]
+    
+    def __str__(self):
+        return self.name
+    
+    @classmethod
+    def from_item(cls, item: Item, archived_at=None):
+        """
+        Archive row holding the given item's fields.
+        """
+        return cls(
+            id=item.id, name=item.name, description=item.description, price=item.price,
+            created_at=item.created_at, updated_at=item.updated_at, is_active=item.is_active,
+            deleted_at=item.deleted_at, archived_at=archived_at or timezone.now(),
+        )
+    
+    to_dict = Item.to_dict
+
+
+class ItemCounter(models.Model):
+    """
+    Maintained row counts for the items table ('items') and the readable part
+    of the archive ('items_archive'). Updated by the service-layer writes so estimated totals cost a single row lookup.
+    """
+    name = models.CharField(max_length=50, unique=True)
+    value = models.BigIntegerField(default=0)
+    
+    class Meta:
+        db_table = 'items_counter'
+    
+    def __str__(self):
+        return f"{self.name}: {self.value}"
+    
+    @classmethod
+    def adjust(cls, delta: int, name: str = 'items'):
+        """
+        Add delta to the named counter, creating it from an exact count if missing.
+        """
+        updated = cls.objects.filter(name=name).update(value=models.F('value') + delta)
+        if not updated:
+            cls.refresh(name)
+    
+    @classmethod
+    def current(cls, name: str = 'items') -> int:
+        """
+        Return the maintained count, seeding it with an exact count on first use.
+        """
+        counter = cls.objects.filter(name=name).first()
+        if counter is None:
+            return cls.refresh(name)
+        return max(counter.value, 0)
+    
+    @classmethod
+    def refresh(cls, name: str = 'items') -> int:
+        """
+        Recompute the counter from its table (e.g. after writes that bypass the service).
+        The 'items_archive' counter counts the archived items that were not deleted.
+        """
+        if name == 'items_archive':
+            total = ItemArchive.objects.filter(deleted_at__isnull=True).count()
+        else:
+            total = Item.objects.count()
+        cls.objects.update_or_create(name=name, defaults={'value': total})
+        return total
+
+
+class Job(models.Model):
+    """
+    A unit of background work (import, export, maintenance) run by the
+    `run_jobs` worker outside the request path.
+    """
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    SUCCEEDED = 'succeeded'
+    FAILED = 'failed'
+    CANCELLED = 'cancelled'
+    STATUS_CHOICES = [(status, status) for status in (QUEUED, RUNNING, SUCCEEDED, FAILED, CANCELLED)]
+    FINISHED = (SUCCEEDED, FAILED, CANCELLED)
+
+    kind = models.CharField(max_length=50)
+    params = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=QUEUED)
+    progress = models.JSONField(default=dict, blank=True)
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    cancel_requested = models.BooleanField(default=False)
+    worker = models.CharField(max_length=100, blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+    started_at = models.DateTimeField(null=True, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        db_table = 'items_job'
+        indexes = [models.Index(fields=['status', 'created_at'], name='items_job_status_idx')]
+    
+    def __str__(self):
+        return f"{self.kind} #{self.id} ({self.status})"
+    
+    def to_dict(self):
+        """
+        Convert the job to a dictionary for the jobs API.
+        """
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'params': self.params,
+            'status': self.status,
+            'progress': self.progress,
+            'result': self.result,
+            'error': self.error or None,
+            'cancel_requested': self.cancel_requested,
+            'created_at': self.created_at.isoformat(),
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+        }
@@ -0,0 +1,156 @@
+from decimal import Decimal, InvalidOperation
+from typing import Callable, Dict, List, Sequence, Tuple
+
+from django.db import models
+
+from .models import Item
+
+TRUE_VALUES = ('1', 'true', 'yes', 'y', 't')
+FALSE_VALUES = ('0', 'false', 'no', 'n', 'f')
+
+# Returned by a coercer when the value means "not given"; the key is dropped
+OMIT = object()
+
+
+def _text_coercer(field) -> Callable:
+    max_length = field.max_length
+
+    def coerce(value):
+        if value is None:
+            return ''
+        if isinstance(value, bool) or not isinstance(value, (str, int, float)):
+            raise ValueError(f'Invalid {field.name}: {value}')
+        value = str(value).strip()
+        if max_length and len(value) > max_length:
+            raise ValueError(f'{field.name} must be at most {max_length} characters')
+        return value
+
+    return coerce
+
+
+def _decimal_coercer(field) -> Callable:
+    quantum = Decimal(1).scaleb(-field.decimal_places)
+    limit = Decimal(10) ** (field.max_digits - field.decimal_places)
+
+    def coerce(value):
+        if value is None or value == '':
+            if field.null:
+                return None
+            return OMIT
+        if isinstance(value, bool):
+            raise ValueError(f'Invalid {field.name}: {value}')
+        try:
+            number = Decimal(str(value).strip())
+        except InvalidOperation:
+            raise ValueError(f'Invalid {field.name}: {value}')
+        if not number.is_finite() or abs(number) >= limit:
+            raise ValueError(f'Invalid {field.name}: {value}')
+        # Rounding can carry into a new digit (99999999.999 -> 100000000.00)
+        number = number.quantize(quantum)
+        if abs(number) >= limit:
+            raise ValueError(f'Invalid {field.name}: {value}')
+        return number
+
+    return coerce
+
+
+def _boolean_coercer(field) -> Callable:
+    def coerce(value):
+        if isinstance(value, bool):
+            return value
+        if value is None or value == '':
+            return OMIT
+        text = str(value).strip().lower()
+        if text in TRUE_VALUES:
+            return True
+        if text in FALSE_VALUES:
+            return False
+        raise ValueError(f'Invalid {field.name}: {value}')
+
+    return coerce
+
+
+COERCERS = (
+    (models.DecimalField, _decimal_coercer),
+    (models.BooleanField, _boolean_coercer),
+    (models.CharField, _text_coercer),
+    (models.TextField, _text_coercer),
+)
+
+
+class ModelSchema:
+    """
+    Write-payload validation compiled once from a model's fields.
+
+    Each writable field gets a coercer built from its type and options
+    (max_length, max_digits/decimal_places, null); required fields are those
+    that may not be blank and have no default. Cleaning strips unknown and
+    read-only keys and raises ValueError before any database work.
+    """
+
+    def __init__(self, model, read_only: Sequence[str] = ()):
+        self.fields: List[Tuple[str, Callable, bool]] = []
+        for field in model._meta.concrete_fields:
+            if field.primary_key or not field.editable or field.name in read_only:
+                continue
+            factory = next((factory for kind, factory in COERCERS if isinstance(field, kind)), None)
+            if factory is None:
+                continue
+            required = not field.blank and not field.has_default()
+            self.fields.append((field.name, factory(field), required))
+        self.field_names = tuple(name for name, _, _ in self.fields)
+
+    def clean(self, data, partial: bool = False) -> Dict:
+        """
+        Clean one payload; ``partial`` (updates) skips the required-field check.
+        """
+        valid, rejected = self.clean_many([data], partial)
+        if rejected:
+            raise ValueError(rejected[0][1])
+        return valid[0][1]
+
+    def clean_many(self, records: Sequence, partial: bool = False) -> Tuple[List[Tuple[int, Dict]], List[Tuple[int, str]]]:
+        """
+        Clean many payloads one field (column) at a time.
+
+        Returns ``(valid, rejected)``: ``(index, cleaned)`` pairs for good
+        records and ``(index, error)`` pairs, in input order, for the rest.
+        """
+        errors: Dict[int, str] = {}
+        cleaned: List[Dict] = [{} for _ in records]
+
+        for index, record in enumerate(records):
+            if not isinstance(record, dict):
+                errors[index] = 'Row must be an object'
+
+        for name, coerce, required in self.fields:
+            for index, record in enumerate(records):
+                if index in errors:
+                    continue
+                if name not in record:
+                    if required and not partial:
+                        errors[index] = f'{name.capitalize()} is required'
+                    continue
+                try:
+                    value = coerce(record[name])
+                except ValueError as e:
+                    errors[index] = str(e)
+                    continue
+                if required and value in ('', None):
+                    errors[index] = f'{name.capitalize()} is required'
+                elif value is not OMIT:
+                    cleaned[index][name] = value
+
+        valid = [(index, row) for index, row in enumerate(cleaned) if index not in errors]
+        return valid, sorted(errors.items())
+
+
+ITEM_SCHEMA = ModelSchema(Item, read_only=('created_at', 'updated_at'))
+
+
+def json_row(row: Dict) -> Dict:
+    """Cleaned row with Decimals as strings, ready for a JSON request body."""
+    return {
+        key: str(value) if isinstance(value, Decimal) else value
+        for key, value in row.items() if key != 'id'
+    }
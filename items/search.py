@@ -0,0 +1,36 @@
+"""
+Normalized search text shared by both backends.
+
+Items keep lowercased, accent-folded, whitespace-collapsed copies of their
+name and description (``name_search``/``description_search``), and search
+terms are normalized the same way, so matching needs no per-row lower() and
+can use ordinary indexes. Postgres computes the columns with
+``items_search_text()`` (supabase/migrations), which this function mirrors.
+"""
+import unicodedata
+
+# Normalized column for each searchable field
+SEARCH_COLUMNS = {
+    'name': 'name_search',
+    'description': 'description_search',
+}
+# How a term must match: anywhere in the text, at its start, or the whole text
+SEARCH_MATCHES = ('contains', 'prefix', 'exact')
+
+# Letters unaccent folds that have no Unicode decomposition
+FOLDED_LETTERS = str.maketrans({
+    'Æ': 'AE', 'æ': 'ae', 'Œ': 'OE', 'œ': 'oe', 'Ø': 'O', 'ø': 'o', 'Ł': 'L', 'ł': 'l',
+    'Đ': 'D', 'đ': 'd', 'Þ': 'TH', 'þ': 'th', 'ß': 'ss', 'ı': 'i',
+})
+
+
+def normalize_search_text(value) -> str:
+    """
+    Lowercase ``value``, strip its accents and collapse runs of whitespace
+    into single spaces ('  Crème  Brûlée ' -> 'creme brulee').
+    """
+    if not value:
+        return ''
+    decomposed = unicodedata.normalize('NFKD', str(value).translate(FOLDED_LETTERS))
+    folded = ''.join(char for char in decomposed if not unicodedata.combining(char))
+    return ' '.join(folded.lower().split())
@@ -1,6 +1,20 @@
-from typing import List, Dict, Optional
+import re
+from datetime import datetime
+from itertools import groupby
+from typing import List, Dict, Optional, Tuple
+from django.conf import settings
+from django.utils import timezone
+from postgrest.types import ReturnMethod
 from supabase_crud.utils import get_supabase_client
 from .models import Item
+from .archive import merge_pages
+from .batch import operation_result
+from .schema import json_row
+from .search import SEARCH_COLUMNS, normalize_search_text
+from .call_policy import CallPolicyRunner, TimedSession, policies_from_settings
+
+# Columns returned for an item, as in Item.to_dict(); the search columns and deleted_at stay internal
+ITEM_COLUMNS = 'id,name,description,price,created_at,updated_at,is_active'
 
 class SupabaseService:
     """
@@ -10,6 +24,37 @@ class SupabaseService:
     def __init__(self):
         self.client = get_supabase_client()
         self.table_name = 'items'
+        self.archive_table_name = 'items_archive'
+        self.calls = CallPolicyRunner(policies_from_settings())
+        self.use_rpc = getattr(settings, 'SUPABASE_USE_RPC', False)
+    
+    def call_stats(self) -> Dict[str, Dict]:
+        """
+        Per-method call counters (retries, timeouts, hedges) and latency percentiles.
+        """
+        return self.calls.stats()
+    
+    def _execute(self, method: str, query):
+        """
+        Run a built PostgREST query under the call policy for the given method.
+        """
+        # The HTTP request itself honours the policy timeout, so abandoned attempts free their thread
+        query.session = TimedSession(query.session, self.calls.policy_for(method).timeout)
+        return self.calls.run(method, query.execute)
+    
+    def _live(self, table: Optional[str] = None, columns: str = ITEM_COLUMNS, **options):
+        """
+        Select from the items table (or the archive) without soft-deleted rows.
+        """
+        return self.client.table(table or self.table_name).select(columns, **options).is_('deleted_at', 'null')
+    
+    def _returning(self, query, columns: str = ITEM_COLUMNS):
+        """
+        Limit the rows an insert, update or delete returns to ``columns``.
+        """
+        # The builders only take select= for reads, but PostgREST honours it on writes too
+        query.params = query.params.set('select', columns)
+        return query
     
     def create_item(self, item_data: Dict) -> Dict:
         """
@@ -26,7 +71,9 @@ class SupabaseService:
             if 'id' in item_data:
                 del item_data['id']
             
-            response = self.client.table(self.table_name).insert(item_data).execute()
+            response = self._execute('create_item', self._returning(
+                self.client.table(self.table_name).insert(json_row(item_data))
+            ))
             
             if response.data:
                 return response.data[0]
@@ -36,31 +83,61 @@ class SupabaseService:
         except Exception as e:
             raise Exception(f"Error creating item: {str(e)}")
     
-    def get_all_items(self) -> List[Dict]:
+    def bulk_create_items(self, items: List[Dict]) -> int:
+        """
+        Insert many items in Supabase with a single bulk request.
+        
+        Args:
+            items: List of dictionaries containing item data
+            
+        Returns:
+            Number of items created
+        """
+        try:
+            rows = [json_row(item_data) for item_data in items]
+            # Skip returning the rows; missing columns fall back to their defaults
+            self._execute('bulk_create_items', self.client.table(self.table_name).insert(
+                rows, returning=ReturnMethod.minimal, default_to_null=False
+            ))
+            return len(rows)
+            
+        except Exception as e:
+            raise Exception(f"Error creating items: {str(e)}")
+    
+    def get_all_items(self, limit: Optional[int] = None, offset: int = 0,
+                      cursor: Optional[Tuple[str, int]] = None, include_archived: bool = False) -> List[Dict]:
         """
         Retrieve all items from Supabase.
         
+        Args:
+            limit: Maximum number of items to return (all items if None)
+            offset: Number of items to skip when paginating
+            cursor: (created_at, id) of the last item on the previous page
+            include_archived: Also return items moved to the archive table
+            
         Returns:
             List of dictionaries containing item data
         """
         try:
-            response = self.client.table(self.table_name).select('*').execute()
-            return response.data
+            return self._read('get_all_items', self._live, limit, offset, cursor, include_archived)
         except Exception as e:
             raise Exception(f"Error fetching items: {str(e)}")
     
-    def get_item_by_id(self, item_id: int) -> Optional[Dict]:
+    def get_item_by_id(self, item_id: int, include_archived: bool = False) -> Optional[Dict]:
         """
         Retrieve a specific item by ID from Supabase.
         
         Args:
             item_id: ID of the item to retrieve
+            include_archived: Also look in the archive table
             
         Returns:
             Dictionary containing item data or None if not found
         """
         try:
-            response = self.client.table(self.table_name).select('*').eq('id', item_id).execute()
+            response = self._execute('get_item_by_id', self._live().eq('id', item_id))
+            if not response.data and include_archived:
+                response = self._execute('get_item_by_id', self._live(self.archive_table_name).eq('id', item_id))
             
             if response.data:
                 return response.data[0]
@@ -85,7 +162,9 @@ class SupabaseService:
             if 'id' in item_data:
                 del item_data['id']
             
-            response = self.client.table(self.table_name).update(item_data).eq('id', item_id).execute()
+            response = self._execute('update_item', self._returning(
+                self.client.table(self.table_name).update(json_row(item_data)).eq('id', item_id).is_('deleted_at', 'null')
+            ))
             
             if response.data:
                 return response.data[0]
@@ -96,7 +175,7 @@ class SupabaseService:
     
     def delete_item(self, item_id: int) -> bool:
         """
-        Delete an item from Supabase.
+        Soft-delete an item in Supabase; archive_batch removes the row later.
         
         Args:
             item_id: ID of the item to delete
@@ -105,7 +184,7 @@ class SupabaseService:
             True if deletion was successful, False otherwise
         """
         try:
-            response = self.client.table(self.table_name).delete().eq('id', item_id).execute()
+            response = self._execute('delete_item', self._soft_delete().eq('id', item_id))
             
             # Check if any rows were affected
             return len(response.data) > 0
@@ -113,18 +192,294 @@ class SupabaseService:
         except Exception as e:
             raise Exception(f"Error deleting item: {str(e)}")
     
-    def search_items(self, search_term: str) -> List[Dict]:
+    def search_items(self, search_term: str, limit: Optional[int] = None, offset: int = 0,
+                     cursor: Optional[Tuple[str, int]] = None, include_archived: bool = False,
+                     match: str = 'contains') -> List[Dict]:
         """
         Search items by name or description.
         
+        The term is normalized like the generated ``name_search`` and
+        ``description_search`` columns it is matched against.
+        
         Args:
             search_term: Term to search for
+            limit: Maximum number of items to return (all matches if None)
+            offset: Number of items to skip when paginating
+            cursor: (created_at, id) of the last item on the previous page
+            include_archived: Also search items moved to the archive table
+            match: 'contains', 'prefix' or 'exact'
             
         Returns:
             List of dictionaries containing matching items
         """
         try:
-            response = self.client.table(self.table_name).select('*').or_(f'name.ilike.%{search_term}%,description.ilike.%{search_term}%').execute()
-            return response.data
+            search_filter = self._search_filter(search_term, match)
+            return self._read('search_items', lambda table: self._live(table).or_(search_filter),
+                              limit, offset, cursor, include_archived)
+        except Exception as e:
+            raise Exception(f"Error searching items: {str(e)}")
+    
+    def count_items(self, search_term: Optional[str] = None, mode: str = 'exact',
+                    include_archived: bool = False, match: str = 'contains') -> Optional[int]:
+        """
+        Count items (optionally matching a search term) using PostgREST count modes.
+        
+        Args:
+            search_term: Optional term to restrict the count to matching items
+            mode: 'exact' (COUNT(*)), 'estimated' (planner statistics) or 'none'
+            include_archived: Add the matching items of the archive table
+            match: How search_term must match, as for search_items
+            
+        Returns:
+            Number of items, or None when mode is 'none'
+        """
+        try:
+            if mode == 'none':
+                return None
+            tables = [self.table_name, self.archive_table_name] if include_archived else [self.table_name]
+            total = 0
+            for table in tables:
+                # HEAD request: PostgREST returns the total in Content-Range without a body
+                query = self._live(table, 'id', count=mode, head=True)
+                if search_term:
+                    query = query.or_(self._search_filter(search_term, match))
+                total += self._execute('count_items', query).count or 0
+            return total
+        except Exception as e:
+            raise Exception(f"Error counting items: {str(e)}")
+    
+    def find_items(self, search_term: Optional[str] = None, limit: Optional[int] = None, offset: int = 0,
+                   cursor: Optional[Tuple[str, int]] = None, count_mode: str = 'none',
+                   include_archived: bool = False, match: str = 'contains') -> Tuple[List[Dict], Optional[int]]:
+        """
+        Retrieve a page of items (optionally matching a search term) and their count.
+        
+        With SUPABASE_USE_RPC, an exact count and the page come from one
+        ``items_find`` call; otherwise the page and the count are separate
+        requests.
+        
+        Args:
+            search_term: Optional term to search names and descriptions for
+            limit: Maximum number of items to return (all items if None)
+            offset: Number of items to skip when paginating
+            cursor: (created_at, id) of the last item on the previous page
+            count_mode: 'exact', 'estimated' or 'none', as for count_items
+            include_archived: Also return items moved to the archive table
+            match: How search_term must match, as for search_items
+            
+        Returns:
+            Tuple of (list of item dictionaries, count or None)
+        """
+        if not (self.use_rpc and count_mode == 'exact'):
+            if search_term:
+                items = self.search_items(search_term, limit, offset, cursor, include_archived, match)
+            else:
+                items = self.get_all_items(limit, offset, cursor, include_archived)
+            return items, self.count_items(search_term, mode=count_mode, include_archived=include_archived,
+                                           match=match)
+        
+        try:
+            params = {
+                'search_term': search_term or None,
+                'search_match': match,
+                'page_limit': limit,
+                'page_offset': offset,
+                'include_archived': include_archived,
+            }
+            if cursor:
+                params['after_created_at'], params['after_id'] = cursor
+            response = self._execute('find_items', self.client.rpc('items_find', params))
+            return response.data['items'], response.data['total']
+        except Exception as e:
+            raise Exception(f"Error fetching items: {str(e)}")
+    
+    def upsert_items(self, rows: List[Dict]) -> List[Optional[Dict]]:
+        """
+        Create and update many items in one transaction with one ``items_upsert`` call.
+        
+        Args:
+            rows: Item dictionaries; those with an 'id' update that item, the rest are created
+            
+        Returns:
+            The saved items in input order, with None for ids that were not found
+        """
+        try:
+            payload = [{**json_row(row), 'id': row['id']} if 'id' in row else json_row(row) for row in rows]
+            response = self._execute('upsert_items', self.client.rpc('items_upsert', {'payload': payload}))
+            # items_upsert returns whole table rows
+            return [self._item(row) if row else None for row in response.data]
         except Exception as e:
-            raise Exception(f"Error searching items: {str(e)}") 
\ No newline at end of file
+            raise Exception(f"Error saving items: {str(e)}")
+    
+    def item_stats(self) -> Dict:
+        """
+        Summary statistics (counts, price range, newest item) from one ``items_stats`` call.
+        
+        Returns:
+            Dictionary of statistics
+        """
+        try:
+            return self._execute('item_stats', self.client.rpc('items_stats', {})).data
+        except Exception as e:
+            raise Exception(f"Error computing item statistics: {str(e)}")
+    
+    def execute_batch(self, operations: List[Dict]) -> List[Dict]:
+        """
+        Run an ordered list of create/update/delete/get operations.
+        
+        Consecutive operations of the same kind are grouped into a single
+        PostgREST request (bulk insert, ``id=in.(...)`` select/delete); updates
+        carry per-row data and are sent one request each. With
+        SUPABASE_USE_RPC, each run of creates and updates is instead one
+        atomic ``items_upsert`` call. Each request is atomic on the server,
+        but the batch as a whole is not.
+        
+        Args:
+            operations: Validated list of operation dictionaries
+            
+        Returns:
+            List of per-operation result dictionaries, in request order
+        """
+        try:
+            results = []
+            for op, group in groupby(operations, key=self._batch_group):
+                group = list(group)
+                if op == 'save':
+                    values = self.upsert_items([
+                        {**operation['data'], 'id': operation['id']} if operation['op'] == 'update' else operation['data']
+                        for operation in group
+                    ])
+                elif op == 'create':
+                    rows = [json_row(operation['data']) for operation in group]
+                    response = self._execute('execute_batch', self._returning(
+                        self.client.table(self.table_name).insert(rows, default_to_null=False)
+                    ))
+                    values = response.data
+                elif op == 'update':
+                    values = [self.update_item(operation['id'], dict(operation['data'])) for operation in group]
+                elif op == 'delete':
+                    ids = list({operation['id'] for operation in group})
+                    response = self._execute('execute_batch', self._soft_delete().in_('id', ids))
+                    deleted = {row['id'] for row in response.data}
+                    values = []
+                    for operation in group:
+                        values.append(operation['id'] in deleted)
+                        deleted.discard(operation['id'])
+                else:
+                    ids = list({operation['id'] for operation in group})
+                    response = self._execute('execute_batch', self._live().in_('id', ids))
+                    rows = {row['id']: row for row in response.data}
+                    values = [rows.get(operation['id']) for operation in group]
+                
+                results.extend(operation_result(operation, value) for operation, value in zip(group, values))
+            return results
+            
+        except Exception as e:
+            raise Exception(f"Error executing batch: {str(e)}")
+    
+    def archive_batch(self, inactive_before: datetime, limit: int, after_id: int = 0) -> Tuple[int, Optional[int]]:
+        """
+        Move soft-deleted and long-inactive items into the archive table.
+        
+        The candidate rows are copied (upserted) into the archive first and
+        then deleted from the items table under the same condition, so a
+        failure between the two requests leaves a duplicate, never a lost
+        row. Rows changed in between (e.g. reactivated) are not deleted and
+        their archive copies are removed again.
+        
+        Args:
+            inactive_before: Inactive items last updated before this are moved
+            limit: Maximum number of items to move
+            after_id: Only consider items with a higher id
+            
+        Returns:
+            (items moved, highest id examined); the id is None when no candidates are left
+        """
+        try:
+            candidates = f'deleted_at.not.is.null,and(is_active.eq.false,updated_at.lt."{inactive_before.isoformat()}")'
+            response = self._execute('archive_batch', self.client.table(self.table_name).select('*')
+                                     .gt('id', after_id).or_(candidates).order('id').limit(limit))
+            rows = response.data
+            if not rows:
+                return 0, None
+            
+            ids = [row['id'] for row in rows]
+            archived_at = timezone.now().isoformat()
+            # The search columns are generated by the archive table itself
+            self._execute('archive_batch', self.client.table(self.archive_table_name).upsert(
+                [{**self._stored_columns(row), 'archived_at': archived_at} for row in rows],
+                returning=ReturnMethod.minimal
+            ))
+            response = self._execute('archive_batch', self._returning(
+                self.client.table(self.table_name).delete().in_('id', ids).or_(candidates), 'id'
+            ))
+            moved = {row['id'] for row in response.data}
+            changed = [item_id for item_id in ids if item_id not in moved]
+            if changed:
+                self._execute('archive_batch', self.client.table(self.archive_table_name).delete(
+                    returning=ReturnMethod.minimal
+                ).in_('id', changed))
+            return len(moved), ids[-1]
+            
+        except Exception as e:
+            raise Exception(f"Error archiving items: {str(e)}")
+    
+    def _batch_group(self, operation: Dict) -> str:
+        if self.use_rpc and operation['op'] in ('create', 'update'):
+            return 'save'
+        return operation['op']
+    
+    def _soft_delete(self):
+        return self._returning(self.client.table(self.table_name).update(
+            {'deleted_at': timezone.now().isoformat()}
+        ).is_('deleted_at', 'null'), 'id')
+    
+    def _read(self, method: str, build, limit, offset, cursor, include_archived):
+        """
+        Run a paged read built by ``build(table)`` on the items table, and on
+        the archive table too when include_archived is set.
+        """
+        if not include_archived:
+            return self._execute(method, self._page(build(self.table_name), limit, offset, cursor)).data
+        # Each table supplies the whole window up to offset + limit; the merge keeps the page
+        window = None if limit is None else offset + limit
+        pages = [
+            self._execute(method, self._page(build(table), window, 0, cursor)).data
+            for table in (self.table_name, self.archive_table_name)
+        ]
+        return merge_pages(pages[0], pages[1], limit, offset)
+    
+    def _page(self, query, limit, offset, cursor):
+        if cursor:
+            # Keyset condition; PostgREST ANDs it with any other or= filter
+            created_at, item_id = cursor
+            query = query.or_(f'created_at.lt."{created_at}",and(created_at.eq."{created_at}",id.lt.{item_id})')
+        if limit is not None or cursor:
+            query = query.order('created_at', desc=True).order('id', desc=True)
+        if limit is not None:
+            query = query.range(offset, offset + limit - 1)
+        return query
+    
+    def _search_filter(self, search_term: str, match: str = 'contains') -> str:
+        term = normalize_search_text(search_term)
+        if match == 'exact':
+            condition = f'eq.{self._quote(term)}'
+        else:
+            # The term's own LIKE wildcards match literally, as with Django's contains.
+            # PostgREST turns every * into %, so a literal * can only be approximated by _
+            literal = re.sub(r'([\\%_])', r'\\\1', term).replace('*', '_')
+            pattern = f'{literal}*' if match == 'prefix' else f'*{literal}*'
+            condition = f'like.{self._quote(pattern)}'
+        return ','.join(f'{column}.{condition}' for column in SEARCH_COLUMNS.values())
+    
+    def _quote(self, value: str) -> str:
+        # Double quotes keep commas, dots and parentheses from ending the or=() filter
+        escaped = value.replace('\\', '\\\\').replace('"', '\\"')
+        return f'"{escaped}"'
+    
+    def _item(self, row: Dict) -> Dict:
+        columns = ITEM_COLUMNS.split(',')
+        return {key: value for key, value in row.items() if key in columns}
+    
+    def _stored_columns(self, row: Dict) -> Dict:
+        return {key: value for key, value in row.items() if key not in SEARCH_COLUMNS.values()}
@@ -1,3 +1,1335 @@
-from django.test import TestCase
+import json
+import re
+import subprocess
+import sys
+import os
+import tempfile
+import threading
+import time
+import unittest
+import warnings
+import zlib
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from decimal import Decimal
+from io import BytesIO, StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.apps import apps
+from django.core.management import call_command
+from django.db import transaction
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from supabase_crud import routers
+
+try:
+    from supabase_crud import server
+except ImportError:
+    # The production server needs gunicorn
+    server = None
+
+from . import columnar, compression, jobs, middleware, views
+from .archive import archive_items
+from .batch import validate_operations
+from .fake_postgrest import FakePostgrest
+from .importer import ItemImporter, iter_records
+from .local_service import LocalService
+from .lookup_cache import NegativeCachingService, NegativeLookupCache
+from .models import Item, ItemArchive, ItemCounter, Job
+from .schema import ITEM_SCHEMA, json_row
+from .warmup import warm_up
+from .views import MAX_PAGE_SIZE, encode_cursor, get_service, parse_pagination
+
+# Keys of Item.to_dict(), which both backends return for an item
+ITEM_FIELDS = {'id', 'name', 'description', 'price', 'created_at', 'updated_at', 'is_active'}
+
+# Items and search terms with characters that are special to PostgREST filters or LIKE
+PARITY_ITEMS = [
+    {'name': 'a,b widget', 'description': 'Comma in the name', 'price': '1.00'},
+    {'name': 'Half price', 'description': '50% off', 'price': '2.00'},
+    {'name': '500 off', 'description': 'No percent sign', 'price': '3.00'},
+    {'name': 'q_z', 'description': 'Underscore', 'price': '4.00'},
+    {'name': 'qaz', 'description': '(parenthesised) "quoted" text', 'price': '5.00'},
+    {'name': 'Crème brûlée', 'description': 'Accents', 'price': '6.00'},
+    {'name': 'Widget', 'description': 'Plain', 'price': '7.00', 'is_active': False},
+]
+PARITY_TERMS = ['a,b', '50%', 'q_z', '(parenthesised)', '"quoted"', 'CREME', 'widget', 'off']
+
+
+class LocalBackendMixin:
+    """
+    Serve the views from LocalService whatever the environment configures,
+    with job files in a temporary directory.
+    """
+
+    def setUp(self):
+        super().setUp()
+        environ = mock.patch.dict(os.environ, {'SUPABASE_URL': '', 'SUPABASE_KEY': ''})
+        environ.start()
+        self.addCleanup(environ.stop)
+        self.reset_service()
+        self.addCleanup(self.reset_service)
+        files = tempfile.TemporaryDirectory()
+        self.addCleanup(files.cleanup)
+        self.job_files = files.name
+        job_settings = override_settings(JOB_FILES_DIR=self.job_files)
+        job_settings.enable()
+        self.addCleanup(job_settings.disable)
+
+    def reset_service(self):
+        for name in ('_instance', '_type'):
+            if hasattr(get_service, name):
+                delattr(get_service, name)
+
+
+class FakeSupabaseMixin:
+    """
+    Run SupabaseService against a FakePostgrest started for each test.
+    """
+
+    def start_fake(self, **options):
+        fake = FakePostgrest(**options).start()
+        self.addCleanup(fake.stop)
+        return fake
+
+    def supabase_service(self, fake):
+        from .supabase_service import SupabaseService
+        with mock.patch.dict(os.environ, {'SUPABASE_URL': fake.url, 'SUPABASE_KEY': 'test'}):
+            return SupabaseService()
+
+
+class CallPolicyTests(FakeSupabaseMixin, SimpleTestCase):
+    """Retries, timeouts and hedges of Supabase calls, counted per method."""
+
+    @override_settings(SUPABASE_CALL_POLICIES={'get_item_by_id': {'retries': 2, 'backoff': 0}})
+    def test_dropped_connections_are_retried(self):
+        fake = self.start_fake(error_rate=1.0)
+        service = self.supabase_service(fake)
+        with self.assertRaises(Exception):
+            service.get_item_by_id(1)
+        stats = service.call_stats()['get_item_by_id']
+        self.assertEqual((stats['calls'], stats['retries'], stats['failures']), (1, 2, 1))
+        self.assertEqual(fake.request_count, 3)
+
+    @override_settings(SUPABASE_CALL_POLICIES={'create_item': {'timeout': 0.2}})
+    def test_slow_writes_time_out_without_retrying(self):
+        fake = self.start_fake(latency=2.0)
+        service = self.supabase_service(fake)
+        with self.assertRaises(Exception):
+            service.create_item({'name': 'Slow'})
+        stats = service.call_stats()['create_item']
+        self.assertEqual((stats['timeouts'], stats['retries'], stats['failures']), (1, 0, 1))
+
+    @override_settings(SUPABASE_CALL_POLICIES={'get_item_by_id': {'timeout': 0.2, 'retries': 1, 'backoff': 0}})
+    def test_timed_out_reads_are_retried(self):
+        fake = self.start_fake(latency=2.0)
+        service = self.supabase_service(fake)
+        with self.assertRaises(Exception):
+            service.get_item_by_id(1)
+        stats = service.call_stats()['get_item_by_id']
+        self.assertEqual((stats['timeouts'], stats['retries'], stats['failures']), (2, 1, 1))
+
+    @override_settings(SUPABASE_CALL_POLICIES={'get_all_items': {'hedge_after': 0.05}})
+    def test_slow_reads_are_hedged(self):
+        fake = self.start_fake(latency=0.3)
+        service = self.supabase_service(fake)
+        self.assertEqual(service.get_all_items(), [])
+        stats = service.call_stats()['get_all_items']
+        self.assertEqual((stats['hedges'], stats['successes'], stats['failures']), (1, 1, 0))
+
+    @override_settings(SUPABASE_CALL_POLICIES={'get_all_items': {'hedge_after': 0.05}})
+    def test_fast_reads_are_not_hedged(self):
+        fake = self.start_fake()
+        service = self.supabase_service(fake)
+        service.get_all_items()
+        self.assertEqual(service.call_stats()['get_all_items']['hedges'], 0)
+        self.assertEqual(fake.request_count, 1)
+
+
+@override_settings(SUPABASE_USE_RPC=True)
+class SupabaseRpcTests(FakeSupabaseMixin, SimpleTestCase):
+    """The single-request items_find, items_upsert and items_stats paths."""
+
+    def setUp(self):
+        self.fake = self.start_fake()
+        self.service = self.supabase_service(self.fake)
+        self.items = [self.service.create_item(ITEM_SCHEMA.clean(row)) for row in PARITY_ITEMS]
+
+    def test_find_items_returns_page_and_count_in_one_request(self):
+        before = self.fake.request_count
+        items, total = self.service.find_items('off', limit=1, count_mode='exact')
+        self.assertEqual(self.fake.request_count - before, 1)
+        self.assertEqual(total, 2)
+        self.assertEqual([item['name'] for item in items], ['500 off'])
+        self.assertEqual(set(items[0]), ITEM_FIELDS)
+
+    def test_upsert_items_saves_in_one_request(self):
+        before = self.fake.request_count
+        saved = self.service.upsert_items([
+            {'id': self.items[0]['id'], 'price': '9.50'},
+            {'name': 'Created by upsert'},
+            {'id': 999999, 'price': '1.00'},
+        ])
+        self.assertEqual(self.fake.request_count - before, 1)
+        self.assertEqual(saved[0]['price'], 9.5)
+        self.assertEqual(saved[1]['name'], 'Created by upsert')
+        self.assertIsNone(saved[2])
+        self.assertEqual(set(saved[0]), ITEM_FIELDS)
+        self.assertEqual(set(saved[1]), ITEM_FIELDS)
+
+    def test_upsert_items_rolls_back_on_error(self):
+        with self.assertRaises(Exception):
+            self.service.upsert_items([
+                {'id': self.items[0]['id'], 'price': '9.50'},
+                {'description': 'No name'},
+            ])
+        self.assertEqual(self.service.get_item_by_id(self.items[0]['id'])['price'], 1.0)
+        self.assertEqual(len(self.service.get_all_items()), len(PARITY_ITEMS))
+
+    def test_item_stats(self):
+        self.service.delete_item(self.items[-1]['id'])
+        stats = self.service.item_stats()
+        self.assertEqual(
+            {key: stats[key] for key in ('total', 'active', 'inactive', 'deleted', 'min_price', 'max_price')},
+            {'total': 6, 'active': 6, 'inactive': 0, 'deleted': 1, 'min_price': 1.0, 'max_price': 6.0},
+        )
+
+
+class BackendParityTests(FakeSupabaseMixin, TestCase):
+    """LocalService and SupabaseService answer the same reads the same way."""
+
+    def setUp(self):
+        fake = self.start_fake()
+        self.local = LocalService()
+        self.remotes = {}
+        for use_rpc in (False, True):
+            with override_settings(SUPABASE_USE_RPC=use_rpc):
+                self.remotes[use_rpc] = self.supabase_service(fake)
+        for row in PARITY_ITEMS:
+            self.local.create_item(ITEM_SCHEMA.clean(row))
+            self.remotes[False].create_item(ITEM_SCHEMA.clean(row))
+
+    def remote_services(self):
+        for use_rpc, service in self.remotes.items():
+            with self.subTest(use_rpc=use_rpc):
+                yield service
+
+    def walk(self, service, search_term=None, **options):
+        """Names of every matching item, read two at a time with keyset cursors."""
+        names, cursor = [], None
+        while True:
+            items, total = service.find_items(search_term, limit=2, cursor=cursor, count_mode='exact', **options)
+            names.extend(item['name'] for item in items)
+            if len(items) < 2:
+                return names, total
+            cursor = (items[-1]['created_at'], items[-1]['id'])
+
+    def test_cursor_pagination(self):
+        expected = self.walk(self.local)
+        self.assertEqual(expected, ([row['name'] for row in reversed(PARITY_ITEMS)], len(PARITY_ITEMS)))
+        for service in self.remote_services():
+            self.assertEqual(self.walk(service), expected)
+
+    def test_search(self):
+        for term in PARITY_TERMS:
+            for match in ('contains', 'prefix', 'exact'):
+                expected = self.walk(self.local, term, match=match)
+                for service in self.remote_services():
+                    self.assertEqual(self.walk(service, term, match=match), expected, (term, match))
+
+    def test_search_treats_like_wildcards_literally(self):
+        self.assertEqual(self.walk(self.local, '50%'), (['Half price'], 1))
+        self.assertEqual(self.walk(self.local, 'q_z'), (['q_z'], 1))
+
+    def test_items_have_the_same_fields(self):
+        local = self.local.get_all_items(limit=1)[0]
+        self.assertEqual(set(local), ITEM_FIELDS)
+        for service in self.remote_services():
+            item = service.get_all_items(limit=1)[0]
+            self.assertEqual(set(item), ITEM_FIELDS)
+            self.assertEqual(set(service.get_item_by_id(item['id'])), ITEM_FIELDS)
+            self.assertEqual(set(service.search_items('widget')[0]), ITEM_FIELDS)
+            self.assertEqual(set(service.update_item(item['id'], {'price': '8.00'})), ITEM_FIELDS)
+
+
+class BatchTests(TestCase):
+    """LocalService.execute_batch runs every operation in one transaction."""
+
+    def setUp(self):
+        self.service = LocalService()
+        self.item = self.service.create_item({'name': 'Existing', 'price': '1.00'})
+
+    def test_operations_run_in_order(self):
+        results = self.service.execute_batch(validate_operations([
+            {'op': 'update', 'id': self.item['id'], 'data': {'price': '2.50'}},
+            {'op': 'get', 'id': self.item['id']},
+            {'op': 'delete', 'id': self.item['id']},
+            {'op': 'get', 'id': self.item['id']},
+            {'op': 'create', 'data': {'name': 'Created'}},
+        ]))
+        self.assertEqual([result['success'] for result in results], [True, True, True, False, True])
+        self.assertEqual(results[1]['data']['price'], 2.5)
+        self.assertEqual(results[4]['data']['name'], 'Created')
+        self.assertEqual(ItemCounter.current(), 1)
+
+    def test_failed_operation_rolls_back_the_batch(self):
+        operations = validate_operations([
+            {'op': 'update', 'id': self.item['id'], 'data': {'price': '2.50'}},
+            {'op': 'create', 'data': {'name': 'Never saved'}},
+            {'op': 'delete', 'id': self.item['id']},
+        ])
+        # Passes validation but violates the NOT NULL constraint on name
+        operations.append({'op': 'create', 'data': {'name': None}})
+        with self.assertRaises(Exception):
+            self.service.execute_batch(operations)
+        self.assertEqual(list(Item.all_objects.values_list('name', 'price', 'deleted_at')),
+                         [('Existing', Decimal('1.00'), None)])
+        self.assertEqual(ItemCounter.current(), 1)
+
+    def test_invalid_operation_rejects_the_batch(self):
+        with self.assertRaisesMessage(ValueError, 'Operation 1: Invalid price: cheap'):
+            validate_operations([
+                {'op': 'create', 'data': {'name': 'Fine'}},
+                {'op': 'create', 'data': {'name': 'Broken', 'price': 'cheap'}},
+            ])
+        for item_id in ('1', True, None):
+            with self.subTest(id=item_id):
+                with self.assertRaisesMessage(ValueError, 'Operation 0: integer id is required for delete'):
+                    validate_operations([{'op': 'delete', 'id': item_id}])
+
+
+class ItemSchemaTests(SimpleTestCase):
+    """ITEM_SCHEMA coerces write payloads and rejects invalid ones."""
+
+    def test_coerces_values(self):
+        cleaned = ITEM_SCHEMA.clean({
+            'name': '  Widget  ', 'description': None, 'price': ' 19.999 ', 'is_active': 'no',
+        })
+        self.assertEqual(cleaned, {
+            'name': 'Widget', 'description': '', 'price': Decimal('20.00'), 'is_active': False,
+        })
+        self.assertEqual(json_row(cleaned)['price'], '20.00')
+
+    def test_drops_unknown_read_only_and_generated_fields(self):
+        cleaned = ITEM_SCHEMA.clean({
+            'id': 7, 'name': 'Widget', 'created_at': '2020-01-01T00:00:00Z', 'deleted_at': None,
+            'name_search': 'forged', 'description_search': 'forged', 'colour': 'red',
+        })
+        self.assertEqual(cleaned, {'name': 'Widget'})
+        self.assertEqual(ITEM_SCHEMA.field_names, ('name', 'description', 'price', 'is_active'))
+
+    def test_blank_values_clear_nullable_fields_and_skip_the_rest(self):
+        self.assertEqual(
+            ITEM_SCHEMA.clean({'name': 'Widget', 'price': '', 'is_active': None}),
+            {'name': 'Widget', 'price': None},
+        )
+
+    def test_rejects_invalid_values(self):
+        cases = [
+            ({'price': '1.00'}, 'Name is required'),
+            ({'name': '   '}, 'Name is required'),
+            ({'name': 'x' * 201}, 'name must be at most 200 characters'),
+            ({'name': ['Widget']}, 'Invalid name'),
+            ({'name': 'Widget', 'price': 'cheap'}, 'Invalid price: cheap'),
+            ({'name': 'Widget', 'price': 'NaN'}, 'Invalid price: NaN'),
+            ({'name': 'Widget', 'price': '100000000'}, 'Invalid price: 100000000'),
+            ({'name': 'Widget', 'price': '99999999.999'}, 'Invalid price: 99999999.999'),
+            ({'name': 'Widget', 'price': True}, 'Invalid price: True'),
+            ({'name': 'Widget', 'is_active': 'maybe'}, 'Invalid is_active: maybe'),
+            ('Widget', 'Row must be an object'),
+        ]
+        for payload, error in cases:
+            with self.subTest(payload=payload):
+                with self.assertRaisesMessage(ValueError, error):
+                    ITEM_SCHEMA.clean(payload)
+
+    def test_partial_updates_skip_required_fields(self):
+        self.assertEqual(ITEM_SCHEMA.clean({'price': 5}, partial=True), {'price': Decimal('5.00')})
+        with self.assertRaisesMessage(ValueError, 'Name is required'):
+            ITEM_SCHEMA.clean({'name': ''}, partial=True)
+
+    def test_clean_many_reports_rejected_rows_by_index(self):
+        valid, rejected = ITEM_SCHEMA.clean_many([
+            {'name': 'First'}, {'price': '1.00'}, {'name': 'Third', 'is_active': 'yes'}, None,
+        ])
+        self.assertEqual(valid, [(0, {'name': 'First'}), (2, {'name': 'Third', 'is_active': True})])
+        self.assertEqual(rejected, [(1, 'Name is required'), (3, 'Row must be an object')])
+
+
+class NegativeCacheTests(TestCase):
+    """NegativeCachingService remembers missing ids and forgets them on writes."""
+
+    def setUp(self):
+        self.cache = NegativeLookupCache(ttl=60, max_entries=100)
+        self.service = NegativeCachingService(LocalService(), self.cache)
+        self.item = self.service.create_item({'name': 'Existing'})
+        self.next_id = self.item['id'] + 1
+
+    def test_misses_skip_the_database(self):
+        self.assertIsNone(self.service.get_item_by_id(self.next_id))
+        with self.assertNumQueries(0):
+            self.assertIsNone(self.service.get_item_by_id(self.next_id))
+        self.assertEqual(self.cache.stats()['hits'], 1)
+
+    def test_create_invalidates(self):
+        self.assertIsNone(self.service.get_item_by_id(self.next_id))
+        created = self.service.create_item({'name': 'Created'})
+        self.assertEqual(created['id'], self.next_id)
+        self.assertEqual(self.service.get_item_by_id(self.next_id)['name'], 'Created')
+
+    def test_batch_and_upsert_creates_invalidate(self):
+        for save in (
+            lambda: self.service.execute_batch(validate_operations([{'op': 'create', 'data': {'name': 'Batch'}}])),
+            lambda: self.service.upsert_items([{'name': 'Upsert'}]),
+        ):
+            item_id = Item.all_objects.latest('id').id + 1
+            self.assertIsNone(self.service.get_item_by_id(item_id))
+            save()
+            self.assertIsNotNone(self.service.get_item_by_id(item_id))
+
+    def test_bulk_create_clears_the_set(self):
+        self.assertIsNone(self.service.get_item_by_id(self.next_id))
+        self.service.bulk_create_items([{'name': 'Bulk'}])
+        self.assertEqual(self.cache.stats()['entries'], 0)
+        self.assertEqual(self.service.get_item_by_id(self.next_id)['name'], 'Bulk')
+
+    def test_delete_adds_the_id(self):
+        self.assertTrue(self.service.delete_item(self.item['id']))
+        with self.assertNumQueries(0):
+            self.assertIsNone(self.service.get_item_by_id(self.item['id']))
+
+    def test_verified_hits_drop_wrong_entries(self):
+        self.cache.verify_rate = 1.0
+        self.cache.add(self.item['id'])
+        self.assertEqual(self.service.get_item_by_id(self.item['id'])['name'], 'Existing')
+        stats = self.cache.stats()
+        self.assertEqual((stats['false_positives'], stats['entries']), (1, 0))
+
+    def test_replica_misses_are_not_remembered(self):
+        with mock.patch('items.lookup_cache.reading_primary', return_value=False):
+            self.assertIsNone(self.service.get_item_by_id(self.next_id))
+        self.assertEqual(self.cache.stats()['entries'], 0)
+
+    def test_pinned_clients_bypass_the_set(self):
+        self.cache.add(self.item['id'])
+        with mock.patch('items.lookup_cache.pinned_to_primary', return_value=True):
+            self.assertEqual(self.service.get_item_by_id(self.item['id'])['name'], 'Existing')
+        self.assertEqual(self.cache.stats()['entries'], 0)
+
+
+class SoftDeleteArchiveTests(FakeSupabaseMixin, TestCase):
+    """Deletes only mark rows; archive_items moves them out of the hot table."""
+
+    def setUp(self):
+        self.service = LocalService()
+        self.kept = self.service.create_item({'name': 'Kept'})
+        self.deleted = self.service.create_item({'name': 'Deleted'})
+        self.stale = self.service.create_item({'name': 'Stale', 'is_active': False})
+        self.recent = self.service.create_item({'name': 'Recently inactive', 'is_active': False})
+        Item.objects.filter(id=self.stale['id']).update(updated_at=timezone.now() - timedelta(days=400))
+
+    def test_soft_delete_hides_the_item(self):
+        self.assertTrue(self.service.delete_item(self.deleted['id']))
+        self.assertIsNotNone(Item.all_objects.get(id=self.deleted['id']).deleted_at)
+        self.assertIsNone(self.service.get_item_by_id(self.deleted['id']))
+        self.assertIsNone(self.service.update_item(self.deleted['id'], {'name': 'Back'}))
+        self.assertFalse(self.service.delete_item(self.deleted['id']))
+        self.assertNotIn(self.deleted['id'], [item['id'] for item in self.service.get_all_items()])
+        self.assertEqual(self.service.search_items('deleted'), [])
+        self.assertEqual(ItemCounter.current(), 3)
+        self.assertEqual(self.service.item_stats()['deleted'], 1)
+
+    def test_archive_moves_deleted_and_stale_items(self):
+        self.service.delete_item(self.deleted['id'])
+        summary = archive_items(self.service, inactive_days=30, batch_size=1)
+        self.assertEqual((summary['archived'], summary['batches']), (2, 2))
+
+        self.assertEqual(
+            sorted(Item.all_objects.values_list('name', flat=True)), ['Kept', 'Recently inactive']
+        )
+        archived = ItemArchive.objects.in_bulk()
+        self.assertEqual(sorted(archived), [self.deleted['id'], self.stale['id']])
+        self.assertIsNotNone(archived[self.deleted['id']].deleted_at)
+        self.assertEqual(archived[self.stale['id']].name_search, 'stale')
+        self.assertEqual((ItemCounter.current(), ItemCounter.current('items_archive')), (2, 1))
+
+        # Archived items stay readable on request, unless they were deleted
+        self.assertIsNone(self.service.get_item_by_id(self.stale['id']))
+        self.assertEqual(self.service.get_item_by_id(self.stale['id'], include_archived=True)['name'], 'Stale')
+        self.assertIsNone(self.service.get_item_by_id(self.deleted['id'], include_archived=True))
+        self.assertEqual(
+            [item['name'] for item in self.service.get_all_items(include_archived=True)],
+            ['Recently inactive', 'Stale', 'Kept'],
+        )
+
+    def test_supabase_archive_moves_deleted_items(self):
+        fake = self.start_fake()
+        service = self.supabase_service(fake)
+        kept = service.create_item({'name': 'Kept'})
+        deleted = service.create_item({'name': 'Deleted'})
+        self.assertTrue(service.delete_item(deleted['id']))
+        self.assertIsNone(service.get_item_by_id(deleted['id']))
+
+        self.assertEqual(archive_items(service, inactive_days=30)['archived'], 1)
+        self.assertEqual([row['id'] for row in fake.db.execute('SELECT id FROM items')], [kept['id']])
+        row = fake.db.execute('SELECT * FROM items_archive').fetchone()
+        self.assertEqual((row['id'], row['name_search']), (deleted['id'], 'deleted'))
+        self.assertIsNotNone(row['deleted_at'])
+        self.assertIsNotNone(row['archived_at'])
+
+
+class JobTests(LocalBackendMixin, TestCase):
+    """Queueing, claiming, running and cancelling background jobs."""
+
+    def register(self, handler, params=None):
+        """Register ``handler`` as the 'test' job kind for this test."""
+        patcher = mock.patch.multiple(
+            jobs, JOB_TYPES={**jobs.JOB_TYPES, 'test': handler}, JOB_PARAMS={**jobs.JOB_PARAMS, 'test': params or {}}
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def create_job(self, body):
+        return self.client.post('/api/jobs/create/', body, content_type='application/json')
+
+    def test_params_are_validated(self):
+        job = jobs.enqueue('archive', {'inactive_days': '30', 'batch_size': 50})
+        self.assertEqual(job.params, {'inactive_days': 30, 'batch_size': 50})
+        self.assertEqual(jobs.enqueue('export', {'include_archived': 'false'}).params, {'include_archived': False})
+
+        cases = [
+            ({'kind': 'reindex'}, 'kind must be one of'),
+            ({'kind': 'export', 'params': ['csv']}, 'params must be an object'),
+            ({'kind': 'export', 'params': {'colour': 'red'}}, 'Unknown params for export jobs: colour'),
+            ({'kind': 'export', 'params': {'format': 'xml'}}, 'format must be one of: csv, ndjson'),
+            ({'kind': 'export', 'params': {'include_archived': 'yes'}}, 'include_archived must be true or false'),
+            ({'kind': 'archive', 'params': {'inactive_days': -5}}, 'inactive_days must be an integer of at least 0'),
+            ({'kind': 'archive', 'params': {'inactive_days': '3.5'}}, 'inactive_days must be an integer'),
+            ({'kind': 'archive', 'params': {'batch_size': True}}, 'batch_size must be an integer of at least 1'),
+            ({'kind': 'refresh_counter', 'params': {'force': True}}, 'accepted: none'),
+        ]
+        for body, error in cases:
+            with self.subTest(body=body):
+                response = self.create_job(body)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn(error, response.json()['error'])
+        self.assertEqual(Job.objects.count(), 2)
+
+    def test_clients_cannot_supply_files(self):
+        victim = os.path.join(self.job_files, 'victim.csv')
+        with open(victim, 'w') as keep:
+            keep.write('name\nKept\n')
+        token = jobs.stage_upload([b'name\nStaged\n'], 'csv')
+        for body in (
+            {'kind': 'import', 'params': {'path': victim, 'delete_after': True}},
+            {'kind': 'import', 'params': {'upload': token}},
+            {'kind': 'import'},
+            {'kind': 'export', 'params': {'path': victim}},
+        ):
+            with self.subTest(body=body):
+                self.assertEqual(self.create_job(body).status_code, 400)
+        for upload in ('../victim.csv', victim, 'victim.csv', 'upload-../../etc/passwd.csv', None):
+            with self.subTest(upload=upload):
+                with self.assertRaises(ValueError):
+                    jobs.enqueue('import', {'format': 'csv'}, upload=upload)
+        self.assertTrue(os.path.exists(victim))
+        self.assertFalse(Job.objects.exists())
+
+    def test_cancel_queued_job(self):
+        job = jobs.enqueue('refresh_counter')
+        response = self.client.post(f'/api/jobs/{job.id}/cancel/')
+        self.assertEqual(response.json()['data']['status'], Job.CANCELLED)
+        self.assertIsNone(jobs.claim_next('worker'))
+
+    def test_cancel_running_job(self):
+        def handler(params, context):
+            jobs.cancel(context.job.id)
+            context.progress(force=True, step=1)
+            return {'finished': True}
+
+        self.register(handler)
+        job = jobs.enqueue('test')
+        self.assertEqual(jobs.claim_next('worker').id, job.id)
+        self.assertEqual(jobs.run_job(job.id), Job.CANCELLED)
+        job.refresh_from_db()
+        self.assertEqual((job.cancel_requested, job.result, job.progress), (True, None, {'step': 1}))
+
+    def test_claim_skips_jobs_taken_by_another_worker(self):
+        first, second = jobs.enqueue('refresh_counter'), jobs.enqueue('refresh_counter')
+        now = timezone.now
+
+        def claimed_elsewhere():
+            # Another worker claims the first job between the read and the conditional update
+            if not Job.objects.filter(worker='other').exists():
+                Job.objects.filter(id=first.id).update(status=Job.RUNNING, worker='other')
+            return now()
+
+        with mock.patch.object(jobs.timezone, 'now', side_effect=claimed_elsewhere):
+            claimed = jobs.claim_next('worker')
+        self.assertEqual(claimed.id, second.id)
+        self.assertEqual(Job.objects.get(id=first.id).worker, 'other')
+        self.assertEqual(Job.objects.get(id=second.id).worker, 'worker')
+        self.assertIsNone(jobs.claim_next('worker'))
+
+    def test_run_export_job_and_download(self):
+        LocalService().create_item({'name': 'Exported'})
+        job = jobs.enqueue('export', {'format': 'ndjson'})
+        jobs.claim_next('worker')
+        self.assertEqual(jobs.run_job(job.id), Job.SUCCEEDED)
+        job.refresh_from_db()
+        self.assertEqual((job.result['rows'], job.progress), (1, {'rows': 1}))
+        response = self.client.get(f'/api/jobs/{job.id}/download/')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'"name": "Exported"', b''.join(response.streaming_content))
+        response.close()
+
+    def test_failed_job_records_the_error(self):
+        def handler(params, context):
+            raise RuntimeError('backend unavailable')
+
+        self.register(handler)
+        job = jobs.enqueue('test')
+        jobs.claim_next('worker')
+        self.assertEqual(jobs.run_job(job.id), Job.FAILED)
+        response = self.client.get(f'/api/jobs/{job.id}/')
+        self.assertEqual(response.json()['data']['error'], 'backend unavailable')
+        self.assertEqual(self.client.get(f'/api/jobs/{job.id}/download/').status_code, 404)
+
+    def test_missing_jobs_are_404(self):
+        self.assertEqual(self.client.get('/api/jobs/999/').status_code, 404)
+        self.assertEqual(self.client.get('/api/jobs/999/download/').status_code, 404)
+        self.assertEqual(self.client.post('/api/jobs/999/cancel/').status_code, 404)
+        queued = jobs.enqueue('export')
+        self.assertEqual(self.client.get(f'/api/jobs/{queued.id}/download/').status_code, 404)
+
+
+@override_settings(
+    RATE_LIMIT_PER_SECOND=1, RATE_LIMIT_BURST=2, RATE_LIMIT_STORE='',
+    RATE_LIMIT_CLIENT_HEADER='HTTP_X_FORWARDED_FOR', RATE_LIMIT_TRUSTED_PROXIES=1,
+    CONCURRENCY_LIMITS={'read': (1, 1)}, ADMISSION_QUEUE_TIMEOUT=0.2,
+)
+class AdmissionControlTests(SimpleTestCase):
+    """Rate limiting and concurrency admission of AdmissionControlMiddleware."""
+
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.middleware = middleware.AdmissionControlMiddleware(lambda request: JsonResponse({'success': True}))
+
+    def get(self, path='/api/items/', forwarded_for='203.0.113.7'):
+        return self.middleware(self.factory.get(path, HTTP_X_FORWARDED_FOR=forwarded_for))
+
+    def test_empty_bucket_is_answered_429(self):
+        self.assertEqual([self.get().status_code for _ in range(3)], [200, 200, 429])
+        response = self.get()
+        self.assertEqual(response['Retry-After'], '1')
+        self.assertEqual(json.loads(response.content), {'success': False, 'error': 'Rate limit exceeded'})
+        # Other clients and pages outside the API are not affected
+        self.assertEqual(self.get(forwarded_for='198.51.100.1').status_code, 200)
+        self.assertEqual(self.get('/').status_code, 200)
+
+    @override_settings(RATE_LIMIT_PER_SECOND=0)
+    def test_rate_limiting_can_be_disabled(self):
+        self.middleware = middleware.AdmissionControlMiddleware(lambda request: JsonResponse({'success': True}))
+        self.assertEqual({self.get().status_code for _ in range(10)}, {200})
+
+    def test_forged_forwarded_for_does_not_reset_the_bucket(self):
+        codes = [self.get(forwarded_for=f'10.0.0.{n}, 203.0.113.7').status_code for n in range(4)]
+        self.assertEqual(codes, [200, 200, 429, 429])
+
+    def test_client_id_counts_trusted_proxies_from_the_right(self):
+        def client_id(proxies, **headers):
+            self.middleware.trusted_proxies = proxies
+            return self.middleware.client_id(self.factory.get('/api/items/', **headers))
+
+        self.assertEqual(client_id(1, HTTP_X_FORWARDED_FOR='6.6.6.6, 203.0.113.7'), '203.0.113.7')
+        self.assertEqual(client_id(2, HTTP_X_FORWARDED_FOR='6.6.6.6, 203.0.113.7, 10.0.0.1'), '203.0.113.7')
+        self.assertEqual(client_id(2, HTTP_X_FORWARDED_FOR='203.0.113.7'), '203.0.113.7')
+        self.assertEqual(client_id(1, HTTP_X_FORWARDED_FOR=' , '), '127.0.0.1')
+        self.assertEqual(client_id(1), '127.0.0.1')
+        self.middleware.client_header = ''
+        self.assertEqual(client_id(1, HTTP_X_FORWARDED_FOR='203.0.113.7'), '127.0.0.1')
+
+    def test_full_pool_and_queue_is_answered_503(self):
+        limiter = self.middleware.limiters['read']
+        self.assertTrue(limiter.acquire(0))
+        limiter.waiting = limiter.queue_size
+        response = self.get()
+        self.assertEqual((response.status_code, response['Retry-After']), (503, '1'))
+        self.assertEqual(json.loads(response.content)['error'], 'Server is busy, please retry')
+
+    def test_queued_request_times_out(self):
+        limiter = self.middleware.limiters['read']
+        self.assertTrue(limiter.acquire(0))
+        started = time.monotonic()
+        self.assertEqual(self.get().status_code, 503)
+        self.assertGreaterEqual(time.monotonic() - started, 0.2)
+        self.assertEqual((limiter.active, limiter.waiting), (1, 0))
+
+    def test_queued_request_is_admitted_when_a_slot_frees(self):
+        limiter = self.middleware.limiters['read']
+        self.assertTrue(limiter.acquire(0))
+        threading.Timer(0.05, limiter.release).start()
+        self.assertEqual(self.get().status_code, 200)
+        self.assertEqual(limiter.active, 0)
+
+
+class BucketStoreTests(SimpleTestCase):
+    """Token buckets in memory and in a SQLite file shared between processes."""
+
+    def test_memory_bucket_refills(self):
+        store = middleware.MemoryBucketStore()
+        self.assertEqual([store.take('client', 1, 2, 100.0) for _ in range(2)], [0.0, 0.0])
+        self.assertAlmostEqual(store.take('client', 1, 2, 100.0), 1.0)
+        self.assertAlmostEqual(store.take('client', 1, 2, 100.5), 0.5)
+        self.assertEqual(store.take('client', 1, 2, 102.0), 0.0)
+
+    def test_sqlite_buckets_are_shared(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'buckets.sqlite3')
+            first, second = middleware.SQLiteBucketStore(path), middleware.SQLiteBucketStore(path)
+            self.assertEqual(first.take('client', 1, 2, 100.0), 0.0)
+            self.assertEqual(second.take('client', 1, 2, 100.0), 0.0)
+            self.assertGreater(first.take('client', 1, 2, 100.0), 0)
+            self.assertEqual(second.take('other', 1, 2, 100.0), 0.0)
+
+    def test_sqlite_store_prunes_refilled_buckets(self):
+        with tempfile.TemporaryDirectory() as tmp, mock.patch.object(middleware, 'PRUNE_EVERY', 3):
+            store = middleware.SQLiteBucketStore(os.path.join(tmp, 'buckets.sqlite3'))
+            store.take('idle', 1, 2, 100.0)
+            store.take('busy', 1, 2, 101.5)
+            store.take('new', 1, 2, 103.0)
+            clients = [row[0] for row in store._connection().execute('SELECT client FROM rate_buckets ORDER BY client')]
+            self.assertEqual(clients, ['busy', 'new'])
+
+
+class ChunkRecordingService(LocalService):
+    """LocalService that records bulk insert sizes and fails chunks naming 'Boom'."""
+
+    def __init__(self):
+        self.chunks = []
+
+    def bulk_create_items(self, items):
+        self.chunks.append(len(items))
+        if any(item['name'] == 'Boom' for item in items):
+            raise Exception('Error creating items: database is locked')
+        return super().bulk_create_items(items)
+
+
+class ImportTests(LocalBackendMixin, TestCase):
+    """Streaming CSV/NDJSON imports through ItemImporter, the endpoint and the command."""
+
+    def records(self, text, fmt):
+        return [
+            (line, str(record) if isinstance(record, ValueError) else record)
+            for line, record in iter_records(BytesIO(text.encode()), fmt)
+        ]
+
+    def test_parses_csv(self):
+        text = '\ufeffname,price,description\nFirst,1.50,\n"Second","2","Two\nlines"\nThird,,x\n'
+        self.assertEqual(self.records(text, 'csv'), [
+            (2, {'name': 'First', 'price': '1.50', 'description': ''}),
+            (4, {'name': 'Second', 'price': '2', 'description': 'Two\nlines'}),
+            (5, {'name': 'Third', 'price': '', 'description': 'x'}),
+        ])
+
+    def test_parses_ndjson_and_reports_malformed_lines(self):
+        text = '{"name": "First"}\n\n{"name": \n{"name": "Fourth"}\n'
+        records = self.records(text, 'ndjson')
+        self.assertEqual([line for line, _ in records], [1, 3, 4])
+        self.assertTrue(records[1][1].startswith('Invalid JSON'))
+        self.assertEqual(records[2][1], {'name': 'Fourth'})
+
+    def test_writes_in_chunks_and_reports_rejected_lines(self):
+        service = ChunkRecordingService()
+        progress = []
+        text = 'name,price\nA,1\n,2\nB,cheap\nC,3\nD,4\nE,5\n'
+        summary = ItemImporter(service, chunk_size=2, progress=progress.append).run(iter_records(BytesIO(text.encode()), 'csv'))
+        self.assertEqual(service.chunks, [1, 1, 2])
+        self.assertEqual(len(progress), 3)
+        self.assertEqual(summary, {
+            'processed': 6, 'created': 4, 'rejected_count': 2,
+            'rejected': [{'line': 3, 'error': 'Name is required'}, {'line': 4, 'error': 'Invalid price: cheap'}],
+        })
+        self.assertEqual(ItemCounter.current(), 4)
+
+    def test_failed_chunk_rejects_each_of_its_rows(self):
+        service = ChunkRecordingService()
+        text = '{"name": "A"}\n{"name": "Boom"}\n{"name": "B"}\n{"name": "C"}\n'
+        summary = ItemImporter(service, chunk_size=2).run(iter_records(BytesIO(text.encode()), 'ndjson'))
+        self.assertEqual((summary['created'], summary['rejected_count']), (2, 2))
+        self.assertEqual([reject['line'] for reject in summary['rejected']], [1, 2])
+        self.assertIn('database is locked', summary['rejected'][0]['error'])
+        self.assertEqual(sorted(Item.objects.values_list('name', flat=True)), ['B', 'C'])
+
+    def test_rejected_report_is_capped(self):
+        text = ''.join(f'{{"price": {n}}}\n' for n in range(5))
+        with mock.patch('items.importer.MAX_REPORTED_REJECTS', 2):
+            summary = ItemImporter(LocalService()).run(iter_records(BytesIO(text.encode()), 'ndjson'))
+        self.assertEqual((summary['rejected_count'], len(summary['rejected'])), (5, 2))
+
+    def test_endpoint_imports_synchronously(self):
+        response = self.client.post('/api/items/import/?chunk_size=2', 'name,price\nA,1\nB,2\n,3\n', content_type='text/csv')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['data']['created'], 2)
+        response = self.client.post('/api/items/import/', '{"name": "C"}\n', content_type='application/x-ndjson')
+        self.assertEqual(response.json()['data']['created'], 1)
+        self.assertEqual(ItemCounter.current(), 3)
+
+        for query in ('format=xml', 'chunk_size=0', 'chunk_size=many'):
+            with self.subTest(query=query):
+                response = self.client.post(f'/api/items/import/?{query}', 'name\nD\n', content_type='text/csv')
+                self.assertEqual(response.status_code, 400)
+
+    def test_endpoint_stages_async_imports(self):
+        response = self.client.post('/api/items/import/?async=true&chunk_size=10', 'name\nA\nB\n', content_type='text/csv')
+        self.assertEqual(response.status_code, 202)
+        job = Job.objects.get(id=response.json()['data']['id'])
+        self.assertEqual((job.kind, job.params['format'], job.params['chunk_size']), ('import', 'csv', 10))
+        staged = os.path.join(self.job_files, job.params['upload'])
+        self.assertTrue(os.path.exists(staged))
+        self.assertFalse(Item.objects.exists())
+
+        jobs.claim_next('worker')
+        self.assertEqual(jobs.run_job(job.id), Job.SUCCEEDED)
+        job.refresh_from_db()
+        self.assertEqual(job.result['created'], 2)
+        self.assertFalse(os.path.exists(staged))
+
+    def test_import_items_command(self):
+        path = os.path.join(self.job_files, 'items.ndjson')
+        with open(path, 'w') as source:
+            source.write('{"name": "A"}\n{"price": 1}\n')
+        out = StringIO()
+        call_command('import_items', path, stdout=out)
+        self.assertIn('line 2: Name is required', out.getvalue())
+        self.assertIn('Imported 1 of 2 rows', out.getvalue())
+        self.assertEqual(list(Item.objects.values_list('name', flat=True)), ['A'])
+
+
+class ReplicaRoutingTests(SimpleTestCase):
+    """PrimaryReplicaRouter and ReplicaStickinessMiddleware with one replica configured."""
+
+    databases = {'default'}
+
+    def setUp(self):
+        replica = {**settings.DATABASES['default'], 'TEST': {'MIRROR': 'default'}}
+        databases = override_settings(DATABASES={**settings.DATABASES, 'replica_0': replica}, REPLICA_STICKY_SECONDS=5)
+        with warnings.catch_warnings():
+            # Only the aliases are read here; no connection is made to the replica
+            warnings.simplefilter('ignore')
+            databases.enable()
+        self.addCleanup(databases.disable)
+        self.router = routers.PrimaryReplicaRouter()
+        self.factory = RequestFactory()
+
+    def request(self, view, cookies=None):
+        """Run ``view(request)`` behind ReplicaStickinessMiddleware; returns its result and the response."""
+        seen = {}
+
+        def get_response(request):
+            seen['result'] = view(request)
+            return JsonResponse({'success': True})
+
+        request = self.factory.get('/api/items/')
+        request.COOKIES.update(cookies or {})
+        response = routers.ReplicaStickinessMiddleware(get_response)(request)
+        return seen['result'], response
+
+    def test_reads_go_to_the_replica(self):
+        self.assertEqual(routers.replica_aliases(), ['replica_0'])
+        self.assertEqual(self.router.db_for_read(Item), 'replica_0')
+        self.assertFalse(routers.reading_primary())
+        # Job status is bookkeeping a lagging replica would serve stale
+        self.assertEqual(self.router.db_for_read(Job), 'default')
+        self.assertFalse(self.router.allow_migrate('replica_0', 'items'))
+
+    def test_reads_inside_a_transaction_go_to_the_primary(self):
+        with transaction.atomic():
+            self.assertEqual(self.router.db_for_read(Item), 'default')
+        self.assertEqual(self.router.db_for_read(Item), 'replica_0')
+
+    def test_reads_after_a_write_go_to_the_primary_and_set_the_cookie(self):
+        def write_then_read(request):
+            before = self.router.db_for_read(Item)
+            self.assertEqual(self.router.db_for_write(Item), 'default')
+            return before, self.router.db_for_read(Item), routers.pinned_to_primary()
+
+        result, response = self.request(write_then_read)
+        self.assertEqual(result, ('replica_0', 'default', True))
+        cookie = response.cookies[routers.STICKY_COOKIE]
+        self.assertEqual((cookie['max-age'], cookie['httponly']), (5, True))
+        # The pin ends with the request
+        self.assertFalse(routers.pinned_to_primary())
+        self.assertEqual(self.router.db_for_read(Item), 'replica_0')
+
+    def test_cookie_keeps_the_next_request_on_the_primary(self):
+        read = lambda request: self.router.db_for_read(Item)
+        result, response = self.request(read, {routers.STICKY_COOKIE: '1'})
+        self.assertEqual(result, 'default')
+        self.assertNotIn(routers.STICKY_COOKIE, response.cookies)
+        # Once the browser has dropped the expired cookie, reads use the replica again
+        result, _ = self.request(read)
+        self.assertEqual(result, 'replica_0')
+
+
+class NegotiateTests(SimpleTestCase):
+    codecs = [compression.ZstdCodec(), compression.BrotliCodec(), compression.GzipCodec()]
+
+    def negotiate(self, accept_encoding):
+        codec = compression.negotiate(accept_encoding, self.codecs)
+        return codec and codec.name
+
+    def test_server_preference_wins_among_accepted(self):
+        self.assertEqual(self.negotiate('gzip, br, zstd'), 'zstd')
+        self.assertEqual(self.negotiate('gzip, BR'), 'br')
+        self.assertEqual(self.negotiate('gzip'), 'gzip')
+        self.assertEqual(self.negotiate('*'), 'zstd')
+
+    def test_q_values(self):
+        self.assertEqual(self.negotiate('zstd;q=0, br;q=0.5, gzip'), 'br')
+        self.assertEqual(self.negotiate('*;q=0, gzip;q=0.1'), 'gzip')
+        self.assertEqual(self.negotiate('zstd;q=bogus, gzip'), 'gzip')
+        self.assertIsNone(self.negotiate('gzip;q=0'))
+        self.assertIsNone(self.negotiate('identity'))
+        self.assertIsNone(self.negotiate(''))
+
+
+@override_settings(COMPRESSION_MIN_SIZE=100, COMPRESSION_CACHE_SIZE=1024 * 1024)
+class CompressionMiddlewareTests(SimpleTestCase):
+    body = json.dumps({'data': [{'name': f'item {i}'} for i in range(50)]}).encode()
+
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def call(self, response, accept_encoding='gzip', path='/api/items/', codecs=None):
+        compressor = middleware.CompressionMiddleware(lambda request: response)
+        if codecs is not None:
+            compressor.codecs = codecs
+        request = self.factory.get(path, HTTP_ACCEPT_ENCODING=accept_encoding)
+        return compressor, compressor(request)
+
+    def test_compresses_with_the_negotiated_codec(self):
+        response = HttpResponse(self.body, content_type='application/json')
+        response['ETag'] = '"abc"'
+        _, response = self.call(response)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(zlib.decompress(response.content, 31), self.body)
+        self.assertEqual(response['Content-Length'], str(len(response.content)))
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+        self.assertEqual(response['ETag'], 'W/"abc"')
+
+    @unittest.skipUnless(compression.brotli, 'brotli is not installed')
+    def test_brotli(self):
+        _, response = self.call(HttpResponse(self.body), 'gzip, br')
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertEqual(compression.brotli.decompress(response.content), self.body)
+
+    @unittest.skipUnless(compression.zstandard, 'zstandard is not installed')
+    def test_zstd(self):
+        _, response = self.call(HttpResponse(self.body), 'gzip, br, zstd')
+        self.assertEqual(response['Content-Encoding'], 'zstd')
+        decompressed = compression.zstandard.ZstdDecompressor().decompressobj().decompress(response.content)
+        self.assertEqual(decompressed, self.body)
+
+    def test_small_bodies_are_sent_as_is(self):
+        _, response = self.call(HttpResponse(b'{"data": []}'))
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(response.content, b'{"data": []}')
+        # Caches must still key on the header the response was chosen by
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+
+    def test_uncompressible_bodies_are_sent_as_is(self):
+        body = os.urandom(2048)
+        _, response = self.call(HttpResponse(body))
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(response.content, body)
+
+    def test_skipped_responses(self):
+        encoded = HttpResponse(self.body)
+        encoded['Content-Encoding'] = 'identity'
+        not_found = HttpResponse(self.body, status=404)
+        for response, kwargs in ((encoded, {}), (not_found, {}), (HttpResponse(self.body), {'path': '/'}),
+                                 (HttpResponse(self.body), {'accept_encoding': 'identity'})):
+            _, result = self.call(response, **kwargs)
+            self.assertEqual(result.content, self.body)
+            self.assertNotEqual(result.get('Content-Encoding'), 'gzip')
+
+    def test_streaming_responses_are_compressed_per_chunk(self):
+        lines = [json.dumps({'id': i}).encode() + b'\n' for i in range(2000)]
+        response = StreamingHttpResponse(iter(lines), content_type='application/x-ndjson')
+        response['Content-Length'] = '123'
+        _, response = self.call(response)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertFalse(response.has_header('Content-Length'))
+        chunks = list(response.streaming_content)
+        # Buffered input is flushed along the way, not only at the end
+        self.assertGreater(len(chunks), 2)
+        self.assertEqual(zlib.decompress(b''.join(chunks), 31), b''.join(lines))
+
+    def test_identical_bodies_are_compressed_once(self):
+        gzip = compression.GzipCodec()
+        with mock.patch.object(gzip, 'compress', wraps=gzip.compress) as compress:
+            compressor, first = self.call(HttpResponse(self.body), codecs=[gzip])
+            compressor.get_response = lambda request: HttpResponse(self.body)
+            second = compressor(self.factory.get('/api/items/', HTTP_ACCEPT_ENCODING='gzip'))
+        self.assertEqual(first.content, second.content)
+        self.assertEqual(compress.call_count, 1)
+        self.assertEqual((compressor.cache.hits, compressor.cache.misses), (1, 1))
+
+
+class CompressedBodyCacheTests(SimpleTestCase):
+    def test_evicts_least_recently_used(self):
+        codec = compression.GzipCodec()
+        bodies = [os.urandom(64) for _ in range(3)]
+        size = len(codec.compress(bodies[0]))
+        cache = compression.CompressedBodyCache(size * 2)
+        cache.compress(codec, bodies[0])
+        cache.compress(codec, bodies[1])
+        cache.compress(codec, bodies[0])
+        cache.compress(codec, bodies[2])
+        self.assertEqual(len(cache.entries), 2)
+        self.assertLessEqual(cache.size, size * 2)
+        cache.compress(codec, bodies[0])
+        cache.compress(codec, bodies[1])
+        self.assertEqual((cache.hits, cache.misses), (2, 4))
+
+    def test_disabled(self):
+        cache = compression.CompressedBodyCache(0)
+        compressed = cache.compress(compression.GzipCodec(), self.id().encode())
+        self.assertEqual(zlib.decompress(compressed, 31), self.id().encode())
+        self.assertEqual(cache.entries, {})
+
+
+class ColumnarTests(LocalBackendMixin, TestCase):
+    """to_columns and the columnar JSON/MessagePack branches of the list endpoints."""
+
+    def setUp(self):
+        super().setUp()
+        service = LocalService()
+        self.items = [
+            service.create_item({'name': 'First', 'price': Decimal('1.50')}),
+            service.create_item({'name': 'Second', 'description': 'Two', 'price': None}),
+            service.create_item({'name': 'Third', 'price': Decimal('3'), 'is_active': False}),
+        ]
+        # Newest first, as the list endpoints return them
+        self.items.reverse()
+
+    def millis(self, value):
+        return int(datetime.fromisoformat(value).timestamp() * 1000)
+
+    def test_to_columns(self):
+        data = columnar.to_columns(self.items)
+        self.assertEqual(data['columns'], list(columnar.COLUMNS))
+        self.assertEqual(data['rows'], 3)
+        columns = dict(zip(data['columns'], data['values']))
+        self.assertEqual(columns['id'], [item['id'] for item in self.items])
+        self.assertEqual(columns['name'], ['Third', 'Second', 'First'])
+        self.assertEqual(columns['description'], ['', 'Two', ''])
+        self.assertEqual(columns['price'], [3.0, None, 1.5])
+        self.assertEqual(columns['is_active'], [False, True, True])
+        self.assertEqual(columns['created_at'], [self.millis(item['created_at']) for item in self.items])
+        self.assertTrue(all(isinstance(value, int) for value in columns['updated_at']))
+
+    def test_to_columns_of_nothing(self):
+        data = columnar.to_columns([])
+        self.assertEqual((data['rows'], data['values']), (0, [[] for _ in columnar.COLUMNS]))
+
+    def test_epoch_millis(self):
+        self.assertEqual(columnar.epoch_millis('1970-01-01T00:00:01.5+00:00'), 1500)
+        self.assertEqual(columnar.epoch_millis(datetime.fromisoformat('1970-01-02T00:00:00+00:00')), 86400000)
+        self.assertIsNone(columnar.epoch_millis(None))
+
+    def test_columnar_json_list_with_cursor(self):
+        response = self.client.get('/api/items/?format=columnar&limit=2&count=exact')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        self.assertIn('Accept', response['Vary'])
+        # Compact separators
+        self.assertNotIn(b', ', response.content)
+        payload = response.json()
+        self.assertEqual(payload['data']['rows'], 2)
+        self.assertEqual(payload['data']['values'][1], ['Third', 'Second'])
+        self.assertEqual(payload['pagination']['count'], 3)
+
+        cursor = payload['pagination']['next_cursor']
+        payload = self.client.get(f'/api/items/?format=columnar&limit=2&cursor={cursor}').json()
+        self.assertEqual(payload['data']['values'][1], ['First'])
+        self.assertIsNone(payload['pagination']['next_cursor'])
+
+    def test_columnar_search(self):
+        payload = self.client.get('/api/items/search/?q=second&format=columnar').json()
+        self.assertEqual(payload['data']['values'][1], ['Second'])
+
+    def test_unknown_format(self):
+        self.assertEqual(self.client.get('/api/items/?format=xml').status_code, 400)
+
+    @unittest.skipUnless(columnar.msgpack, 'msgpack is not installed')
+    def test_msgpack_round_trip(self):
+        response = self.client.get('/api/items/?format=columnar&limit=2', HTTP_ACCEPT=columnar.MSGPACK_CONTENT_TYPE)
+        self.assertEqual(response['Content-Type'], columnar.MSGPACK_CONTENT_TYPE)
+        payload = columnar.msgpack.unpackb(response.content, raw=False)
+        expected = self.client.get('/api/items/?format=columnar&limit=2').json()
+        self.assertEqual(payload, expected)
+
+    def test_msgpack_falls_back_to_json_when_not_installed(self):
+        with mock.patch.object(columnar, 'msgpack', None):
+            response = self.client.get('/api/items/?format=columnar', HTTP_ACCEPT=columnar.MSGPACK_CONTENT_TYPE)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        self.assertEqual(response.json()['data']['rows'], 3)
+
+    def test_msgpack_is_only_for_the_columnar_format(self):
+        response = self.client.get('/api/items/', HTTP_ACCEPT=columnar.MSGPACK_CONTENT_TYPE)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        self.assertEqual(len(response.json()['data']), 3)
+
+
+class PaginationTests(LocalBackendMixin, TestCase):
+    """limit/offset/cursor/count parameters and the maintained item count."""
+
+    def setUp(self):
+        super().setUp()
+        self.service = LocalService()
+        for n in range(3):
+            self.service.create_item({'name': f'Item {n}'})
+
+    def parse(self, query):
+        return parse_pagination(RequestFactory().get(f'/api/items/?{query}'))
+
+    def test_parse_pagination(self):
+        self.assertEqual(self.parse(''), (None, 0, 'none', None))
+        self.assertEqual(self.parse('limit=10&offset=20&count=exact'), (10, 20, 'exact', None))
+        self.assertEqual(self.parse(f'limit={MAX_PAGE_SIZE}&count=estimated')[:3], (MAX_PAGE_SIZE, 0, 'estimated'))
+        cursor = encode_cursor({'created_at': '2024-01-01T00:00:00+00:00', 'id': 7})
+        self.assertEqual(self.parse(f'limit=5&cursor={cursor}')[3], ('2024-01-01T00:00:00+00:00', 7))
+
+    def test_invalid_parameters_are_rejected(self):
+        cursor = encode_cursor({'created_at': '2024-01-01T00:00:00+00:00', 'id': 7})
+        for query in ('limit=0', f'limit={MAX_PAGE_SIZE + 1}', 'limit=ten', 'offset=-1', 'offset=1.5',
+                      'count=planned', 'count=EXACT', f'cursor={cursor}&offset=2'):
+            with self.subTest(query=query):
+                with self.assertRaises(ValueError):
+                    self.parse(query)
+                self.assertEqual(self.client.get(f'/api/items/?{query}').status_code, 400)
+                self.assertEqual(self.client.get(f'/api/items/search/?q=item&{query}').status_code, 400)
+
+    def test_count_modes(self):
+        # A write that bypasses the service is seen by exact counts only
+        Item.objects.create(name='Unseen')
+        expected = {'exact': 4, 'estimated': 3, 'none': None}
+        for mode, count in expected.items():
+            with self.subTest(mode=mode):
+                payload = self.client.get(f'/api/items/?limit=2&count={mode}').json()
+                self.assertEqual((payload['pagination']['count'], payload['pagination']['count_mode']), (count, mode))
+                self.assertEqual(len(payload['data']), 2)
+        # Search counts are always exact
+        payload = self.client.get('/api/items/search/?q=item&count=estimated').json()
+        self.assertEqual(payload['pagination']['count'], 3)
+        # Without paging or counting, there is no pagination block
+        self.assertNotIn('pagination', self.client.get('/api/items/').json())
+
+    def test_counter_follows_service_writes(self):
+        self.assertEqual(ItemCounter.current(), 3)
+        self.service.bulk_create_items([{'name': 'Bulk 1'}, {'name': 'Bulk 2'}])
+        self.assertEqual(ItemCounter.current(), 5)
+        last = self.service.create_item({'name': 'Stale', 'is_active': False})
+        self.assertEqual(ItemCounter.current(), 6)
+        self.service.delete_item(Item.objects.get(name='Bulk 2').id)
+        self.assertEqual(ItemCounter.current(), 5)
+
+        Item.objects.filter(id=last['id']).update(updated_at=timezone.now() - timedelta(days=400))
+        archive_items(self.service, inactive_days=30)
+        # The deleted item leaves the table; the stale one stays readable from the archive
+        self.assertEqual((ItemCounter.current(), ItemCounter.current('items_archive')), (4, 1))
+        self.assertEqual(self.service.count_items(mode='estimated', include_archived=True), 5)
+        self.assertEqual(self.service.count_items(mode='exact', include_archived=True), 5)
+
+    def test_refresh_repairs_the_counter(self):
+        Item.objects.create(name='Unseen')
+        self.assertEqual(ItemCounter.current(), 3)
+        self.assertEqual(ItemCounter.refresh(), 4)
+        self.assertEqual(ItemCounter.current(), 4)
+
+
+@mock.patch.object(views, 'INITIAL_PAGE_SIZE', 2)
+class IndexPageTests(LocalBackendMixin, TestCase):
+    """The server-rendered first page and the cursor pages that follow it."""
+
+    def setUp(self):
+        super().setUp()
+        service = LocalService()
+        self.ids = [service.create_item({'name': f'Item {n}'})['id'] for n in range(5)]
+        # Items sharing a timestamp are ordered by id, so cursors must not skip or repeat them
+        Item.objects.filter(id__in=self.ids[1:4]).update(created_at=timezone.now())
+
+    def initial_page(self):
+        response = self.client.get('/')
+        self.assertEqual(response.status_code, 200)
+        script = re.search(rb'<script id="initial-page" type="application/json">(.*?)</script>', response.content)
+        return json.loads(script.group(1))
+
+    def test_first_page_is_embedded(self):
+        page = self.initial_page()
+        expected = [item['id'] for item in LocalService().get_all_items(limit=2)]
+        self.assertEqual([item['id'] for item in page['data']], expected)
+        self.assertEqual(page['page_size'], 2)
+        self.assertIsNotNone(page['next_cursor'])
+
+    def test_cursors_walk_every_item_once(self):
+        page = self.initial_page()
+        seen = [item['id'] for item in page['data']]
+        cursor = page['next_cursor']
+        while cursor:
+            payload = self.client.get(f'/api/items/?limit=2&cursor={cursor}').json()
+            seen += [item['id'] for item in payload['data']]
+            cursor = payload['pagination']['next_cursor']
+        self.assertEqual(seen, [item['id'] for item in LocalService().get_all_items()])
+        self.assertEqual(sorted(seen), sorted(self.ids))
+
+    def test_malformed_cursor_is_rejected(self):
+        for cursor in ('not-a-cursor', '!!!', encode_cursor({'created_at': 5, 'id': 1}),
+                       encode_cursor({'created_at': '2024-01-01T00:00:00+00:00', 'id': '1'})):
+            with self.subTest(cursor=cursor):
+                response = self.client.get(f'/api/items/?limit=2&cursor={cursor}')
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response.json()['error'], 'Invalid cursor')
+
+    def test_page_renders_when_the_backend_fails(self):
+        with mock.patch.object(LocalService, 'get_all_items', side_effect=Exception('down')):
+            page = self.initial_page()
+        self.assertEqual((page['data'], page['next_cursor']), (None, None))
+
+
+# Serves one request through the WSGI module in a fresh interpreter and
+# prints the status and whether the backend already existed beforehand
+API_PROFILE_SCRIPT = r'''
+import io, json, sys
+from supabase_crud.wsgi import application
+from items.views import get_service
+warmed = hasattr(get_service, '_instance')
+environ = {
+    'REQUEST_METHOD': 'GET', 'PATH_INFO': '/api/items/', 'QUERY_STRING': 'limit=5',
+    'SERVER_NAME': 'localhost', 'SERVER_PORT': '80', 'HTTP_HOST': 'localhost',
+    'REMOTE_ADDR': '127.0.0.1', 'wsgi.input': io.BytesIO(), 'wsgi.url_scheme': 'http', 'wsgi.errors': sys.stderr,
+}
+status = []
+body = b''.join(application(environ, lambda line, headers, exc_info=None: status.append(line)))
+print(json.dumps({'status': status[0], 'warmed': warmed, 'body': json.loads(body)}))
+'''
+
+
+class WarmUpTests(LocalBackendMixin, TestCase):
+
+    def test_warm_up_runs_no_queries_on_the_local_backend(self):
+        with self.assertNumQueries(0):
+            warm_up()
+        self.assertEqual(get_service._type, 'local')
+
+    @override_settings(WARM_UP_BACKEND=True)
+    def test_app_loading_does_not_warm_up(self):
+        # Management commands such as migrate load the apps but not wsgi.py
+        with mock.patch('items.warmup.warm_up') as warm:
+            apps.get_app_config('items').ready()
+        warm.assert_not_called()
+        self.assertFalse(hasattr(get_service, '_instance'))
+
+
+class ApiProfileTests(SimpleTestCase):
+    """The APP_PROFILE=api settings, exercised in child processes."""
+
+    def run_child(self, *args):
+        database = tempfile.TemporaryDirectory()
+        self.addCleanup(database.cleanup)
+        env = {
+            **os.environ, 'APP_PROFILE': 'api', 'SUPABASE_URL': '', 'SUPABASE_KEY': '', 'DEBUG': 'True',
+            'SQLITE_PATH': os.path.join(database.name, 'db.sqlite3'), 'DJANGO_SETTINGS_MODULE': 'supabase_crud.settings',
+        }
+        env.pop('SQLITE_REPLICAS', None)
+        results = []
+        for command in args:
+            child = subprocess.run([sys.executable, *command], cwd=settings.BASE_DIR, env=env,
+                                   capture_output=True, text=True, timeout=120)
+            self.assertEqual(child.returncode, 0, child.stderr)
+            results.append(child.stdout)
+        return results
+
+    def test_api_profile_passes_check_and_serves_the_api(self):
+        check, _, served = self.run_child(
+            ['manage.py', 'check'],
+            ['manage.py', 'migrate', '--verbosity', '0'],
+            ['-c', API_PROFILE_SCRIPT],
+        )
+        self.assertIn('no issues', check)
+        result = json.loads(served)
+        self.assertEqual(result['status'], '200 OK')
+        self.assertTrue(result['warmed'])
+        self.assertEqual((result['body']['success'], result['body']['data']), (True, []))
+
+
+@unittest.skipUnless(server, 'gunicorn is not installed')
+class RecyclerTests(SimpleTestCase):
+    """Worker recycling decisions, with the resident memory reading stubbed."""
+
+    MiB = 2 ** 20
+
+    def setUp(self):
+        self.worker = SimpleNamespace(alive=True, pid=42, log=mock.Mock())
+        self.rss = mock.patch.object(server, 'rss_bytes', return_value=50 * self.MiB).start()
+        self.addCleanup(mock.patch.stopall)
+
+    def serve(self, recycler, requests):
+        """Finish requests until the worker retires; returns how many it served."""
+        for served in range(1, requests + 1):
+            recycler.request_finished()
+            if not self.worker.alive:
+                return served
+        return requests
+
+    def test_retires_after_max_requests(self):
+        recycler = server.Recycler(self.worker, 3, 0, 0)
+        self.assertEqual(self.serve(recycler, 10), 3)
+        self.worker.log.info.assert_called_once_with('Recycling worker %s after %s', 42, '3 requests')
+        self.rss.assert_not_called()
+
+    def test_jitter_spreads_the_limit(self):
+        with mock.patch.object(server.random, 'randint', return_value=4) as randint:
+            recycler = server.Recycler(self.worker, 3, 5, 0)
+        randint.assert_called_once_with(0, 5)
+        self.assertEqual(self.serve(recycler, 10), 7)
+
+    def test_retires_above_max_memory(self):
+        recycler = server.Recycler(self.worker, 0, 0, 100 * self.MiB)
+        self.assertEqual(self.serve(recycler, 5), 5)
+        self.rss.return_value = 150 * self.MiB
+        recycler.request_finished()
+        self.assertFalse(self.worker.alive)
+        self.worker.log.info.assert_called_once_with('Recycling worker %s after %s', 42, '150 MiB resident memory')
+
+    def test_request_limit_is_checked_before_memory(self):
+        self.rss.return_value = 150 * self.MiB
+        recycler = server.Recycler(self.worker, 1, 0, 100 * self.MiB)
+        recycler.request_finished()
+        self.worker.log.info.assert_called_once_with('Recycling worker %s after %s', 42, '1 requests')
+        self.rss.assert_not_called()
+
+    def test_disabled_limits_never_retire(self):
+        with mock.patch.object(server.random, 'randint') as randint:
+            recycler = server.Recycler(self.worker, 0, 5, 0)
+        randint.assert_not_called()
+        self.assertEqual(self.serve(recycler, 1000), 1000)
+        self.assertTrue(self.worker.alive)
+        self.rss.assert_not_called()
+
+    def test_retiring_worker_is_not_checked_again(self):
+        recycler = server.Recycler(self.worker, 0, 0, 100 * self.MiB)
+        self.worker.alive = False
+        self.rss.return_value = 150 * self.MiB
+        recycler.request_finished()
+        self.rss.assert_not_called()
+        self.worker.log.info.assert_not_called()
+
+    def test_rss_bytes_reads_this_process(self):
+        mock.patch.stopall()
+        self.assertGreater(server.rss_bytes(), self.MiB)
@@ -11,4 +11,13 @@ urlpatterns = [
     path('api/items/<int:item_id>/update/', views.item_update, name='item_update'),
     path('api/items/<int:item_id>/delete/', views.item_delete, name='item_delete'),
     path('api/items/search/', views.item_search, name='item_search'),
+    path('api/items/stats/', views.item_stats, name='item_stats'),
+    path('api/items/batch/', views.item_batch, name='item_batch'),
+    path('api/items/import/', views.item_import, name='item_import'),
+    path('api/stats/', views.service_stats, name='service_stats'),
+    path('api/jobs/', views.job_list, name='job_list'),
+    path('api/jobs/create/', views.job_create, name='job_create'),
+    path('api/jobs/<int:job_id>/', views.job_detail, name='job_detail'),
+    path('api/jobs/<int:job_id>/cancel/', views.job_cancel, name='job_cancel'),
+    path('api/jobs/<int:job_id>/download/', views.job_download, name='job_download'),
 ] 
\ No newline at end of file
@@ -1,26 +1,152 @@
+from django.conf import settings
 from django.shortcuts import render
-from django.http import JsonResponse
+from django.http import FileResponse, HttpResponse, JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
 from django.utils import timezone
+from django.utils.cache import patch_vary_headers
+import base64
+import binascii
 import json
-from .supabase_service import SupabaseService
+import os
+from supabase_crud.utils import supabase_configured
 from .local_service import LocalService
+from .lookup_cache import NegativeCachingService, NegativeLookupCache
+from .batch import validate_operations
+from .schema import ITEM_SCHEMA, TRUE_VALUES, FALSE_VALUES
+from .search import SEARCH_MATCHES, normalize_search_text
+from .importer import IMPORT_FORMATS, DEFAULT_CHUNK_SIZE, MAX_CHUNK_SIZE, ItemImporter, iter_records
+from .columnar import RESPONSE_FORMATS, MSGPACK_CONTENT_TYPE, pack, to_columns, wants_msgpack
+from .models import Job
+from . import jobs
 
 # Initialize services lazily
 def get_service():
     """Get the appropriate service instance (Supabase or Local)."""
     if not hasattr(get_service, '_instance'):
         try:
-            # Try Supabase first
+            # Try Supabase first; its module (and client libraries) are only
+            # imported when credentials are configured
+            if not supabase_configured():
+                raise ValueError('Supabase not configured')
+            from .supabase_service import SupabaseService
             get_service._instance = SupabaseService()
             get_service._type = 'supabase'
         except Exception:
             # Fallback to local database
             get_service._instance = LocalService()
             get_service._type = 'local'
+        if settings.NEGATIVE_CACHE_TTL > 0:
+            get_service._instance = NegativeCachingService(get_service._instance, NegativeLookupCache(
+                settings.NEGATIVE_CACHE_TTL, settings.NEGATIVE_CACHE_SIZE, settings.NEGATIVE_CACHE_VERIFY_RATE
+            ))
     return get_service._instance, get_service._type
 
+COUNT_MODES = ('exact', 'estimated', 'none')
+MAX_PAGE_SIZE = 1000
+
+def encode_cursor(item):
+    """Opaque keyset cursor pointing just past the given item."""
+    raw = json.dumps([item['created_at'], item['id']]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+def decode_cursor(cursor):
+    """Inverse of encode_cursor; returns (created_at, id)."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        created_at, item_id = json.loads(raw)
+        if not isinstance(created_at, str) or not isinstance(item_id, int):
+            raise ValueError
+        return created_at, item_id
+    except (ValueError, TypeError, binascii.Error):
+        raise ValueError('Invalid cursor')
+
+def parse_pagination(request):
+    """
+    Read limit/offset/cursor/count query parameters.
+    
+    Returns (limit, offset, count_mode, cursor); limit is None when the client
+    did not ask for a page. Raises ValueError with a client-facing message on
+    bad input.
+    """
+    limit = request.GET.get('limit')
+    offset = request.GET.get('offset', '0')
+    cursor = request.GET.get('cursor')
+    count_mode = request.GET.get('count', 'none')
+    
+    if count_mode not in COUNT_MODES:
+        raise ValueError(f'count must be one of: {", ".join(COUNT_MODES)}')
+    
+    try:
+        limit = int(limit) if limit is not None else None
+        offset = int(offset)
+    except ValueError:
+        raise ValueError('limit and offset must be integers')
+    
+    if limit is not None and not 1 <= limit <= MAX_PAGE_SIZE:
+        raise ValueError(f'limit must be between 1 and {MAX_PAGE_SIZE}')
+    if offset < 0:
+        raise ValueError('offset must not be negative')
+    if cursor is not None:
+        if offset:
+            raise ValueError('cursor and offset cannot be combined')
+        cursor = decode_cursor(cursor)
+    
+    return limit, offset, count_mode, cursor
+
+def parse_format(request):
+    """Read the response format query parameter ('json' or 'columnar')."""
+    fmt = request.GET.get('format', 'json')
+    if fmt not in RESPONSE_FORMATS:
+        raise ValueError(f'format must be one of: {", ".join(RESPONSE_FORMATS)}')
+    return fmt
+
+def parse_include_archived(request):
+    """Read the include_archived query parameter (default false)."""
+    value = request.GET.get('include_archived', 'false').strip().lower()
+    if value not in TRUE_VALUES + FALSE_VALUES:
+        raise ValueError('include_archived must be true or false')
+    return value in TRUE_VALUES
+
+def parse_search_match(request):
+    """Read the match query parameter ('contains', 'prefix' or 'exact')."""
+    match = request.GET.get('match', 'contains')
+    if match not in SEARCH_MATCHES:
+        raise ValueError(f'match must be one of: {", ".join(SEARCH_MATCHES)}')
+    return match
+
+def list_response(request, response, fmt):
+    """
+    Send a list payload as row objects, or transposed into columns.
+    
+    Columnar payloads are MessagePack when the client accepts
+    application/msgpack and msgpack is installed, compact JSON otherwise.
+    """
+    if fmt != 'columnar':
+        return JsonResponse(response)
+    
+    response['data'] = to_columns(response['data'])
+    if wants_msgpack(request):
+        http_response = HttpResponse(pack(response), content_type=MSGPACK_CONTENT_TYPE)
+    else:
+        http_response = JsonResponse(response, json_dumps_params={'separators': (',', ':')})
+    patch_vary_headers(http_response, ('Accept',))
+    return http_response
+
+def is_paginated(limit, count_mode, cursor):
+    return limit is not None or count_mode != 'none' or cursor is not None
+
+def pagination_info(limit, offset, count_mode, total, items):
+    """Build the pagination block returned alongside paginated data."""
+    full_page = limit is not None and len(items) == limit
+    return {
+        'limit': limit,
+        'offset': offset,
+        'count': total,
+        'count_mode': count_mode,
+        'next_cursor': encode_cursor(items[-1]) if full_page else None,
+    }
+
 @csrf_exempt
 @require_http_methods(["GET"])
 def item_list(request):
@@ -30,12 +156,27 @@ def item_list(request):
     service, service_type = get_service()
     
     try:
-        items = service.get_all_items()
+        limit, offset, count_mode, cursor = parse_pagination(request)
+        fmt = parse_format(request)
+        include_archived = parse_include_archived(request)
+    except ValueError as e:
         return JsonResponse({
+            'success': False,
+            'error': str(e)
+        }, status=400)
+    
+    try:
+        items, total = service.find_items(
+            limit=limit, offset=offset, cursor=cursor, count_mode=count_mode, include_archived=include_archived
+        )
+        response = {
             'success': True,
             'data': items,
             'message': f'Items retrieved successfully from {service_type} database'
-        })
+        }
+        if is_paginated(limit, count_mode, cursor):
+            response['pagination'] = pagination_info(limit, offset, count_mode, total, items)
+        return list_response(request, response, fmt)
     except Exception as e:
         return JsonResponse({
             'success': False,
@@ -51,7 +192,15 @@ def item_detail(request, item_id):
     service, service_type = get_service()
     
     try:
-        item = service.get_item_by_id(item_id)
+        include_archived = parse_include_archived(request)
+    except ValueError as e:
+        return JsonResponse({
+            'success': False,
+            'error': str(e)
+        }, status=400)
+    
+    try:
+        item = service.get_item_by_id(item_id, include_archived=include_archived)
         if item:
             return JsonResponse({
                 'success': True,
@@ -80,11 +229,13 @@ def item_create(request):
     try:
         data = json.loads(request.body)
         
-        # Validate required fields
-        if not data.get('name'):
+        # Validate and coerce fields before touching the database
+        try:
+            data = ITEM_SCHEMA.clean(data)
+        except ValueError as e:
             return JsonResponse({
                 'success': False,
-                'error': 'Name is required'
+                'error': str(e)
             }, status=400)
         
         # Create item
@@ -118,6 +269,14 @@ def item_update(request, item_id):
     try:
         data = json.loads(request.body)
         
+        try:
+            data = ITEM_SCHEMA.clean(data, partial=True)
+        except ValueError as e:
+            return JsonResponse({
+                'success': False,
+                'error': str(e)
+            }, status=400)
+        
         # Update item
         updated_item = service.update_item(item_id, data)
         
@@ -183,28 +342,307 @@ def item_search(request):
     try:
         search_term = request.GET.get('q', '')
         
-        if not search_term:
+        # A term of only whitespace normalizes to nothing
+        if not normalize_search_text(search_term):
             return JsonResponse({
                 'success': False,
                 'error': 'Search term is required'
             }, status=400)
         
-        items = service.search_items(search_term)
+        try:
+            limit, offset, count_mode, cursor = parse_pagination(request)
+            fmt = parse_format(request)
+            include_archived = parse_include_archived(request)
+            match = parse_search_match(request)
+        except ValueError as e:
+            return JsonResponse({
+                'success': False,
+                'error': str(e)
+            }, status=400)
+        
+        items, total = service.find_items(
+            search_term, limit=limit, offset=offset, cursor=cursor, count_mode=count_mode,
+            include_archived=include_archived, match=match
+        )
         
-        return JsonResponse({
+        response = {
             'success': True,
             'data': items,
             'message': f'Found {len(items)} items matching "{search_term}" in {service_type} database'
+        }
+        if is_paginated(limit, count_mode, cursor):
+            response['pagination'] = pagination_info(limit, offset, count_mode, total, items)
+        return list_response(request, response, fmt)
+        
+    except Exception as e:
+        return JsonResponse({
+            'success': False,
+            'error': str(e)
+        }, status=500)
+
+@csrf_exempt
+@require_http_methods(["GET"])
+def item_stats(request):
+    """
+    Summary statistics of the items: counts, price range and newest item.
+    """
+    service, service_type = get_service()
+    
+    try:
+        return JsonResponse({
+            'success': True,
+            'data': service.item_stats(),
+            'message': f'Item statistics from {service_type} database'
+        })
+    except Exception as e:
+        return JsonResponse({
+            'success': False,
+            'error': str(e)
+        }, status=500)
+
+@csrf_exempt
+@require_http_methods(["POST"])
+def item_batch(request):
+    """
+    Run an ordered list of create/update/delete/get operations in one request.
+    """
+    service, service_type = get_service()
+    
+    try:
+        data = json.loads(request.body)
+        operations = data.get('operations') if isinstance(data, dict) else data
+        
+        try:
+            operations = validate_operations(operations)
+        except ValueError as e:
+            return JsonResponse({
+                'success': False,
+                'error': str(e)
+            }, status=400)
+        
+        results = service.execute_batch(operations)
+        
+        return JsonResponse({
+            'success': True,
+            'data': results,
+            'message': f'Executed {len(results)} operations in {service_type} database'
         })
         
+    except json.JSONDecodeError:
+        return JsonResponse({
+            'success': False,
+            'error': 'Invalid JSON data'
+        }, status=400)
     except Exception as e:
         return JsonResponse({
             'success': False,
             'error': str(e)
         }, status=500)
 
+@csrf_exempt
+@require_http_methods(["POST"])
+def item_import(request):
+    """
+    Bulk import items from a CSV or NDJSON request body.
+    
+    The body is parsed line by line and written in chunks, so memory use does
+    not grow with the size of the upload. With ``?async=true`` the body is
+    staged to disk and imported by the job worker; the response is the job.
+    """
+    service, service_type = get_service()
+    
+    content_type = request.content_type or ''
+    default_format = 'ndjson' if 'ndjson' in content_type or 'jsonl' in content_type else 'csv'
+    fmt = request.GET.get('format', default_format)
+    if fmt not in IMPORT_FORMATS:
+        return JsonResponse({
+            'success': False,
+            'error': f'format must be one of: {", ".join(IMPORT_FORMATS)}'
+        }, status=400)
+    
+    try:
+        chunk_size = int(request.GET.get('chunk_size', DEFAULT_CHUNK_SIZE))
+    except ValueError:
+        chunk_size = 0
+    if not 1 <= chunk_size <= MAX_CHUNK_SIZE:
+        return JsonResponse({
+            'success': False,
+            'error': f'chunk_size must be between 1 and {MAX_CHUNK_SIZE}'
+        }, status=400)
+    
+    if request.GET.get('async', '').lower() == 'true':
+        try:
+            upload = jobs.stage_upload(iter(lambda: request.read(64 * 1024), b''), fmt)
+            job = jobs.enqueue('import', {'format': fmt, 'chunk_size': chunk_size}, upload=upload)
+            return JsonResponse({
+                'success': True,
+                'data': job.to_dict(),
+                'message': f'Import queued as job {job.id}'
+            }, status=202)
+        except Exception as e:
+            return JsonResponse({
+                'success': False,
+                'error': str(e)
+            }, status=500)
+    
+    try:
+        summary = ItemImporter(service, chunk_size=chunk_size).run(iter_records(request, fmt))
+        
+        return JsonResponse({
+            'success': True,
+            'data': summary,
+            'message': f'Imported {summary["created"]} of {summary["processed"]} rows into {service_type} database'
+        })
+        
+    except Exception as e:
+        return JsonResponse({
+            'success': False,
+            'error': str(e)
+        }, status=500)
+
+@csrf_exempt
+@require_http_methods(["GET"])
+def service_stats(request):
+    """
+    Runtime statistics of this worker process's items backend.
+    """
+    service, service_type = get_service()
+    stats = {'backend': service_type}
+    if hasattr(service, 'negative_cache'):
+        stats['negative_cache'] = service.negative_cache.stats()
+    if hasattr(service, 'call_stats'):
+        stats['calls'] = service.call_stats()
+    return JsonResponse({
+        'success': True,
+        'data': stats,
+        'message': f'Statistics for the {service_type} backend'
+    })
+
+MAX_JOB_LIST = 100
+
+@csrf_exempt
+@require_http_methods(["GET"])
+def job_list(request):
+    """
+    List the most recent background jobs, optionally filtered by ?status=.
+    """
+    try:
+        jobs_query = Job.objects.order_by('-created_at', '-id')
+        status = request.GET.get('status')
+        if status:
+            jobs_query = jobs_query.filter(status=status)
+        return JsonResponse({
+            'success': True,
+            'data': [job.to_dict() for job in jobs_query[:MAX_JOB_LIST]],
+            'message': 'Jobs retrieved successfully'
+        })
+    except Exception as e:
+        return JsonResponse({
+            'success': False,
+            'error': str(e)
+        }, status=500)
+
+@csrf_exempt
+@require_http_methods(["POST"])
+def job_create(request):
+    """
+    Queue a background job: {"kind": "export", "params": {"format": "csv"}}.
+    """
+    try:
+        data = json.loads(request.body)
+        if not isinstance(data, dict):
+            raise ValueError('Request body must be an object')
+        job = jobs.enqueue(data.get('kind'), data.get('params'))
+        return JsonResponse({
+            'success': True,
+            'data': job.to_dict(),
+            'message': f'Job {job.id} queued'
+        }, status=202)
+    except json.JSONDecodeError:
+        return JsonResponse({
+            'success': False,
+            'error': 'Invalid JSON data'
+        }, status=400)
+    except ValueError as e:
+        return JsonResponse({
+            'success': False,
+            'error': str(e)
+        }, status=400)
+    except Exception as e:
+        return JsonResponse({
+            'success': False,
+            'error': str(e)
+        }, status=500)
+
+@csrf_exempt
+@require_http_methods(["GET"])
+def job_detail(request, job_id):
+    """
+    Get a job's status, progress and result.
+    """
+    job = Job.objects.filter(id=job_id).first()
+    if job is None:
+        return JsonResponse({
+            'success': False,
+            'error': 'Job not found'
+        }, status=404)
+    return JsonResponse({
+        'success': True,
+        'data': job.to_dict(),
+        'message': f'Job {job.id} is {job.status}'
+    })
+
+@csrf_exempt
+@require_http_methods(["POST"])
+def job_cancel(request, job_id):
+    """
+    Cancel a queued job, or ask a running one to stop.
+    """
+    job = jobs.cancel(job_id)
+    if job is None:
+        return JsonResponse({
+            'success': False,
+            'error': 'Job not found'
+        }, status=404)
+    return JsonResponse({
+        'success': True,
+        'data': job.to_dict(),
+        'message': f'Cancellation requested for job {job.id}'
+    })
+
+@csrf_exempt
+@require_http_methods(["GET"])
+def job_download(request, job_id):
+    """
+    Download the file produced by a finished export job.
+    """
+    job = Job.objects.filter(id=job_id).first()
+    path = (job.result or {}).get('path') if job and job.status == Job.SUCCEEDED else None
+    if not path or not os.path.exists(path):
+        return JsonResponse({
+            'success': False,
+            'error': 'No output file for this job'
+        }, status=404)
+    return FileResponse(open(path, 'rb'), as_attachment=True, filename=os.path.basename(path))
+
+INITIAL_PAGE_SIZE = 50
+
 def index(request):
     """
     Main page with a simple interface for testing CRUD operations.
+    
+    The first page of items is rendered into the template so the page can
+    show it without an extra API round-trip.
     """
-    return render(request, 'items/index.html')
+    service, service_type = get_service()
+    
+    initial_page = {'data': None, 'next_cursor': None, 'page_size': INITIAL_PAGE_SIZE}
+    try:
+        items = service.get_all_items(limit=INITIAL_PAGE_SIZE)
+        initial_page['data'] = items
+        initial_page['next_cursor'] = pagination_info(INITIAL_PAGE_SIZE, 0, 'none', None, items)['next_cursor']
+    except Exception:
+        # The page falls back to fetching the list from the API
+        pass
+    
+    return render(request, 'items/index.html', {'initial_page': initial_page})
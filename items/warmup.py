@@ -0,0 +1,51 @@
+import threading
+
+# Longest start-up waits for the first Supabase round-trip; an unreachable
+# backend must not hold the worker back from serving
+WARM_UP_TIMEOUT = 2.0
+
+
+def warm_up():
+    """
+    Do the first request's one-off work when the process starts.
+
+    Imports the URLconf, views and database backends, creates the items
+    backend and, for Supabase, opens the HTTP connection (waiting at most
+    WARM_UP_TIMEOUT) so the first request does not pay for the TLS handshake.
+    """
+    from django.db import connections
+    from django.urls import resolve, reverse
+    from .views import get_service
+
+    resolve(reverse('items:item_list'))
+    # Loads each backend module without connecting (no queries during start-up)
+    for alias in connections:
+        connections[alias]
+    service, service_type = get_service()
+    if service_type == 'supabase':
+        thread = threading.Thread(target=_open_connection, args=(service,), name='supabase-warm-up', daemon=True)
+        thread.start()
+        thread.join(WARM_UP_TIMEOUT)
+
+
+def reset_backend():
+    """
+    Drop the items backend and close database connections, so processes
+    forked from this one create their own instead of sharing these.
+    """
+    from django.db import connections
+    from .views import get_service
+
+    for name in ('_instance', '_type'):
+        if hasattr(get_service, name):
+            delattr(get_service, name)
+    connections.close_all()
+
+
+def _open_connection(service):
+    try:
+        # A HEAD request with a planner estimate is the cheapest round-trip
+        service.count_items(mode='estimated')
+    except Exception:
+        # Warm-up is best effort; the first request reports real failures
+        pass
@@ -0,0 +1,43 @@
+-- Tables used by SupabaseService (same schema as the Django models in items/models.py)
+--
+-- Safe to run on a project that already has an `items` table from earlier setup
+-- instructions: existing tables are kept and only the missing columns, tables,
+-- indexes and policies are added.
+
+CREATE TABLE IF NOT EXISTS items (
+    id BIGSERIAL PRIMARY KEY,
+    name VARCHAR(200) NOT NULL,
+    description TEXT,
+    price DECIMAL(10,2),
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    is_active BOOLEAN DEFAULT TRUE,
+    deleted_at TIMESTAMP WITH TIME ZONE
+);
+
+-- Soft delete: tables created before it get the column (NULL, so every existing row stays live)
+ALTER TABLE items ADD COLUMN IF NOT EXISTS deleted_at TIMESTAMP WITH TIME ZONE;
+
+-- Soft-deleted and long-inactive items are moved here by `manage.py archive_items`
+CREATE TABLE IF NOT EXISTS items_archive (
+    id BIGINT PRIMARY KEY,
+    name VARCHAR(200) NOT NULL,
+    description TEXT,
+    price DECIMAL(10,2),
+    created_at TIMESTAMP WITH TIME ZONE NOT NULL,
+    updated_at TIMESTAMP WITH TIME ZONE NOT NULL,
+    is_active BOOLEAN DEFAULT FALSE,
+    deleted_at TIMESTAMP WITH TIME ZONE,
+    archived_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+CREATE INDEX IF NOT EXISTS items_archive_created_idx ON items_archive (created_at, id);
+
+-- Enable Row Level Security (optional)
+ALTER TABLE items ENABLE ROW LEVEL SECURITY;
+ALTER TABLE items_archive ENABLE ROW LEVEL SECURITY;
+
+-- Create policy for public access (for demo purposes); CREATE POLICY has no IF NOT EXISTS
+DROP POLICY IF EXISTS "Allow public access" ON items;
+CREATE POLICY "Allow public access" ON items FOR ALL USING (true);
+DROP POLICY IF EXISTS "Allow public access" ON items_archive;
+CREATE POLICY "Allow public access" ON items_archive FOR ALL USING (true);
@@ -0,0 +1,115 @@
+-- Functions called by SupabaseService through PostgREST RPC (POST /rest/v1/rpc/<name>),
+-- so flows that need several table requests cost one round-trip.
+-- items/fake_postgrest.py implements the same functions for local testing.
+
+
+-- One page of items plus the total number of matches.
+-- An empty search_term matches every item. after_created_at/after_id is the keyset
+-- cursor of the previous page; a NULL page_limit returns every match.
+CREATE OR REPLACE FUNCTION items_find(
+    search_term TEXT DEFAULT NULL,
+    page_limit INTEGER DEFAULT NULL,
+    page_offset INTEGER DEFAULT 0,
+    after_created_at TIMESTAMP WITH TIME ZONE DEFAULT NULL,
+    after_id BIGINT DEFAULT NULL,
+    include_archived BOOLEAN DEFAULT FALSE
+)
+RETURNS JSONB
+LANGUAGE sql
+STABLE
+AS $$
+    WITH matches AS (
+        SELECT id, name, description, price, created_at, updated_at, is_active
+        FROM items
+        WHERE deleted_at IS NULL
+          AND (coalesce(search_term, '') = ''
+               OR name ILIKE '%' || search_term || '%'
+               OR description ILIKE '%' || search_term || '%')
+        UNION ALL
+        SELECT id, name, description, price, created_at, updated_at, is_active
+        FROM items_archive
+        WHERE include_archived
+          AND deleted_at IS NULL
+          AND (coalesce(search_term, '') = ''
+               OR name ILIKE '%' || search_term || '%'
+               OR description ILIKE '%' || search_term || '%')
+    ),
+    page AS (
+        SELECT *
+        FROM matches
+        WHERE after_id IS NULL OR (created_at, id) < (after_created_at, after_id)
+        ORDER BY created_at DESC, id DESC
+        LIMIT page_limit
+        OFFSET page_offset
+    )
+    SELECT jsonb_build_object(
+        'items', coalesce((SELECT jsonb_agg(to_jsonb(page) ORDER BY created_at DESC, id DESC) FROM page), '[]'::jsonb),
+        'total', (SELECT count(*) FROM matches)
+    )
+$$;
+
+
+-- Create and update many items in one transaction.
+-- Entries without an "id" are inserted; entries with one update only the keys they
+-- carry. Returns the saved rows in input order, with null for ids that do not exist
+-- (or were deleted). Any error rolls back every entry.
+CREATE OR REPLACE FUNCTION items_upsert(payload JSONB)
+RETURNS JSONB
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    entry JSONB;
+    saved items;
+    results JSONB := '[]'::jsonb;
+BEGIN
+    FOR entry IN SELECT value FROM jsonb_array_elements(payload) LOOP
+        IF entry ? 'id' THEN
+            UPDATE items SET
+                name = CASE WHEN entry ? 'name' THEN entry->>'name' ELSE name END,
+                description = CASE WHEN entry ? 'description' THEN entry->>'description' ELSE description END,
+                price = CASE WHEN entry ? 'price' THEN (entry->>'price')::NUMERIC ELSE price END,
+                is_active = CASE WHEN entry ? 'is_active' THEN (entry->>'is_active')::BOOLEAN ELSE is_active END,
+                updated_at = now()
+            WHERE id = (entry->>'id')::BIGINT AND deleted_at IS NULL
+            RETURNING * INTO saved;
+            IF NOT FOUND THEN
+                results := results || jsonb_build_array(NULL::JSONB);
+                CONTINUE;
+            END IF;
+        ELSE
+            INSERT INTO items (name, description, price, is_active)
+            VALUES (
+                entry->>'name',
+                coalesce(entry->>'description', ''),
+                (entry->>'price')::NUMERIC,
+                coalesce((entry->>'is_active')::BOOLEAN, TRUE)
+            )
+            RETURNING * INTO saved;
+        END IF;
+        results := results || jsonb_build_array(to_jsonb(saved));
+    END LOOP;
+    RETURN results;
+END;
+$$;
+
+
+-- Summary statistics of the items and archive tables.
+CREATE OR REPLACE FUNCTION items_stats()
+RETURNS JSONB
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT jsonb_build_object(
+        'total', count(*),
+        'active', count(*) FILTER (WHERE is_active),
+        'inactive', count(*) FILTER (WHERE NOT is_active),
+        'min_price', min(price),
+        'max_price', max(price),
+        'avg_price', round(avg(price), 2),
+        'newest_created_at', max(created_at),
+        'deleted', (SELECT count(*) FROM items WHERE deleted_at IS NOT NULL),
+        'archived', (SELECT count(*) FROM items_archive WHERE deleted_at IS NULL)
+    )
+    FROM items
+    WHERE deleted_at IS NULL
+$$;
@@ -0,0 +1,108 @@
+-- Normalized search columns: lowercased, accent-folded, whitespace-collapsed copies
+-- of name and description. Searches normalize their term the same way
+-- (items/search.py) and match these columns, so no per-row lower() is needed and
+-- equality and prefix lookups can use indexes.
+
+CREATE EXTENSION IF NOT EXISTS unaccent WITH SCHEMA extensions;
+CREATE EXTENSION IF NOT EXISTS pg_trgm WITH SCHEMA extensions;
+
+
+-- unaccent() is only STABLE (its dictionary can be swapped), so naming the
+-- dictionary explicitly here is what lets generated columns and indexes use it.
+CREATE OR REPLACE FUNCTION items_search_text(value TEXT)
+RETURNS TEXT
+LANGUAGE sql
+IMMUTABLE
+PARALLEL SAFE
+AS $$
+    SELECT lower(btrim(regexp_replace(
+        extensions.unaccent('extensions.unaccent'::regdictionary, coalesce(value, '')), '\s+', ' ', 'g'
+    )))
+$$;
+
+
+-- Generated columns are recomputed by every write: inserts, updates, bulk
+-- requests, items_upsert and the archive copy alike. Adding them backfills
+-- existing rows.
+ALTER TABLE items
+    ADD COLUMN IF NOT EXISTS name_search TEXT GENERATED ALWAYS AS (items_search_text(name)) STORED,
+    ADD COLUMN IF NOT EXISTS description_search TEXT GENERATED ALWAYS AS (items_search_text(description)) STORED;
+
+ALTER TABLE items_archive
+    ADD COLUMN IF NOT EXISTS name_search TEXT GENERATED ALWAYS AS (items_search_text(name)) STORED,
+    ADD COLUMN IF NOT EXISTS description_search TEXT GENERATED ALWAYS AS (items_search_text(description)) STORED;
+
+-- Equality and prefix (LIKE 'term%') lookups on names, independent of the database collation
+CREATE INDEX IF NOT EXISTS items_name_search_idx ON items (name_search text_pattern_ops);
+-- Trigram indexes serve substring (LIKE '%term%') matches, the default search. They
+-- also cover equality and prefix on descriptions, which can outgrow a b-tree entry (about 2.7 kB)
+CREATE INDEX IF NOT EXISTS items_name_search_trgm_idx
+    ON items USING gin (name_search extensions.gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS items_description_search_idx
+    ON items USING gin (description_search extensions.gin_trgm_ops);
+
+
+-- items_find gains search_match; drop the old signature so PostgREST sees one function
+DROP FUNCTION IF EXISTS items_find(TEXT, INTEGER, INTEGER, TIMESTAMP WITH TIME ZONE, BIGINT, BOOLEAN);
+
+-- As in 20261019000100_items_functions.sql, but search_term is normalized and matched
+-- against the search columns: anywhere ('contains'), at the start ('prefix') or in
+-- full ('exact').
+CREATE OR REPLACE FUNCTION items_find(
+    search_term TEXT DEFAULT NULL,
+    page_limit INTEGER DEFAULT NULL,
+    page_offset INTEGER DEFAULT 0,
+    after_created_at TIMESTAMP WITH TIME ZONE DEFAULT NULL,
+    after_id BIGINT DEFAULT NULL,
+    include_archived BOOLEAN DEFAULT FALSE,
+    search_match TEXT DEFAULT 'contains'
+)
+RETURNS JSONB
+LANGUAGE sql
+STABLE
+AS $$
+    WITH term AS (
+        SELECT items_search_text(search_term) AS value
+    ),
+    -- The term's own %, _ and backslashes match literally, as in Django's contains
+    literal AS (
+        SELECT replace(replace(replace(value, '\', '\\'), '%', '\%'), '_', '\_') AS value
+        FROM term
+    ),
+    pattern AS (
+        SELECT CASE search_match
+                   WHEN 'exact' THEN NULL
+                   WHEN 'prefix' THEN value || '%'
+                   ELSE '%' || value || '%'
+               END AS value
+        FROM literal
+    ),
+    matches AS (
+        SELECT id, name, description, price, created_at, updated_at, is_active
+        FROM items, term, pattern
+        WHERE deleted_at IS NULL
+          AND (term.value = ''
+               OR name_search = term.value OR description_search = term.value
+               OR name_search LIKE pattern.value OR description_search LIKE pattern.value)
+        UNION ALL
+        SELECT id, name, description, price, created_at, updated_at, is_active
+        FROM items_archive, term, pattern
+        WHERE include_archived
+          AND deleted_at IS NULL
+          AND (term.value = ''
+               OR name_search = term.value OR description_search = term.value
+               OR name_search LIKE pattern.value OR description_search LIKE pattern.value)
+    ),
+    page AS (
+        SELECT *
+        FROM matches
+        WHERE after_id IS NULL OR (created_at, id) < (after_created_at, after_id)
+        ORDER BY created_at DESC, id DESC
+        LIMIT page_limit
+        OFFSET page_offset
+    )
+    SELECT jsonb_build_object(
+        'items', coalesce((SELECT jsonb_agg(to_jsonb(page) ORDER BY created_at DESC, id DESC) FROM page), '[]'::jsonb),
+        'total', (SELECT count(*) FROM matches)
+    )
+$$;
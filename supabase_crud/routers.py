@@ -0,0 +1,82 @@
+import random
+from contextvars import ContextVar
+from django.conf import settings
+from django.db import connections
+
+PRIMARY_DB = 'default'
+STICKY_COOKIE = 'db_primary_until'
+# Bookkeeping tables replicas would serve stale (job status and progress)
+PRIMARY_ONLY_MODELS = ('items.job',)
+
+# Per-request state: read from the primary, and whether this request wrote
+_use_primary = ContextVar('use_primary', default=False)
+_wrote = ContextVar('wrote', default=False)
+
+
+def replica_aliases():
+    return [alias for alias in settings.DATABASES if alias.startswith('replica_')]
+
+
+def pinned_to_primary() -> bool:
+    """Whether this request wrote, or its client did within REPLICA_STICKY_SECONDS."""
+    return _use_primary.get()
+
+
+def reading_primary() -> bool:
+    """Whether a read issued now goes to the primary rather than a replica."""
+    return not replica_aliases() or _use_primary.get() or connections[PRIMARY_DB].in_atomic_block
+
+
+class PrimaryReplicaRouter:
+    """
+    Send writes to the primary and spread reads across the read replicas.
+
+    Reads stay on the primary inside a transaction, after the current request
+    has written, and while the client's read-your-writes window is open.
+    """
+
+    def db_for_read(self, model, **hints):
+        if reading_primary():
+            return PRIMARY_DB
+        if model._meta.label_lower in PRIMARY_ONLY_MODELS:
+            return PRIMARY_DB
+        return random.choice(replica_aliases())
+
+    def db_for_write(self, model, **hints):
+        _wrote.set(True)
+        _use_primary.set(True)
+        return PRIMARY_DB
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas receive schema and data from the primary
+        return db == PRIMARY_DB
+
+
+class ReplicaStickinessMiddleware:
+    """
+    Pin a client to the primary for REPLICA_STICKY_SECONDS after it writes.
+
+    The window is carried in a cookie, so it holds across worker processes.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        primary_token = _use_primary.set(STICKY_COOKIE in request.COOKIES)
+        wrote_token = _wrote.set(False)
+        try:
+            response = self.get_response(request)
+            if _wrote.get():
+                response.set_cookie(
+                    STICKY_COOKIE, '1',
+                    max_age=settings.REPLICA_STICKY_SECONDS,
+                    httponly=True, samesite='Lax',
+                )
+            return response
+        finally:
+            _use_primary.reset(primary_token)
+            _wrote.reset(wrote_token)
@@ -0,0 +1,130 @@
+"""
+Pre-forking production server (gunicorn) behind `manage.py serve`.
+
+The master process loads Django, the WSGI/ASGI application and the items
+backend modules once; workers are forked from it and share those pages
+copy-on-write. Each worker then opens its own backend connections.
+"""
+import gc
+import itertools
+import os
+import random
+import sys
+
+from gunicorn.app.base import BaseApplication
+
+# Worker modes: one request at a time, a thread pool per worker, or an
+# asyncio event loop per worker serving the ASGI application
+SERVER_MODES = {
+    'sync': 'sync',
+    'thread': 'gthread',
+    'async': 'asgi',
+}
+
+
+def cpu_count() -> int:
+    """CPUs this process may run on (honours affinity masks and cpusets)."""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def rss_bytes() -> int:
+    """Resident memory of the current process."""
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except OSError:
+        import resource
+        # No /proc: fall back to the peak (KiB on Linux, bytes on macOS)
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == 'darwin' else peak * 1024
+
+
+class Recycler:
+    """
+    Retire a worker after ``max_requests`` (plus up to ``jitter``, so workers
+    do not all restart together) or once its resident memory exceeds
+    ``max_memory`` bytes; 0 disables either limit. The worker finishes its
+    in-flight requests and the master forks a replacement.
+    """
+
+    def __init__(self, worker, max_requests: int, jitter: int, max_memory: int):
+        self.worker = worker
+        self.limit = max_requests + random.randint(0, jitter) if max_requests else 0
+        self.max_memory = max_memory
+        self.counter = itertools.count(1)
+
+    def request_finished(self):
+        served = next(self.counter)
+        if not self.worker.alive:
+            return
+        if self.limit and served >= self.limit:
+            reason = f'{served} requests'
+        elif self.max_memory and (rss := rss_bytes()) > self.max_memory:
+            reason = f'{rss // 2 ** 20} MiB resident memory'
+        else:
+            return
+        self.worker.log.info('Recycling worker %s after %s', self.worker.pid, reason)
+        self.worker.alive = False
+
+
+class ItemsServer(BaseApplication):
+    """
+    gunicorn application serving an already-loaded WSGI or ASGI callable.
+
+    ``options`` are gunicorn settings; ``max_requests``/``max_requests_jitter``
+    and ``max_memory`` are enforced by a per-worker Recycler in every mode
+    (gunicorn's own request limit does not cover the ASGI worker).
+    """
+
+    def __init__(self, application, options, max_requests=0, max_requests_jitter=0, max_memory=0):
+        self.application = application
+        self.options = options
+        self.limits = (max_requests, max_requests_jitter, max_memory)
+        self.recycler = None
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+        self.cfg.set('pre_fork', self.pre_fork)
+        self.cfg.set('post_fork', self.post_fork)
+        self.cfg.set('post_worker_init', self.post_worker_init)
+        self.cfg.set('post_request', self.post_request)
+
+    def load(self):
+        if self.cfg.worker_class_str == 'asgi':
+            return self.recycling_asgi(self.application)
+        return self.application
+
+    def recycling_asgi(self, application):
+        """The ASGI worker has no post_request hook; count requests here instead."""
+        async def app(scope, receive, send):
+            try:
+                await application(scope, receive, send)
+            finally:
+                if scope['type'] == 'http' and self.recycler:
+                    self.recycler.request_finished()
+        return app
+
+    # gunicorn hooks
+
+    def pre_fork(self, server, worker):
+        # Keep the preloaded objects out of the children's collections, so
+        # the GC does not write to (and copy) the pages they share
+        gc.freeze()
+
+    def post_fork(self, server, worker):
+        from items.warmup import warm_up
+        gc.enable()
+        # The master holds no backend or connections; each worker opens its own
+        warm_up()
+
+    def post_worker_init(self, worker):
+        # After gunicorn reseeded random, so each worker gets its own jitter
+        self.recycler = Recycler(worker, *self.limits)
+
+    def post_request(self, worker, req, environ, resp):
+        self.recycler.request_finished()
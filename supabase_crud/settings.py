@@ -47,6 +47,8 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'items.middleware.CompressionMiddleware',
+    'items.middleware.AdmissionControlMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -72,8 +74,36 @@ TEMPLATES = [
     },
 ]
 
+# Process profile: 'full' serves the web page and admin, 'api' runs only the
+# items JSON API with a trimmed app and middleware stack, for fast-starting
+# workers behind a load balancer.
+APP_PROFILE = os.getenv('APP_PROFILE', 'full')
+
+if APP_PROFILE == 'api':
+    INSTALLED_APPS = ['items']
+    MIDDLEWARE = [
+        'django.middleware.security.SecurityMiddleware',
+        'items.middleware.CompressionMiddleware',
+        'items.middleware.AdmissionControlMiddleware',
+        'django.middleware.common.CommonMiddleware',
+    ]
+    TEMPLATES[0]['OPTIONS']['context_processors'] = [
+        'django.template.context_processors.request',
+    ]
+
+# Create the items backend (and open its first connection) when a serving
+# process loads wsgi.py/asgi.py instead of on the first request
+WARM_UP_BACKEND = os.getenv('WARM_UP_BACKEND', str(APP_PROFILE == 'api')).lower() == 'true'
+
 WSGI_APPLICATION = 'supabase_crud.wsgi.application'
 
+# Staged uploads and export files of background jobs (manage.py run_jobs)
+JOB_FILES_DIR = os.getenv('JOB_FILES_DIR', str(BASE_DIR / 'job_files'))
+
+# Inactive items untouched for this many days are moved to items_archive by
+# manage.py archive_items (soft-deleted items are moved regardless of age)
+ARCHIVE_INACTIVE_DAYS = int(os.getenv('ARCHIVE_INACTIVE_DAYS', '90'))
+
 
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
@@ -81,9 +111,102 @@ WSGI_APPLICATION = 'supabase_crud.wsgi.application'
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'NAME': os.getenv('SQLITE_PATH', BASE_DIR / 'db.sqlite3'),
+    }
+}
+
+# SQLite profile: 'development' keeps Django's defaults, 'production' tunes the
+# local database for several concurrent worker processes.
+SQLITE_PROFILE = os.getenv('SQLITE_PROFILE', 'development')
+
+if SQLITE_PROFILE == 'production':
+    DATABASES['default'].update({
+        'OPTIONS': {
+            # Executed by Django on every new connection
+            'init_command': ';'.join([
+                'PRAGMA journal_mode=WAL',
+                'PRAGMA synchronous=NORMAL',
+                f"PRAGMA mmap_size={os.getenv('SQLITE_MMAP_SIZE', '268435456')}",
+                f"PRAGMA cache_size={os.getenv('SQLITE_CACHE_SIZE', '-65536')}",
+                f"PRAGMA busy_timeout={os.getenv('SQLITE_BUSY_TIMEOUT', '5000')}",
+                'PRAGMA temp_store=MEMORY',
+            ]),
+            # Take the write lock at BEGIN so writers wait on busy_timeout
+            # instead of failing when upgrading a read lock
+            'transaction_mode': 'IMMEDIATE',
+        },
+        'CONN_MAX_AGE': int(os.getenv('CONN_MAX_AGE', '600')),
+        'CONN_HEALTH_CHECKS': True,
+    })
+
+# Read replicas: comma-separated SQLite files kept in sync with the primary
+# (see `manage.py sync_replicas`). Postgres followers can be added to
+# DATABASES under a 'replica_<n>' alias in the same way.
+SQLITE_REPLICAS = [path for path in os.getenv('SQLITE_REPLICAS', '').split(',') if path]
+
+for index, path in enumerate(SQLITE_REPLICAS):
+    DATABASES[f'replica_{index}'] = {
+        **DATABASES['default'],
+        'NAME': path,
+        'TEST': {'MIRROR': 'default'},
     }
+
+# Seconds a client keeps reading from the primary after it writes
+REPLICA_STICKY_SECONDS = int(os.getenv('REPLICA_STICKY_SECONDS', '5'))
+
+if SQLITE_REPLICAS:
+    DATABASE_ROUTERS = ['supabase_crud.routers.PrimaryReplicaRouter']
+    MIDDLEWARE.append('supabase_crud.routers.ReplicaStickinessMiddleware')
+
+
+# Negative lookup cache: ids found missing are answered 404 without a backend
+# call for NEGATIVE_CACHE_TTL seconds (0 disables); a NEGATIVE_CACHE_VERIFY_RATE
+# fraction of those answers is re-checked to measure false positives
+NEGATIVE_CACHE_TTL = float(os.getenv('NEGATIVE_CACHE_TTL', '30'))
+NEGATIVE_CACHE_SIZE = int(os.getenv('NEGATIVE_CACHE_SIZE', '100000'))
+NEGATIVE_CACHE_VERIFY_RATE = float(os.getenv('NEGATIVE_CACHE_VERIFY_RATE', '0.01'))
+
+
+# SupabaseService call policies (see items/call_policy.py): optionally hedge
+# idempotent reads after their observed p95 latency, plus per-method
+# overrides such as {'get_item_by_id': {'timeout': 2.0, 'retries': 3}}
+SUPABASE_HEDGE_READS = os.getenv('SUPABASE_HEDGE_READS', 'False').lower() == 'true'
+
+SUPABASE_CALL_POLICIES = {}
+
+# Use the SQL functions of supabase/migrations/*_items_functions.sql for
+# paged reads with exact counts and for batch writes (one request each)
+SUPABASE_USE_RPC = os.getenv('SUPABASE_USE_RPC', 'False').lower() == 'true'
+
+
+# Admission control for the items API (see items/middleware.py).
+# Per-client token bucket; off unless RATE_LIMIT_PER_SECOND is set (e.g. 20),
+# so upgrading does not start throttling existing clients. With
+# RATE_LIMIT_STORE pointing at a SQLite file, buckets are shared by all
+# worker processes on the host; otherwise each process keeps its own.
+RATE_LIMIT_PER_SECOND = float(os.getenv('RATE_LIMIT_PER_SECOND', '0'))
+RATE_LIMIT_BURST = int(os.getenv('RATE_LIMIT_BURST', '40'))
+RATE_LIMIT_STORE = os.getenv('RATE_LIMIT_STORE', '')
+# META key holding the client address when behind a proxy, e.g. 'HTTP_X_FORWARDED_FOR'
+RATE_LIMIT_CLIENT_HEADER = os.getenv('RATE_LIMIT_CLIENT_HEADER', '')
+# Proxies in front of the app that append to that header; the client is the
+# address the outermost of them saw (the header's Nth entry from the right)
+RATE_LIMIT_TRUSTED_PROXIES = int(os.getenv('RATE_LIMIT_TRUSTED_PROXIES', '1'))
+
+# Per-process (in-flight, queued) request limits for each endpoint class
+CONCURRENCY_LIMITS = {
+    'read': (32, 64),
+    'write': (8, 16),
+    'bulk': (2, 2),
 }
+ADMISSION_QUEUE_TIMEOUT = float(os.getenv('ADMISSION_QUEUE_TIMEOUT', '1.0'))
+
+
+# API response compression (see items/middleware.py): skip bodies below
+# COMPRESSION_MIN_SIZE bytes; keep up to COMPRESSION_CACHE_SIZE bytes of
+# compressed bodies for payloads that repeat
+COMPRESSION_MIN_SIZE = int(os.getenv('COMPRESSION_MIN_SIZE', '1024'))
+COMPRESSION_CACHE_SIZE = int(os.getenv('COMPRESSION_CACHE_SIZE', str(16 * 1024 * 1024)))
 
 
 # Password validation
@@ -1,17 +1,27 @@
 import os
-from supabase import create_client, Client
+from typing import TYPE_CHECKING
 from dotenv import load_dotenv
 
+if TYPE_CHECKING:
+    from supabase import Client
+
 load_dotenv()
 
-def get_supabase_client() -> Client:
+def supabase_configured() -> bool:
+    """
+    Whether Supabase credentials are present in the environment.
+    """
+    return bool(os.getenv('SUPABASE_URL') and os.getenv('SUPABASE_KEY'))
+
+def get_supabase_client() -> 'Client':
     """
     Initialize and return a Supabase client instance.
     """
-    supabase_url = os.getenv('SUPABASE_URL')
-    supabase_key = os.getenv('SUPABASE_KEY')
-    
-    if not supabase_url or not supabase_key:
+    if not supabase_configured():
         raise ValueError("SUPABASE_URL and SUPABASE_KEY must be set in environment variables")
     
-    return create_client(supabase_url, supabase_key) 
\ No newline at end of file
+    # Imported on demand: the client libraries take a few hundred milliseconds
+    # to load and processes using the local database never need them
+    from supabase import create_client
+    
+    return create_client(os.getenv('SUPABASE_URL'), os.getenv('SUPABASE_KEY')) 
\ No newline at end of file
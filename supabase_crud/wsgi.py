@@ -14,3 +14,11 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'supabase_crud.settings')
 
 application = get_wsgi_application()
+
+# Only processes that serve requests import this module, so management
+# commands such as migrate start without touching the items backend
+from django.conf import settings
+
+if settings.WARM_UP_BACKEND:
+    from items.warmup import warm_up
+    warm_up()